@@ -2,7 +2,13 @@ import subprocess
 import sys
 import importlib
 import os
+import json
+import time
 import shutil
+import hashlib
+import argparse
+import tempfile
+import statistics
 import webbrowser
 import requests
 import psutil
@@ -36,7 +42,8 @@ required_modules = {
 check_and_install_modules(required_modules)
 
 PYINSTALLER = "pyinstaller"
-ISCC_PATH = r"C:\Program Files (x86)\Inno Setup 6\ISCC.exe"
+# ISCC_PATH in the environment points at another compiler, e.g. a stub when testing the flow off Windows
+ISCC_PATH = os.environ.get("ISCC_PATH", r"C:\Program Files (x86)\Inno Setup 6\ISCC.exe")
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 APP_PY = os.path.join(BASE_DIR, "font2c_lvgl.py")
@@ -44,9 +51,39 @@ APP_ISS = os.path.join(BASE_DIR, "Setup.iss")
 ICON_FILE = resource_path(os.path.join("icons", "CentumTool.ico"))
 DIST_FOLDER = os.path.join(BASE_DIR, "dist")
 OUTPUT_FOLDER = os.path.join(BASE_DIR, "Output")
-EXE_NAME = "CentumConfigurationTool.exe"
+ICONS_FOLDER = os.path.join(BASE_DIR, "icons")
+WORKER_JS = os.path.join(BASE_DIR, "lv_font_conv_worker.js")
+# PyInstaller's work dir; incremental builds keep it warm between runs
+WORK_FOLDER = os.path.join(BASE_DIR, "build")
+STAMPS_FILE = os.path.join(WORK_FOLDER, "build_stamps.json")
+APP_NAME = "CentumConfigurationTool"
+# PyInstaller only adds .exe on Windows
+EXE_NAME = "CentumConfigurationTool.exe" if os.name == "nt" else APP_NAME
+FONTS_FOLDER = os.path.join(BASE_DIR, "Fonts")
 SERVER_PORT = 9000
 
+PROFILE_STARTUP = "startup"
+PROFILE_ONEFILE = "onefile"
+# Modules the app never imports; leaving them out keeps the bundle and its import scan small
+EXCLUDED_MODULES = [
+    "unittest", "doctest", "pydoc", "pdb", "lib2to3", "tkinter.test", "test",
+    "pip", "setuptools", "distutils", "IPython", "matplotlib",
+]
+# Third-party distributions the app imports; their versions are part of the bundle's inputs
+BUNDLED_DISTRIBUTIONS = ["freetype-py", "numpy", "uharfbuzz"]
+PYINSTALLER_PROFILES = {
+    # One folder next to the exe: nothing is unpacked to a temp dir on each launch, and UPX is
+    # off so DLLs are not decompressed either
+    PROFILE_STARTUP: ["--onedir", "--noupx"] + [f"--exclude-module={m}" for m in EXCLUDED_MODULES],
+    # A single self-extracting exe, as before
+    PROFILE_ONEFILE: ["--onefile"],
+}
+STARTUP_RUNS = 5
+STARTUP_TIMEOUT = 120
+# Same variables as font2c_gui.STARTUP_PROBE_ENV / STARTUP_FONT_ENV
+STARTUP_PROBE_ENV = "FONT2C_STARTUP_PROBE"
+STARTUP_FONT_ENV = "FONT2C_STARTUP_FONT"
+
 def print_step(step_num, description):
     print("\n" + "*" * 60)
     print(f"Step {step_num}: {description}")
@@ -57,45 +94,173 @@ def remove_folder_if_exists(folder_path):
         print_step("Cleanup", f"Removing folder: {folder_path}")
         shutil.rmtree(folder_path)
 
+def pyinstaller_version():
+    proc = subprocess.run([PYINSTALLER, "--version"], check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          text=True)
+    return proc.stdout.strip()
+
 def check_and_install_pyinstaller():
     print_step(1, "Checking if PyInstaller is installed...")
     try:
-        subprocess.run([PYINSTALLER, "--version"], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        version = pyinstaller_version()
         print("PyInstaller is already installed.")
     except (subprocess.CalledProcessError, FileNotFoundError):
         print("PyInstaller not found. Installing with pip...")
         subprocess.run([sys.executable, "-m", "pip", "install", "pyinstaller"], check=True)
+        version = pyinstaller_version()
+    return version
 
 def check_iscc():
+    # Returns whether the installer can be built; Inno Setup only exists on Windows
     print_step(2, "Checking for Inno Setup Compiler...")
-    if not os.path.exists(ISCC_PATH):
-        print(f"Error: Inno Setup Compiler not found at {ISCC_PATH}. Please install it.")
-        sys.exit(1)
-    else:
+    if os.path.exists(ISCC_PATH):
         print("Inno Setup Compiler found.")
+        return True
+    if os.name != "nt":
+        print("Inno Setup is Windows-only; the installer step will be skipped (set ISCC_PATH to a stub to run it).")
+        return False
+    print(f"Error: Inno Setup Compiler not found at {ISCC_PATH}. Please install it.")
+    sys.exit(1)
+
+def list_files(folder):
+    files = []
+    for root, dirs, names in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        files += [os.path.join(root, name) for name in sorted(names)]
+    return files
+
+def app_sources():
+    # Every module beside the app; PyInstaller follows imports from font2c_lvgl.py, which reach most of them
+    names = sorted(f for f in os.listdir(BASE_DIR) if f.endswith(".py") and f != os.path.basename(__file__))
+    return [os.path.join(BASE_DIR, name) for name in names] + [WORKER_JS]
 
-def build_exe(icon_path):
-    remove_folder_if_exists(DIST_FOLDER)
-    remove_folder_if_exists(OUTPUT_FOLDER)
-    print_step(3, f"Building {EXE_NAME} executable")
-    cmd = [
-        PYINSTALLER,
-        "--onefile",
+def hash_inputs(paths, options):
+    # Paths (relative to the project) and contents of the input files, plus the step's options
+    digest = hashlib.sha256(json.dumps(options, sort_keys=True).encode("utf-8"))
+    for path in paths:
+        digest.update(os.path.relpath(path, BASE_DIR).replace(os.sep, "/").encode("utf-8") + b"\0")
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(chunk)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def load_stamps():
+    try:
+        with open(STAMPS_FILE, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+def save_stamps(stamps):
+    os.makedirs(WORK_FOLDER, exist_ok=True)
+    with open(STAMPS_FILE, "w", encoding="utf-8") as fh:
+        json.dump(stamps, fh, indent=2)
+
+def print_step_times(times):
+    print_step("Summary", "Step timings")
+    for name, seconds, cached in times:
+        print(f"{name:<12} {seconds:8.2f} s{'  (cached)' if cached else ''}")
+    print(f"{'Total':<12} {sum(t[1] for t in times):8.2f} s")
+
+def built_exe_path(profile):
+    if profile == PROFILE_STARTUP:
+        return os.path.join(DIST_FOLDER, APP_NAME, EXE_NAME)
+    return os.path.join(DIST_FOLDER, EXE_NAME)
+
+def pyinstaller_options(icon_path, profile):
+    return PYINSTALLER_PROFILES[profile] + [
         "--windowed",  # Prevents terminal window pop-up during GUI app run
         f"--icon={icon_path}",
         APP_PY,
-        "--name=CentumConfigurationTool",
+        f"--name={APP_NAME}",
         f"--distpath={DIST_FOLDER}",
-        "--clean",
-        "--add-data", f"icons{os.pathsep}icons"  # Bundle icons folder
+        f"--workpath={WORK_FOLDER}",
+        "--noconfirm",
+        "--add-data", f"{ICONS_FOLDER}{os.pathsep}icons",  # Bundle icons folder
+        "--add-data", f"{WORKER_JS}{os.pathsep}.",  # Resident converter worker
     ]
+
+def bundled_versions():
+    # An upgraded library must rebuild the bundle even though no source file changed
+    from importlib import metadata
+    versions = {}
+    for dist in BUNDLED_DISTRIBUTIONS:
+        try:
+            versions[dist] = metadata.version(dist)
+        except metadata.PackageNotFoundError:
+            versions[dist] = None
+    return versions
+
+def pyinstaller_inputs_hash(icon_path, profile, version):
+    options = {"options": pyinstaller_options(icon_path, profile), "pyinstaller": version, "python": sys.version,
+               "packages": bundled_versions()}
+    return hash_inputs(app_sources() + list_files(ICONS_FOLDER), options)
+
+def build_exe(icon_path, profile=PROFILE_STARTUP, digest=None, stamps=None):
+    # With stamps (incremental mode) the build is skipped when its inputs hash to the recorded digest,
+    # and PyInstaller reuses its analysis in the warm work dir instead of starting --clean.
+    # Returns the exe path and whether the previous build was reused.
+    exe_path = built_exe_path(profile)
+    if stamps is not None and stamps.get("pyinstaller") == digest and os.path.exists(exe_path):
+        print_step(3, f"{EXE_NAME} executable ({profile} profile): inputs unchanged, reusing {exe_path}")
+        return exe_path, True
+    if stamps is None:
+        remove_folder_if_exists(DIST_FOLDER)
+        remove_folder_if_exists(OUTPUT_FOLDER)
+    print_step(3, f"Building {EXE_NAME} executable ({profile} profile)")
+    cmd = [PYINSTALLER] + pyinstaller_options(icon_path, profile)
+    if stamps is None:
+        cmd.append("--clean")
     subprocess.run(cmd, check=True)
-    exe_path = os.path.join(DIST_FOLDER, EXE_NAME)
     if not os.path.exists(exe_path):
         print(f"Error: EXE {exe_path} not created!")
         sys.exit(1)
     print(f"EXE built successfully at {exe_path}")
-    return exe_path
+    return exe_path, False
+
+def startup_font():
+    fonts = sorted(f for f in os.listdir(FONTS_FOLDER) if f.lower().endswith(".ttf")) if os.path.isdir(FONTS_FOLDER) else []
+    return os.path.join(FONTS_FOLDER, fonts[0]) if fonts else None
+
+def measure_startup(cmd, runs=STARTUP_RUNS):
+    # Launches the app `runs` times with a probe that records when the first window is drawn and
+    # when a first range check of a font from Fonts/ finishes, then exits. The first run is the
+    # cold one; the median of all runs is the figure to compare between builds.
+    print_step("Startup", f"Timing {runs} launches of {' '.join(cmd)}")
+    font_path = startup_font()
+    samples = {"window": [], "validation": []}
+    for run in range(runs):
+        fd, probe_path = tempfile.mkstemp(prefix="startup_", suffix=".json")
+        os.close(fd)
+        os.remove(probe_path)
+        env = dict(os.environ, **{STARTUP_PROBE_ENV: probe_path})
+        if font_path:
+            env[STARTUP_FONT_ENV] = font_path
+        start = time.time()
+        try:
+            subprocess.run(cmd, env=env, timeout=STARTUP_TIMEOUT, check=False)
+            with open(probe_path, encoding="utf-8") as fh:
+                times = json.load(fh)
+        except (OSError, ValueError, subprocess.TimeoutExpired) as e:
+            print(f"Run {run + 1}: no startup times recorded ({e})")
+            continue
+        finally:
+            if os.path.exists(probe_path):
+                os.remove(probe_path)
+        line = [f"Run {run + 1}:"]
+        for name in samples:
+            if name in times:
+                samples[name].append(times[name] - start)
+                line.append(f"first {name} {times[name] - start:.2f} s")
+        print(" ".join(line))
+    for name, values in samples.items():
+        if values:
+            print(f"Time to first {name}: median {statistics.median(values):.2f} s, cold {values[0]:.2f} s, "
+                  f"min {min(values):.2f} s, max {max(values):.2f} s")
+    if not font_path:
+        print(f"No .ttf in {FONTS_FOLDER}; validation was not timed.")
+    return samples
 
 def kill_running_processes(exe_name):
     print_step(4, f"Checking for running {exe_name} processes to terminate...")
@@ -107,12 +272,34 @@ def kill_running_processes(exe_name):
         except (psutil.NoSuchProcess, psutil.AccessDenied):
             continue
 
-def run_installer_compiler():
+def installer_defines(profile):
+    return ["/DOnedir"] if profile == PROFILE_STARTUP else []
+
+def installer_inputs_hash(profile, exe_digest):
+    # The exe's own input hash stands in for the bundle, which PyInstaller never rebuilds byte for byte
+    options = {"defines": installer_defines(profile), "exe": exe_digest}
+    return hash_inputs([APP_ISS] + list_files(ICONS_FOLDER), options)
+
+def run_installer_compiler(profile=PROFILE_STARTUP):
     print_step(5, f"Running Inno Setup Compiler on {APP_ISS}")
     iss_dir = os.path.dirname(APP_ISS)
-    subprocess.run([ISCC_PATH, APP_ISS], check=True, cwd=iss_dir)
+    subprocess.run([ISCC_PATH] + installer_defines(profile) + [APP_ISS], check=True, cwd=iss_dir)
     print("Installer created successfully.")
 
+def build_installer(exe_path, profile=PROFILE_STARTUP, digest=None, stamps=None):
+    # Returns the installer path and whether the previous one was reused
+    installer_path = os.path.join(OUTPUT_FOLDER, EXE_NAME)
+    if stamps is not None and stamps.get("installer") == digest and os.path.exists(installer_path):
+        print_step(5, f"Installer: inputs unchanged, reusing {installer_path}")
+        return installer_path, True
+    if not os.path.exists(OUTPUT_FOLDER):
+        os.makedirs(OUTPUT_FOLDER)
+    if profile == PROFILE_ONEFILE:
+        shutil.copyfile(exe_path, installer_path)
+    # The installer is written to Output/ under the exe's name
+    run_installer_compiler(profile)
+    return installer_path, False
+
 def ask_save_location(default_filename):
     root = Tk()
     root.withdraw()
@@ -128,7 +315,30 @@ def ask_save_location(default_filename):
     root.destroy()
     return file_path
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the Centum Configuration Tool executable and installer.")
+    parser.add_argument("--profile", choices=list(PYINSTALLER_PROFILES), default=PROFILE_STARTUP,
+                        help="'startup': one folder, fast launch (default); 'onefile': single self-extracting exe")
+    parser.add_argument("--startup-runs", type=int, default=STARTUP_RUNS,
+                        help="launches to time after the build (0 to skip)")
+    parser.add_argument("--measure-only", action="store_true",
+                        help="only time the start-up of the existing build in dist/")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip PyInstaller and the installer compiler when their inputs are unchanged, and keep "
+                             "PyInstaller's work dir warm")
+    parser.add_argument("--no-save", action="store_true", help="don't ask where to save the result")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.measure_only:
+        exe_path = built_exe_path(args.profile)
+        if not os.path.exists(exe_path):
+            print(f"No {args.profile} build at {exe_path}")
+            sys.exit(1)
+        measure_startup([exe_path], max(1, args.startup_runs))
+        return
+
     print("\n" + "#" * 60)
     print("===== Centum Configuration Tool Build Script =====")
     print("#" * 60 + "\n")
@@ -140,19 +350,43 @@ def main():
         print(f"Icon file not found: {ICON_FILE}")
         sys.exit(1)
 
-    check_and_install_pyinstaller()
-    check_iscc()
-
-    exe_path = build_exe(resource_path(os.path.join('icons', 'CentumTool.ico')))
-    kill_running_processes(EXE_NAME)
+    times = []
+    start = time.perf_counter()
+    version = check_and_install_pyinstaller()
+    has_iscc = check_iscc()
+    times.append(("Checks", time.perf_counter() - start, False))
 
-    if not os.path.exists(OUTPUT_FOLDER):
-        os.makedirs(OUTPUT_FOLDER)
+    # Stamps are refreshed by every build; only incremental builds trust them
+    stamps = load_stamps()
+    icon_path = resource_path(os.path.join('icons', 'CentumTool.ico'))
+    start = time.perf_counter()
+    exe_digest = pyinstaller_inputs_hash(icon_path, args.profile, version)
+    exe_path, cached = build_exe(icon_path, args.profile, exe_digest, stamps if args.incremental else None)
+    stamps["pyinstaller"] = exe_digest
+    save_stamps(stamps)
+    times.append(("PyInstaller", time.perf_counter() - start, cached))
+    if not cached:
+        # Startup times only change with the bundle
+        kill_running_processes(EXE_NAME)
+        if args.startup_runs > 0:
+            start = time.perf_counter()
+            measure_startup([exe_path], args.startup_runs)
+            times.append(("Startup", time.perf_counter() - start, False))
 
-    exe_output_path = os.path.join(OUTPUT_FOLDER, EXE_NAME)
-    shutil.copyfile(exe_path, exe_output_path)
+    exe_output_path = exe_path
+    if has_iscc:
+        start = time.perf_counter()
+        installer_digest = installer_inputs_hash(args.profile, exe_digest)
+        exe_output_path, cached = build_installer(exe_path, args.profile, installer_digest,
+                                                  stamps if args.incremental else None)
+        stamps["installer"] = installer_digest
+        save_stamps(stamps)
+        times.append(("Installer", time.perf_counter() - start, cached))
+    print_step_times(times)
 
-    run_installer_compiler()
+    if args.no_save or not has_iscc:
+        print(f"Result: {exe_output_path}")
+        return
 
     print_step("Save", "Please select where to save your EXE file.")
     save_path = ask_save_location(EXE_NAME)
@@ -0,0 +1,330 @@
+import os
+import sys
+import json
+import time
+import glob
+import platform
+import argparse
+import tempfile
+import subprocess
+
+from font2c_lvgl import (
+    LANGUAGE_UNICODE_RANGES, BACKEND_LV_FONT_CONV, BACKEND_NATIVE, CONVERTER_BACKENDS, FORMAT_BIN, convert_fonts,
+    check_font_ranges, find_lv_font_conv,
+)
+from font_ranges import parse_merged_ranges
+from lvgl_native import compare_lvgl_outputs
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_FONTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Fonts")
+DEFAULT_SIZES = [8, 12, 16, 24, 32, 48, 72]
+DEFAULT_BPPS = [1, 2, 4, 8]
+QUICK_SIZES = [8, 24, 72]
+QUICK_BPPS = [1, 4]
+QUICK_PRESETS = ["English", "Hindi"]
+RESULTS_VERSION = 1
+
+# Time and memory regress past this relative change; tiny stages are too noisy to judge
+DEFAULT_THRESHOLD = 0.25
+MIN_SECONDS = 0.02
+MIN_RSS_KB = 2048
+
+
+def peak_rss_kb():
+    # High-water mark of this process and the converters it waited for
+    if resource is not None:
+        scale = 1 if sys.platform != "darwin" else 1.0 / 1024
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        return int(max(own, children) * scale)
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return int(getattr(info, "peak_wset", info.rss) / 1024)
+    except ImportError:
+        return None
+
+
+def output_bytes(paths):
+    return sum(os.path.getsize(p) for p in paths if os.path.isfile(p))
+
+
+def timed(func):
+    start = time.perf_counter()
+    stage = func()
+    stage["seconds"] = round(time.perf_counter() - start, 6)
+    stage["peak_rss_kb"] = peak_rss_kb()
+    return stage
+
+
+def run_case(case, backend, workdir):
+    font_path = case["font_path"]
+    range_text = LANGUAGE_UNICODE_RANGES[case["preset"]]
+    stages = {}
+    stages["validate"] = timed(lambda: {"ok": check_font_ranges(font_path, range_text)[0]})
+    if not stages["validate"]["ok"]:
+        return dict(case, stages=stages, skipped="range not supported by font")
+
+    from font_estimate import estimate_footprint
+    ranges = parse_merged_ranges(range_text)
+    stages["estimate"] = timed(lambda: {
+        "bytes": estimate_footprint(font_path, case["size"], case["bpp"], ranges)["total"]
+    })
+
+    def convert(output_format=None):
+        output = os.path.join(workdir, f"bench_{case['size']}_{case['bpp']}.c")
+        kwargs = {"output_format": output_format} if output_format else {}
+        results = convert_fonts([font_path], output, ["bench"], [case["size"]], case["bpp"], [range_text],
+                                backend, **kwargs)
+        result = results[0]
+        paths = result.get("parts") or [result["output"]]
+        stage = {"ok": result["ok"], "bytes": output_bytes(paths)}
+        if not result["ok"]:
+            stage["error"] = result["stderr"].strip()[:200]
+        return stage
+
+    stages["convert"] = timed(convert)
+    if backend == BACKEND_NATIVE:
+        stages["convert_bin"] = timed(lambda: convert(FORMAT_BIN))
+    return dict(case, stages=stages)
+
+
+def compare_case(case, workdir):
+    # Converts the case with lv_font_conv and the native backend and compares the two .c files
+    range_text = LANGUAGE_UNICODE_RANGES[case["preset"]]
+    if not check_font_ranges(case["font_path"], range_text)[0]:
+        return dict(case, skipped="range not supported by font")
+    outputs = {}
+    for backend in (BACKEND_LV_FONT_CONV, BACKEND_NATIVE):
+        folder = os.path.join(workdir, backend)
+        os.makedirs(folder, exist_ok=True)
+        result = convert_fonts([case["font_path"]], os.path.join(folder, "compare.c"), ["compare"], [case["size"]],
+                               case["bpp"], [range_text], backend)[0]
+        if not result["ok"]:
+            return dict(case, error=f"{backend}: {result['stderr'].strip()[:200]}")
+        outputs[backend] = result["output"]
+    return dict(case, comparison=compare_lvgl_outputs(outputs[BACKEND_LV_FONT_CONV], outputs[BACKEND_NATIVE]))
+
+
+def run_comparisons(cases, progress=print):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="font2c_compare_") as workdir:
+        for pos, case in enumerate(cases, 1):
+            result = compare_case(case, workdir)
+            results.append(result)
+            if progress:
+                progress(f"[{pos}/{len(cases)}] {format_comparison_case(result)}")
+    return results
+
+
+def format_comparison_case(result):
+    if result.get("error") or result.get("skipped"):
+        return f"{case_key(result)}: {result.get('error') or result['skipped']}"
+    report = result["comparison"]
+    text = (f"{case_key(result)}: {report['identical']}/{report['compared']} glyphs identical, "
+            f"{report['bitmap_mismatches']} bitmap mismatches, {len(report['problems'])} problems")
+    for problem in report["problems"][:5]:
+        text += f"\n    {problem}"
+    return text
+
+
+def build_matrix(fonts, sizes, bpps, presets):
+    return [
+        {"font": os.path.basename(font), "font_path": font, "size": size, "bpp": bpp, "preset": preset}
+        for font in fonts for preset in presets for size in sizes for bpp in bpps
+    ]
+
+
+def case_key(case):
+    return f"{case['font']}|{case['preset']}|{case['size']}px|{case['bpp']}bpp"
+
+
+def run_isolated(case, backend):
+    # A fresh interpreter per case keeps peak RSS from carrying over between cases
+    cmd = [sys.executable, os.path.abspath(__file__), "--run-case", json.dumps(case), "--backend", backend]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        return dict(case, stages={}, error=proc.stderr.strip()[-500:])
+    return json.loads(proc.stdout)
+
+
+def run_matrix(cases, backend, isolated=True, progress=print):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="font2c_bench_") as workdir:
+        for pos, case in enumerate(cases, 1):
+            if isolated:
+                result = run_isolated(case, backend)
+            else:
+                result = run_case(case, backend, workdir)
+            results.append(result)
+            if progress:
+                progress(f"[{pos}/{len(cases)}] {format_case(result)}")
+    return results
+
+
+def format_case(result):
+    if result.get("error"):
+        return f"{case_key(result)}: error {result['error'].splitlines()[-1] if result['error'] else ''}"
+    parts = []
+    for name, stage in result["stages"].items():
+        text = f"{name} {stage['seconds'] * 1000:.1f} ms"
+        if "bytes" in stage:
+            text += f" {stage['bytes']} B"
+        parts.append(text)
+    rss = max((s.get("peak_rss_kb") or 0 for s in result["stages"].values()), default=0)
+    note = f" ({result['skipped']})" if result.get("skipped") else ""
+    return f"{case_key(result)}: " + ", ".join(parts) + f", peak {rss / 1024:.1f} MB{note}"
+
+
+def results_document(results, backend):
+    return {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "backend": backend,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "cases": results,
+    }
+
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD):
+    base_cases = {case_key(c): c for c in baseline.get("cases", [])}
+    regressions = []
+    improvements = []
+    missing = []
+    for case in current.get("cases", []):
+        key = case_key(case)
+        base = base_cases.get(key)
+        if base is None:
+            missing.append(key)
+            continue
+        for name, stage in case.get("stages", {}).items():
+            old = base.get("stages", {}).get(name)
+            if not old:
+                continue
+            checks = [
+                ("seconds", MIN_SECONDS, threshold),
+                ("peak_rss_kb", MIN_RSS_KB, threshold),
+                # Output size is deterministic, so any growth is reported
+                ("bytes", 0, 0.0),
+            ]
+            for metric, floor, limit in checks:
+                new_value, old_value = stage.get(metric), old.get(metric)
+                if new_value is None or old_value is None:
+                    continue
+                delta = new_value - old_value
+                if abs(delta) <= floor:
+                    continue
+                change = delta / old_value if old_value else float("inf")
+                entry = {"case": key, "stage": name, "metric": metric, "old": old_value, "new": new_value,
+                         "change": change}
+                if change > limit:
+                    regressions.append(entry)
+                elif change < -limit:
+                    improvements.append(entry)
+    return {"regressions": regressions, "improvements": improvements, "not_in_baseline": missing}
+
+
+def format_comparison(report):
+    lines = []
+    for title, entries in (("Regressions", report["regressions"]), ("Improvements", report["improvements"])):
+        if not entries:
+            continue
+        lines.append(f"{title}:")
+        for e in entries:
+            lines.append(f"  {e['case']} {e['stage']} {e['metric']}: {e['old']} -> {e['new']} ({e['change']:+.0%})")
+    if report["not_in_baseline"]:
+        lines.append(f"{len(report['not_in_baseline'])} cases not in baseline")
+    if not report["regressions"]:
+        lines.append("No regressions against baseline")
+    return lines
+
+
+def split_list(text, convert=str):
+    return [convert(item.strip()) for item in text.split(",") if item.strip()]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="font2c_bench",
+        description="Benchmark range validation and conversion across the bundled fonts",
+    )
+    parser.add_argument("--fonts-dir", default=DEFAULT_FONTS_DIR, help="folder with the .ttf files to benchmark")
+    parser.add_argument("--sizes", help="comma-separated pixel sizes (default: 8-72)")
+    parser.add_argument("--bpp", help="comma-separated bpp values (default: 1,2,4,8)")
+    parser.add_argument("--presets", help="comma-separated LANGUAGE_UNICODE_RANGES names (default: all)")
+    parser.add_argument("--quick", action="store_true", help="small matrix for a fast check")
+    parser.add_argument("--backend", choices=CONVERTER_BACKENDS, default=BACKEND_NATIVE)
+    parser.add_argument("--in-process", action="store_true",
+                        help="run all cases in this process (faster, but peak RSS and font caches carry over)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against a results file and exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative time/memory change counted as a regression")
+    parser.add_argument("--compare", action="store_true",
+                        help="convert with lv_font_conv and the native backend and compare the outputs glyph by "
+                             "glyph instead of timing; exits 1 when any case differs")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.run_case:
+        with tempfile.TemporaryDirectory(prefix="font2c_bench_") as workdir:
+            print(json.dumps(run_case(json.loads(args.run_case), args.backend, workdir)))
+        return 0
+
+    fonts = sorted(glob.glob(os.path.join(args.fonts_dir, "*.ttf")))
+    if not fonts:
+        print(f"error: no .ttf files in {args.fonts_dir}", file=sys.stderr)
+        return 2
+    sizes = split_list(args.sizes, int) if args.sizes else (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    bpps = split_list(args.bpp, int) if args.bpp else (QUICK_BPPS if args.quick else DEFAULT_BPPS)
+    presets = split_list(args.presets) if args.presets else (QUICK_PRESETS if args.quick else list(LANGUAGE_UNICODE_RANGES))
+    unknown = [p for p in presets if p not in LANGUAGE_UNICODE_RANGES]
+    if unknown:
+        print(f"error: unknown presets: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    cases = build_matrix(fonts, sizes, bpps, presets)
+    if args.compare:
+        if find_lv_font_conv() is None:
+            print("error: --compare needs lv_font_conv in PATH", file=sys.stderr)
+            return 2
+        results = run_comparisons(cases)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as fh:
+                json.dump(results_document(results, "compare"), fh, indent=2)
+            print(f"Results written to {args.output}")
+        compared = [r for r in results if "comparison" in r]
+        differing = sum(1 for r in compared if r["comparison"]["problems"])
+        errors = sum(1 for r in results if r.get("error"))
+        print(f"{len(compared) - differing} of {len(compared)} compared cases equivalent, {errors} failed to convert, "
+              f"{len(results) - len(compared) - errors} skipped")
+        return 1 if differing or errors else 0
+    results = run_matrix(cases, args.backend, isolated=not args.in_process)
+    document = results_document(results, args.backend)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(document, fh, indent=2)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        report = compare_results(document, baseline, args.threshold)
+        for line in format_comparison(report):
+            print(line)
+        if report["regressions"]:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
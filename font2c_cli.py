@@ -0,0 +1,506 @@
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+
+import font_trace
+
+from font2c_lvgl import (
+    LANGUAGE_UNICODE_RANGES, BACKEND_LV_FONT_CONV, BACKEND_NATIVE, CONVERTER_BACKENDS, FORMAT_C, FORMAT_BIN, OUTPUT_FORMATS,
+    normalize_path, convert_fonts, format_conversion_failure, check_font_ranges,
+    compression_report_for, cmap_report_lines, kerning_report_lines,
+)
+from lvgl_cmap import CMAP_POLICY_FLASH, CMAP_POLICIES
+from lvgl_kerning import KERN_POLICY_FLASH, KERN_POLICIES
+from font_ranges import parse_merged_ranges, merge_ranges, format_ranges
+from lvgl_compress import COMPRESS_NONE, COMPRESSION_SCHEMES, format_compression_report
+
+EXIT_OK = 0
+EXIT_CONVERSION_FAILED = 1
+EXIT_USAGE = 2
+EXIT_VALIDATION_FAILED = 3
+EXIT_MISSING_TOOL = 4
+
+# Bit depths lv_font_fmt_txt can draw
+VALID_BPP = (1, 2, 3, 4, 8)
+
+
+class ManifestError(ValueError):
+    pass
+
+
+def read_manifest_file(path):
+    if path.lower().endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            import tomli as tomllib
+        with open(path, "rb") as fh:
+            return tomllib.load(fh)
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def block_range_text(block, label):
+    ranges = block.get("ranges", [])
+    if isinstance(ranges, str):
+        ranges = [ranges]
+    ranges = list(ranges)
+    for lang in block.get("languages", []):
+        if lang not in LANGUAGE_UNICODE_RANGES:
+            raise ManifestError(f"{label}: unknown language '{lang}'")
+        ranges.append(LANGUAGE_UNICODE_RANGES[lang])
+    if not ranges and not block.get("corpus"):
+        raise ManifestError(f"{label}: needs 'ranges', 'languages' or 'corpus'")
+    return ",".join(str(r) for r in ranges)
+
+
+def as_list(value):
+    return [value] if isinstance(value, str) else list(value or [])
+
+
+def load_manifest(path):
+    try:
+        data = read_manifest_file(path)
+    except (ValueError, OSError) as e:
+        raise ManifestError(f"cannot read manifest {path}: {e}")
+    base_dir = os.path.dirname(os.path.abspath(path))
+    bpp = block_bpp(data, "manifest", 1)
+    fonts = data.get("fonts")
+    if not isinstance(fonts, list) or not fonts:
+        raise ManifestError("manifest needs a non-empty 'fonts' list")
+    blocks = []
+    for idx, block in enumerate(fonts):
+        label = f"fonts[{idx}]"
+        if "path" not in block:
+            raise ManifestError(f"{label}: missing 'path'")
+        try:
+            size = int(block.get("size", 16))
+        except (TypeError, ValueError):
+            raise ManifestError(f"{label}: 'size' must be an integer")
+        compression = block.get("compression", COMPRESS_NONE)
+        if compression not in COMPRESSION_SCHEMES:
+            raise ManifestError(f"{label}: 'compression' must be one of {', '.join(COMPRESSION_SCHEMES)}")
+        if block.get("shaping") and not block.get("corpus"):
+            raise ManifestError(f"{label}: 'shaping' needs a 'corpus' to shape")
+        blocks.append({
+            "font_path": os.path.join(base_dir, block["path"]),
+            "font_name": str(block.get("name", "")),
+            "font_size": size,
+            "range": block_range_text(block, label),
+            "corpus": [os.path.join(base_dir, p) for p in as_list(block.get("corpus"))],
+            "always_include": ",".join(as_list(block.get("always_include"))),
+            "compression": compression,
+            "bpp": block_bpp(block, label, bpp),
+            "shaping": bool(block.get("shaping", False)),
+        })
+    output = data.get("output")
+    if output:
+        output = os.path.join(base_dir, output)
+    return {
+        "output": output,
+        "backend": data.get("backend", BACKEND_LV_FONT_CONV),
+        "combined": bool(data.get("combined", False)),
+        "split_bitmap_bytes": split_bitmap_bytes(data.get("split_bitmap_bytes")),
+        "format": data.get("format", FORMAT_C),
+        "cmap_policy": data.get("cmap_policy", CMAP_POLICY_FLASH),
+        "kern_policy": data.get("kern_policy", KERN_POLICY_FLASH),
+        "kern_min_px": kern_min_px(data.get("kern_min_px", 0)),
+        "bpp": bpp,
+        "fonts": blocks,
+    }
+
+
+def block_bpp(data, label, default):
+    # A block's own "bpp" overrides the manifest-wide one
+    try:
+        bpp = int(data.get("bpp", default))
+    except (TypeError, ValueError):
+        raise ManifestError(f"{label}: 'bpp' must be an integer")
+    if bpp not in VALID_BPP:
+        raise ManifestError(f"{label}: 'bpp' must be one of {', '.join(str(b) for b in VALID_BPP)}")
+    return bpp
+
+
+def split_bitmap_bytes(value):
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ManifestError("'split_bitmap_bytes' must be an integer")
+    if value <= 0:
+        raise ManifestError("'split_bitmap_bytes' must be positive")
+    return value
+
+
+def kern_min_px(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ManifestError("'kern_min_px' must be a number")
+    if value < 0:
+        raise ManifestError("'kern_min_px' can't be negative")
+    return value
+
+
+def default_output(blocks):
+    output_name = next((b["font_name"] for b in blocks if b["font_name"]), "file_name")
+    return os.path.join(os.path.dirname(normalize_path(blocks[0]["font_path"])), f"{output_name}.c")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="font2c_lvgl",
+        description="Convert TTF fonts to LVGL C sources from a JSON/TOML job manifest, without the GUI."
+    )
+    parser.add_argument("manifest", help="JSON or TOML manifest listing the font blocks")
+    parser.add_argument("--backend", choices=CONVERTER_BACKENDS, help="override the manifest's converter backend")
+    parser.add_argument("--output", help="override the manifest's output .c path")
+    parser.add_argument("--jobs", type=int, default=None, help="parallel conversions (default: CPU count)")
+    parser.add_argument("--no-cache", action="store_true", help="always run the converter")
+    parser.add_argument("--no-worker", action="store_true",
+                        help="start lv_font_conv once per font instead of reusing a resident worker")
+    parser.add_argument("--check-only", action="store_true", help="validate ranges and stop")
+    parser.add_argument("--combined", action="store_true",
+                        help="write all blocks to one .c file with a shared, deduplicated bitmap pool (native backend)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS,
+                        help="'c' source arrays or a memory-mappable 'bin' blob (native backend)")
+    parser.add_argument("--split-bitmaps", type=int, metavar="BYTES",
+                        help="split each font into .c files of about BYTES bitmap bytes (native backend)")
+    parser.add_argument("--cmap-policy", choices=list(CMAP_POLICIES),
+                        help="optimize glyph lookup tables for 'flash' size, lookup 'speed' or 'balanced' (native backend)")
+    parser.add_argument("--kern-policy", choices=list(KERN_POLICIES),
+                        help="emit kerning as a pair list or class matrix for 'flash' size, lookup 'speed' or "
+                             "'balanced' (native backend)")
+    parser.add_argument("--kern-min-px", type=float, metavar="PX",
+                        help="drop kerning pairs smaller than PX pixels at the target size (native backend)")
+    parser.add_argument("--trace", metavar="PATH",
+                        help=f"write JSON-lines trace events to PATH ('-' for stderr; env: {font_trace.TRACE_ENV})")
+    parser.add_argument("--trace-chrome", metavar="PATH",
+                        help=f"also write a Chrome trace (chrome://tracing, Perfetto) to PATH (env: {font_trace.CHROME_ENV})")
+    parser.add_argument("--no-report", action="store_true", help="skip the bitmap compression, cmap and kerning reports")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and rebuild the blocks whose manifest entry, font or corpus changes")
+    return parser
+
+
+def apply_corpus_subsets(blocks, only=None):
+    import font_subset
+    for idx, block in enumerate(blocks):
+        if not block["corpus"] or (only is not None and idx not in only):
+            continue
+        label = block["font_name"] or f"font{idx + 1}"
+        try:
+            codes = font_subset.corpus_codepoints(block["corpus"])
+            limit = parse_merged_ranges(block["range"]) if block["range"] else None
+            always = font_subset.DEFAULT_ALWAYS_INCLUDE
+            if block["always_include"]:
+                always = parse_merged_ranges(block["always_include"])
+        except (OSError, ValueError) as e:
+            raise ManifestError(f"{label}: {e}")
+        ranges = font_subset.subset_ranges(codes, limit, always)
+        if not ranges:
+            raise ManifestError(f"{label}: corpus has no characters inside the block's ranges")
+        block["range"] = format_ranges(ranges)
+        print(f"[{label}] Subset ranges: {block['range']}")
+        full_ranges = limit
+        if full_ranges is None:
+            # Without ranges or languages the savings are measured against the presets the corpus uses
+            presets = {name: parse_merged_ranges(text) for name, text in LANGUAGE_UNICODE_RANGES.items()}
+            names, preset_ranges = font_subset.preset_baseline(codes, presets)
+            if not names:
+                print(f"[{label}] Subset savings: no ranges, languages or language preset cover the corpus, "
+                      f"so there is no full block to compare against")
+                continue
+            print(f"[{label}] Compared with the {', '.join(names)} preset ranges")
+            full_ranges = merge_ranges(preset_ranges + ranges)
+        try:
+            report = font_subset.subset_report(block["font_path"], block["font_size"], block["bpp"], full_ranges, ranges)
+        except Exception as e:
+            print(f"[{label}] Subset report unavailable: {e}", file=sys.stderr)
+            continue
+        for line in font_subset.format_subset_report(report):
+            print(f"[{label}] {line}")
+
+
+def validate_blocks(blocks, only=None):
+    all_supported = True
+    for idx, block in enumerate(blocks):
+        if only is not None and idx not in only:
+            continue
+        ok, messages = check_font_ranges(block["font_path"], block["range"])
+        label = block["font_name"] or f"font{idx + 1}"
+        for msg, is_success in messages:
+            print(f"[{label}] {msg}", file=sys.stdout if is_success else sys.stderr)
+        all_supported = all_supported and ok
+    return all_supported
+
+
+def print_compression_report(result):
+    try:
+        report = compression_report_for(result)
+    except Exception as e:
+        print(f"  compression report unavailable: {e}", file=sys.stderr)
+        return
+    print(f"  compression: {result['compression']}")
+    for line in format_compression_report(report):
+        print(f"  {line}")
+
+
+def print_cmap_report(result):
+    try:
+        lines = cmap_report_lines(result)
+    except Exception as e:
+        print(f"  cmap report unavailable: {e}", file=sys.stderr)
+        return
+    for line in lines:
+        print(f"  {line}")
+
+
+def print_kerning_report(result):
+    try:
+        lines = kerning_report_lines(result)
+    except Exception as e:
+        print(f"  kerning report unavailable: {e}", file=sys.stderr)
+        return
+    for line in lines:
+        print(f"  {line}")
+
+
+def print_binary_check(result):
+    from lvgl_binary import verify_binary_font
+    try:
+        check = verify_binary_font(
+            result["output"], result["font_path"], result["font_size"], result["bpp"],
+            parse_merged_ranges(result["range"])
+        )
+    except (OSError, ValueError) as e:
+        print(f"  binary check failed: {e}")
+        return
+    print(f"  mmap reader: {check['checked']} glyphs looked up, {len(check['problems'])} problems")
+    for problem in check["problems"][:10]:
+        print(f"    {problem}")
+
+
+def write_shaped_fonts(blocks, results, report=True):
+    # Companion fonts for the blocks with "shaping": their glyphs and cluster tables come from the
+    # corpus, and the block's own font is their fallback
+    import lvgl_shaping
+    from lvgl_native import c_font_name
+    ok = True
+    for result in results:
+        block = blocks[result["index"]]
+        if not block["shaping"] or not result["ok"]:
+            continue
+        name = c_font_name(result["font_name"], result["output"])
+        path = lvgl_shaping.shaped_output_path(result["output"], f"{name}_shaped")
+        try:
+            stats = lvgl_shaping.write_shaped_font(
+                block["font_path"], block["corpus"], path, f"{name}_shaped", block["font_size"], block["bpp"],
+                block["compression"], fallback=name
+            )
+        except Exception as e:
+            print(f"[{name}] Shaping failed: {e}", file=sys.stderr)
+            ok = False
+            continue
+        print(f"Generated {path}")
+        if report:
+            for line in lvgl_shaping.format_shaping_report(stats):
+                print(f"  {line}")
+    return ok
+
+
+def open_cache(disabled):
+    if disabled:
+        return None
+    from font_cache import ConversionCache
+    try:
+        return ConversionCache()
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.trace or args.trace_chrome:
+        font_trace.enable(args.trace, args.trace_chrome)
+    else:
+        font_trace.enable_from_env()
+    try:
+        if args.watch:
+            return watch(args)
+        with font_trace.span("run", manifest=args.manifest) as fields:
+            fields["exit_code"] = code = run(args)
+        return code
+    finally:
+        lines = font_trace.finish()
+        if lines:
+            print("", file=sys.stderr)
+            for line in lines:
+                print(line, file=sys.stderr)
+        font_trace.disable()
+
+
+def watch(args):
+    # Polls the manifest and each block's font and corpus files; after a change settles, only
+    # the affected blocks are validated and converted again, and outputs are replaced by rename
+    import font_watch
+    watcher = font_watch.BlockWatcher()
+    manifest_signature = None
+    manifest = None
+    code = EXIT_OK
+    print(f"Watching {args.manifest} and the files it references (Ctrl+C to stop)")
+    try:
+        while True:
+            signature = font_watch.file_signature(args.manifest)
+            if signature != manifest_signature:
+                manifest_signature = signature
+                try:
+                    manifest = load_manifest(args.manifest)
+                except ManifestError as e:
+                    print(f"error: {e}", file=sys.stderr)
+                    manifest = None
+            options = {k: v for k, v in manifest.items() if k != "fonts"} if manifest else None
+            stale = watcher.poll(manifest["fonts"], options) if manifest else []
+            if stale:
+                watcher.mark_built()
+                labels = ", ".join(manifest["fonts"][idx]["font_name"] or f"font{idx + 1}" for idx in stale)
+                print(f"\n[{time.strftime('%H:%M:%S')}] Rebuilding {labels}")
+                with font_trace.span("run", manifest=args.manifest, blocks=len(stale)) as fields:
+                    fields["exit_code"] = code = run(args, copy.deepcopy(manifest), set(stale), atomic=True)
+            time.sleep(font_watch.POLL_INTERVAL)
+    except KeyboardInterrupt:
+        return code
+
+
+def run(args, manifest=None, only=None, atomic=False):
+    if manifest is None:
+        try:
+            manifest = load_manifest(args.manifest)
+        except ManifestError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return EXIT_USAGE
+    backend = args.backend or manifest["backend"]
+    if backend not in CONVERTER_BACKENDS:
+        print(f"error: unknown backend '{backend}'", file=sys.stderr)
+        return EXIT_USAGE
+    combined = args.combined or manifest["combined"]
+    if combined and backend != BACKEND_NATIVE:
+        print("error: combined output needs the native backend (--backend native)", file=sys.stderr)
+        return EXIT_USAGE
+    if args.split_bitmaps is not None and args.split_bitmaps <= 0:
+        print("error: --split-bitmaps must be positive", file=sys.stderr)
+        return EXIT_USAGE
+    split_bytes = args.split_bitmaps or manifest["split_bitmap_bytes"]
+    if split_bytes and (backend != BACKEND_NATIVE or combined):
+        print("error: splitting bitmaps needs the native backend and no combined output", file=sys.stderr)
+        return EXIT_USAGE
+    output_format = args.format or manifest["format"]
+    if output_format not in OUTPUT_FORMATS:
+        print(f"error: unknown output format '{output_format}'", file=sys.stderr)
+        return EXIT_USAGE
+    if output_format == FORMAT_BIN and (backend != BACKEND_NATIVE or combined or split_bytes):
+        print("error: binary output needs the native backend without --combined or --split-bitmaps", file=sys.stderr)
+        return EXIT_USAGE
+    cmap_policy = args.cmap_policy or manifest["cmap_policy"]
+    if cmap_policy not in CMAP_POLICIES:
+        print(f"error: unknown cmap policy '{cmap_policy}'", file=sys.stderr)
+        return EXIT_USAGE
+    if cmap_policy != CMAP_POLICY_FLASH and backend != BACKEND_NATIVE:
+        print("error: cmap policies other than 'flash' need the native backend", file=sys.stderr)
+        return EXIT_USAGE
+    kern_policy = args.kern_policy or manifest["kern_policy"]
+    if kern_policy not in KERN_POLICIES:
+        print(f"error: unknown kerning policy '{kern_policy}'", file=sys.stderr)
+        return EXIT_USAGE
+    min_px = manifest["kern_min_px"] if args.kern_min_px is None else args.kern_min_px
+    if min_px < 0:
+        print("error: --kern-min-px can't be negative", file=sys.stderr)
+        return EXIT_USAGE
+    if (kern_policy != KERN_POLICY_FLASH or min_px) and backend != BACKEND_NATIVE:
+        print("error: kerning policies and --kern-min-px need the native backend", file=sys.stderr)
+        return EXIT_USAGE
+    blocks = manifest["fonts"]
+    if any(b["shaping"] for idx, b in enumerate(blocks) if only is None or idx in only):
+        if output_format != FORMAT_C:
+            print("error: shaping writes C sources and cannot be combined with --format bin", file=sys.stderr)
+            return EXIT_USAGE
+        import lvgl_shaping
+        try:
+            lvgl_shaping.require_harfbuzz()
+        except RuntimeError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return EXIT_MISSING_TOOL
+    try:
+        apply_corpus_subsets(blocks, only)
+    except ManifestError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    if not validate_blocks(blocks, only):
+        return EXIT_VALIDATION_FAILED
+    if args.check_only:
+        return EXIT_OK
+
+    output = args.output or manifest["output"] or default_output(blocks)
+    cache = open_cache(args.no_cache)
+    try:
+        results = convert_fonts(
+            [b["font_path"] for b in blocks],
+            output,
+            [b["font_name"] for b in blocks],
+            [b["font_size"] for b in blocks],
+            [b["bpp"] for b in blocks],
+            [b["range"] for b in blocks],
+            backend,
+            max_workers=args.jobs,
+            cache=cache,
+            compressions=[b["compression"] for b in blocks],
+            combined=combined,
+            split_bytes=split_bytes,
+            output_format=output_format,
+            use_worker=not args.no_worker,
+            cmap_policy=cmap_policy,
+            atomic=atomic,
+            only=only,
+            kern_policy=kern_policy,
+            kern_min_px=min_px,
+        )
+    except FileNotFoundError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_MISSING_TOOL
+
+    for result in results:
+        if result["ok"]:
+            note = " (cached)" if result.get("cached") else ""
+            print(f"Generated {result['output']}{note}")
+            for part in result.get("parts", [])[1:]:
+                print(f"  + {part}")
+            if not args.no_report:
+                print_compression_report(result)
+                print_cmap_report(result)
+                print_kerning_report(result)
+                if output_format == FORMAT_BIN:
+                    print_binary_check(result)
+        else:
+            print(format_conversion_failure(result), file=sys.stderr)
+    shaped = write_shaped_fonts(blocks, results, not args.no_report)
+    dedup = next((r["dedup"] for r in results if r.get("dedup")), None)
+    if dedup:
+        from lvgl_combined import format_dedup_report
+        for line in format_dedup_report(dedup):
+            print(line)
+    if cache is not None and not combined:
+        stats = cache.stats()
+        print(f"Cache: {stats['hits']} hits, {stats['misses']} misses")
+    if not args.no_report:
+        from font_pool import pool_stats, format_pool_stats
+        print(format_pool_stats(pool_stats()))
+    return EXIT_OK if shaped and all(r["ok"] for r in results) else EXIT_CONVERSION_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,887 @@
+import os
+import sys
+import json
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk, Toplevel
+
+from font2c_lvgl import (
+    MAX_EXTRA_FONTS, LANGUAGE_UNICODE_RANGES, BACKEND_LV_FONT_CONV, BACKEND_NATIVE, CONVERTER_BACKENDS,
+    FORMAT_C, FORMAT_BIN, OUTPUT_FORMATS,
+    normalize_path, convert_fonts, format_conversion_failure, check_font_ranges, compression_report_for,
+    cmap_report_lines, kerning_report_lines,
+)
+from font_ranges import parse_merged_ranges, merge_ranges, format_ranges, covers
+from lvgl_compress import COMPRESS_NONE, COMPRESSION_SCHEMES, format_compression_report
+from lvgl_cmap import CMAP_POLICY_FLASH, CMAP_POLICIES
+from lvgl_kerning import KERN_POLICY_FLASH, KERN_POLICIES
+from font_cache import ConversionCache
+import font_trace
+from font_coverage import script_coverage
+from font_watch import BlockWatcher, POLL_INTERVAL
+
+BPP_CHOICES = ['1', '2', '3', '4', '8']
+# Browsing to a font pre-selects the languages it covers at least this well
+SCRIPT_SELECT_PERCENT = 95
+LANGUAGE_PRESETS = {lang: parse_merged_ranges(text) for lang, text in LANGUAGE_UNICODE_RANGES.items()}
+# build_installer.py times start-up by launching the app with these set
+STARTUP_PROBE_ENV = "FONT2C_STARTUP_PROBE"
+STARTUP_FONT_ENV = "FONT2C_STARTUP_FONT"
+# Shown while the native backend is selected, until font2c_bench.py --compare has passed against lv_font_conv
+NATIVE_BACKEND_NOTE = ("Native converter: not yet verified against lv_font_conv output "
+                       "(check with font2c_bench.py --compare)")
+# Cmap scans for the language list run here so picking a large font never blocks the UI
+_coverage_pool = ThreadPoolExecutor(max_workers=1)
+PREVIEW_TEXT = "Hello 123"
+# Scrolling preview moves one LED column per frame
+PREVIEW_FRAME_MS = 50
+
+def open_link(url):
+    import webbrowser
+    webbrowser.open_new(url)
+
+class StatusText(tk.Text):
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.config(state="disabled", bg="#f0f0f0", relief=tk.FLAT, height=7, wrap="word")
+        self.tag_configure("success", foreground="green")
+        self.tag_configure("error", foreground="red")
+
+    def set_status_messages(self, messages):
+        self.config(state="normal")
+        self.delete("1.0", "end")
+        for msg, is_success in messages:
+            tag = "success" if is_success else "error"
+            self.insert("end", msg + "\n", tag)
+        self.config(state="disabled")
+
+    def append_status_message(self, msg, is_success):
+        self.config(state="normal")
+        self.insert("end", msg + "\n", "success" if is_success else "error")
+        self.see("end")
+        self.config(state="disabled")
+
+def show_range_popup(messages, title="Font Range Support"):
+    popup = Toplevel()
+    popup.title(title)
+    popup.minsize(430, 220)
+    frame = tk.Frame(popup, padx=20, pady=22)
+    frame.pack(expand=True, fill="both")
+    for msg, is_success in messages:
+        color = "green" if is_success else "red"
+        label = tk.Label(frame, text=msg, fg=color, font=("Segoe UI", 12, "bold"))
+        label.pack(anchor="w", pady=3)
+    tk.Button(frame, text="OK", command=popup.destroy, width=14, font=("Segoe UI", 11, "bold")).pack(pady=13)
+    popup.transient()
+    popup.grab_set()
+    frame.focus_set()
+    return
+
+class FontFileEntry:
+    def __init__(self, master, index, remove_callback=None, bpp='1', estimate_callback=None):
+        self.master = master
+        self.index = index
+        self.remove_callback = remove_callback
+        self.estimate_callback = estimate_callback
+        self.estimate = None
+        self.estimate_job = None
+        self.languages = list(LANGUAGE_UNICODE_RANGES)
+        self.coverage = None
+        self.coverage_future = None
+        self.preselect_languages = False
+        box_width = 1200
+        self.frame = tk.Frame(
+            master, relief=tk.GROOVE, bd=2, padx=18, pady=18,
+            width=box_width, height=320, bg="#f9f9f9"
+        )
+        self.frame.pack_propagate(False)
+        box_inner = tk.Frame(self.frame, bg="#f9f9f9", width=box_width-30)
+        box_inner.pack(expand=True)
+        # Row 1: Name, Font Size and TTF file + Browse in one line, centered
+        row1 = tk.Frame(box_inner, bg="#f9f9f9")
+        row1.pack(fill="x", pady=8)
+        row1.grid_columnconfigure(0, weight=1)
+        for col in range(10):
+            row1.grid_columnconfigure(col, weight=1)
+        tk.Label(row1, text="Name:", bg="#f9f9f9").grid(row=0, column=0, sticky="e", padx=3)
+        self.font_name_var = tk.StringVar(value="file_name")
+        self.font_name_entry = tk.Entry(row1, textvariable=self.font_name_var, width=22)
+        self.font_name_entry.grid(row=0, column=1, padx=8)
+        tk.Label(row1, text="Font Size (px):", bg="#f9f9f9").grid(row=0, column=2, sticky="e", padx=3)
+        self.font_size_var = tk.IntVar(value=1)
+        self.font_size_spin = tk.Spinbox(row1, from_=1, to=72, textvariable=self.font_size_var, width=7)
+        self.font_size_spin.grid(row=0, column=3, padx=8)
+        tk.Label(row1, text="Bpp:", bg="#f9f9f9").grid(row=0, column=4, sticky="e", padx=3)
+        self.bpp_var = tk.StringVar(value=bpp)
+        ttk.Combobox(row1, textvariable=self.bpp_var, values=BPP_CHOICES, width=3,
+                     state='readonly').grid(row=0, column=5, padx=8)
+        tk.Label(row1, text=f"TTF file {index + 1}:", bg="#f9f9f9").grid(row=0, column=6, sticky="e", padx=3)
+        self.path_var = tk.StringVar()
+        self.path_entry = tk.Entry(row1, textvariable=self.path_var, width=40)
+        self.path_entry.grid(row=0, column=7, padx=8)
+        browse_btn = tk.Button(row1, text="Browse", command=self.browse_file)
+        browse_btn.grid(row=0, column=8, padx=6)
+        if remove_callback and index != 0:
+            self.remove_btn = tk.Button(row1, text="🗑️ Remove", command=self.remove_self)
+            self.remove_btn.grid(row=0, column=9, padx=8)
+        # Row 2: Language selector (multiselect Listbox + vertical scrollbar), centered
+        row2 = tk.Frame(box_inner, bg="#f9f9f9")
+        row2.pack(fill="x", pady=6)
+        tk.Label(row2, text="Language(s):", bg="#f9f9f9", anchor="center").pack(side="top", anchor="n")
+        listbox_frame = tk.Frame(row2, bg="#f9f9f9")
+        listbox_frame.pack(side="top", anchor="center")
+        self.lang_listbox = tk.Listbox(
+            listbox_frame, selectmode="multiple", exportselection=False,
+            height=5, width=24, font=("Segoe UI", 10)
+        )
+        scrollbar = tk.Scrollbar(listbox_frame, orient="vertical", command=self.lang_listbox.yview)
+        self.lang_listbox.config(yscrollcommand=scrollbar.set)
+        self.lang_listbox.pack(side="left", anchor="center")
+        scrollbar.pack(side="left", fill="y", anchor="center")
+        tk.Label(listbox_frame, text="Compression:", bg="#f9f9f9").pack(side="left", padx=(24, 3))
+        self.compression_var = tk.StringVar(value=COMPRESS_NONE)
+        ttk.Combobox(listbox_frame, textvariable=self.compression_var, values=list(COMPRESSION_SCHEMES),
+                     width=13, state='readonly').pack(side="left", anchor="center")
+        for lang in self.languages:
+            self.lang_listbox.insert("end", lang)
+        self.lang_listbox.selection_set(0)
+        self.suppress_range_event = False
+        self.lang_listbox.bind("<<ListboxSelect>>", self.on_language_select)
+        # Row 3: Range box, centered
+        row3 = tk.Frame(box_inner, bg="#f9f9f9")
+        row3.pack(fill="x", pady=10)
+        tk.Label(row3, text="Range (comma/line-separated):",
+                 bg="#f9f9f9", anchor="center").pack(anchor="center")
+        self.range_text = tk.Text(row3, height=3, width=115)
+        self.range_text.insert("1.0", LANGUAGE_UNICODE_RANGES["English"])
+        self.range_text.pack(anchor="center", pady=(0, 4))
+        self.range_text.bind('<KeyRelease>', self.on_range_manual_edit)
+        # Row 4: Unicode Character Ranges link, centered
+        link_frame = tk.Frame(box_inner, bg="#f9f9f9")
+        link_frame.pack(fill="x", pady=3)
+        link = tk.Label(
+            link_frame, text="Unicode Character Ranges", fg="blue", cursor="hand2",
+            bg="#f9f9f9", anchor="center"
+        )
+        link.pack(anchor="center")
+        link.bind("<Button-1>", lambda e: open_link("https://jrgraphix.net/research/unicode.php"))
+        self.estimate_var = tk.StringVar(value="Flash estimate: select a font file")
+        tk.Label(box_inner, textvariable=self.estimate_var, bg="#f9f9f9", fg="#444444").pack(anchor="center")
+        self.path_var.trace_add("write", lambda *args: self.schedule_estimate())
+        self.path_var.trace_add("write", lambda *args: self.start_coverage())
+        self.font_size_var.trace_add("write", lambda *args: self.schedule_estimate())
+        self.bpp_var.trace_add("write", lambda *args: self.schedule_estimate())
+        # Status at bottom
+        self.status_text = StatusText(box_inner)
+        self.status_text.pack(fill="x", pady=2)
+
+    def on_language_select(self, event=None):
+        if self.suppress_range_event:
+            return
+        selected_indices = self.lang_listbox.curselection()
+        unicode_ranges = []
+        for idx in selected_indices:
+            unicode_ranges += LANGUAGE_PRESETS[self.languages[idx]]
+        self.suppress_range_event = True
+        self.range_text.delete("1.0", "end")
+        self.range_text.insert("1.0", format_ranges(merge_ranges(unicode_ranges)))
+        self.suppress_range_event = False
+        self.schedule_estimate()
+
+    def on_range_manual_edit(self, event):
+        if self.suppress_range_event:
+            return
+        self.schedule_estimate()
+        try:
+            ranges = parse_merged_ranges(self.range_text.get("1.0", "end"))
+        except ValueError:
+            return
+        self.suppress_range_event = True
+        self.lang_listbox.selection_clear(0, 'end')
+        for idx, lang in enumerate(LANGUAGE_UNICODE_RANGES):
+            start, end = parse_merged_ranges(LANGUAGE_UNICODE_RANGES[lang])[0]
+            if covers(ranges, start, end):
+                self.lang_listbox.selection_set(idx)
+        self.suppress_range_event = False
+
+    def schedule_estimate(self, delay=300):
+        # Debounced so typing in the range box does not re-estimate on every key
+        if self.estimate_job is not None:
+            self.frame.after_cancel(self.estimate_job)
+        self.estimate_job = self.frame.after(delay, self.update_estimate)
+
+    def update_estimate(self):
+        self.estimate_job = None
+        data = self.get_font_data()
+        self.estimate = None
+        try:
+            font_path = normalize_path(data["font_path"]) if data["font_path"] else ""
+            if not os.path.isfile(font_path):
+                self.estimate_var.set("Flash estimate: select a font file")
+            else:
+                # The estimator pulls in FreeType and the native converter, so it loads on first use
+                from font_estimate import estimate_footprint, format_estimate
+                ranges = parse_merged_ranges(data["range"])
+                self.estimate = estimate_footprint(font_path, data["font_size"], data["bpp"], ranges)
+                self.estimate_var.set("Flash estimate: " + format_estimate(self.estimate))
+        except (ValueError, tk.TclError):
+            self.estimate_var.set("Flash estimate: invalid size or range")
+        except Exception as e:
+            self.estimate_var.set(f"Flash estimate unavailable: {e}")
+        if self.estimate_callback:
+            self.estimate_callback()
+
+    def start_coverage(self):
+        font_path = self.path_var.get().strip()
+        self.coverage = None
+        self.coverage_future = None
+        self.annotate_languages()
+        if not os.path.isfile(font_path):
+            self.preselect_languages = False
+            return
+        self.coverage_future = _coverage_pool.submit(script_coverage, normalize_path(font_path), LANGUAGE_PRESETS)
+        self.poll_coverage(self.coverage_future)
+
+    def poll_coverage(self, future):
+        # A newer file choice or removing the block drops the pending result
+        if future is not self.coverage_future:
+            return
+        if not future.done():
+            self.frame.after(50, self.poll_coverage, future)
+            return
+        self.coverage_future = None
+        try:
+            self.coverage = future.result()
+        except Exception:
+            # Unreadable fonts are reported by the flash estimate line
+            self.coverage = None
+        self.annotate_languages()
+        if self.coverage and self.preselect_languages:
+            self.select_supported_languages()
+        self.preselect_languages = False
+
+    def annotate_languages(self):
+        selected = self.lang_listbox.curselection()
+        self.suppress_range_event = True
+        self.lang_listbox.delete(0, "end")
+        for idx, lang in enumerate(self.languages):
+            report = self.coverage.get(lang) if self.coverage else None
+            if report is None:
+                self.lang_listbox.insert("end", lang)
+                continue
+            self.lang_listbox.insert("end", f"{lang} ({report['percent']:.0f}%)")
+            if not report["supported"]:
+                self.lang_listbox.itemconfig(idx, foreground="#999999")
+        for idx in selected:
+            self.lang_listbox.selection_set(idx)
+        self.suppress_range_event = False
+
+    def select_supported_languages(self):
+        supported = [idx for idx, lang in enumerate(self.languages)
+                     if self.coverage[lang]["percent"] >= SCRIPT_SELECT_PERCENT]
+        if not supported:
+            best = max(self.languages, key=lambda lang: self.coverage[lang]["percent"])
+            self.set_status([(
+                f"No language is {SCRIPT_SELECT_PERCENT}% covered by this font "
+                f"(best: {best} {self.coverage[best]['percent']:.0f}%)", False
+            )])
+            return
+        self.lang_listbox.selection_clear(0, "end")
+        for idx in supported:
+            self.lang_listbox.selection_set(idx)
+        self.on_language_select()
+        names = ", ".join(self.languages[idx] for idx in supported)
+        self.set_status([(f"Selected languages this font covers: {names}", True)])
+
+    def browse_file(self):
+        filename = filedialog.askopenfilename(filetypes=[("TTF Font Files", "*.ttf")])
+        if filename:
+            if not filename.lower().endswith('.ttf'):
+                messagebox.showerror("Invalid File", "TTF file type is expected.")
+                return
+            self.preselect_languages = True
+            self.path_var.set(filename)
+
+    def remove_self(self):
+        if self.remove_callback:
+            self.coverage_future = None
+            if self.estimate_job is not None:
+                self.frame.after_cancel(self.estimate_job)
+            self.frame.destroy()
+            self.remove_callback(self)
+
+    def get_font_data(self):
+        return {
+            "font_path": self.path_var.get().strip(),
+            "range": self.range_text.get("1.0", "end").strip(),
+            "font_name": self.font_name_var.get().strip(),
+            "font_size": self.font_size_var.get() or 1,
+            "bpp": int(self.bpp_var.get()),
+            "compression": self.compression_var.get(),
+            "widget": self,
+        }
+
+    def set_status(self, messages):
+        self.status_text.set_status_messages(messages)
+
+    def append_status(self, msg, is_success=True):
+        self.status_text.append_status_message(msg, is_success)
+
+class LEDPreviewPane:
+    # Sample text on a simulated LED matrix, drawn with one block's font, size, bpp and ranges
+    def __init__(self, master, get_blocks):
+        self.get_blocks = get_blocks
+        self.frame = tk.LabelFrame(master, text="LED Preview", padx=8, pady=4, font=("Segoe UI", 10))
+        controls = tk.Frame(self.frame)
+        controls.pack(fill="x")
+        tk.Label(controls, text="Block:", font=("Segoe UI", 10)).pack(side="left")
+        self.block_var = tk.IntVar(value=1)
+        tk.Spinbox(controls, from_=1, to=MAX_EXTRA_FONTS, textvariable=self.block_var, width=3,
+                   font=("Segoe UI", 10)).pack(side="left", padx=(4, 14))
+        tk.Label(controls, text="Text:", font=("Segoe UI", 10)).pack(side="left")
+        self.text_var = tk.StringVar(value=PREVIEW_TEXT)
+        tk.Entry(controls, textvariable=self.text_var, width=40, font=("Segoe UI", 10)).pack(side="left", padx=(4, 14))
+        tk.Label(controls, text="Matrix W x H:", font=("Segoe UI", 10)).pack(side="left")
+        self.width_var = tk.IntVar(value=64)
+        tk.Spinbox(controls, from_=8, to=256, textvariable=self.width_var, width=4,
+                   font=("Segoe UI", 10)).pack(side="left", padx=4)
+        self.height_var = tk.IntVar(value=16)
+        tk.Spinbox(controls, from_=4, to=128, textvariable=self.height_var, width=4,
+                   font=("Segoe UI", 10)).pack(side="left", padx=(0, 14))
+        tk.Label(controls, text="LED px:", font=("Segoe UI", 10)).pack(side="left")
+        self.led_px_var = tk.IntVar(value=6)
+        tk.Spinbox(controls, from_=1, to=16, textvariable=self.led_px_var, width=3,
+                   font=("Segoe UI", 10)).pack(side="left", padx=(4, 14))
+        self.scroll_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(controls, text="Scroll", variable=self.scroll_var, command=self.show_frame,
+                       font=("Segoe UI", 10)).pack(side="left")
+        self.status_var = tk.StringVar(value="Select a font file to preview")
+        tk.Label(self.frame, textvariable=self.status_var, font=("Segoe UI", 9), fg="#444444").pack(anchor="w")
+        self.image_label = tk.Label(self.frame)
+        self.image_label.pack(anchor="w", pady=(2, 0))
+        self.photo = None
+        self.line = None
+        self.bpp = 1
+        self.offset = 0
+        self.signature = None
+        self.render_job = None
+        self.frame_job = None
+        for var in (self.block_var, self.text_var):
+            var.trace_add("write", lambda *args: self.schedule_render())
+        for var in (self.width_var, self.height_var, self.led_px_var):
+            var.trace_add("write", lambda *args: self.show_frame())
+
+    def schedule_render(self, delay=200):
+        # Debounced like the estimates; block edits and typing both land here
+        if self.render_job is not None:
+            self.frame.after_cancel(self.render_job)
+        self.render_job = self.frame.after(delay, self.render)
+
+    def render(self):
+        self.render_job = None
+        try:
+            blocks = self.get_blocks()
+            idx = self.block_var.get() - 1
+            if not 0 <= idx < len(blocks):
+                self.set_line(None, f"No font block {idx + 1}")
+                return
+            data = blocks[idx].get_font_data()
+            font_path = normalize_path(data["font_path"]) if data["font_path"] else ""
+            if not os.path.isfile(font_path):
+                self.set_line(None, f"Select a font file for block {idx + 1} to preview")
+                return
+            text = self.text_var.get()
+            signature = (font_path, os.path.getmtime(font_path), data["font_size"], data["bpp"], data["range"], text)
+            if signature == self.signature:
+                return
+            # NumPy and the glyph renderer load with the first preview, not at start-up
+            import led_preview
+            ranges = parse_merged_ranges(data["range"])
+            line = led_preview.render_line(text, font_path, data["font_size"], data["bpp"], ranges)
+            stats = led_preview.cache_stats()
+            self.bpp = data["bpp"]
+            self.signature = signature
+            self.set_line(line, f"{os.path.basename(font_path)}, {data['font_size']} px, {data['bpp']} bpp: "
+                                f"{line.shape[1]} x {line.shape[0]} LEDs of text; glyph cache {stats['glyphs']} "
+                                f"glyphs, {stats['hits']} hits, {stats['misses']} misses")
+        except (ValueError, tk.TclError):
+            self.set_line(None, "Preview: invalid block, size or range")
+        except ImportError as e:
+            self.set_line(None, f"Preview needs NumPy: {e}")
+        except Exception as e:
+            self.set_line(None, f"Preview unavailable: {e}")
+
+    def set_line(self, line, status):
+        if line is None:
+            self.signature = None
+        self.line = line
+        self.offset = 0
+        self.status_var.set(status)
+        self.show_frame()
+
+    def show_frame(self):
+        if self.frame_job is not None:
+            self.frame.after_cancel(self.frame_job)
+            self.frame_job = None
+        if self.line is None:
+            self.photo = None
+            self.image_label.configure(image="")
+            return
+        try:
+            width, height = max(1, self.width_var.get()), max(1, self.height_var.get())
+            led_px = max(1, self.led_px_var.get())
+        except tk.TclError:
+            return
+        import led_preview
+        scroll = self.scroll_var.get()
+        frame = led_preview.matrix_frame(self.line, width, height, self.offset, scroll)
+        # The whole panel is one image; the label keeps no reference of its own
+        self.photo = tk.PhotoImage(data=led_preview.frame_ppm(frame, self.bpp, led_px), format="PPM")
+        self.image_label.configure(image=self.photo)
+        if scroll:
+            self.offset = (self.offset + 1) % (self.line.shape[1] + width)
+            self.frame_job = self.frame.after(PREVIEW_FRAME_MS, self.show_frame)
+
+    def stop(self):
+        for job in (self.render_job, self.frame_job):
+            if job is not None:
+                self.frame.after_cancel(job)
+        self.render_job = self.frame_job = None
+
+class LVGLFontConverterApp:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Centum Configuration Tool")
+        self.root.geometry("1340x980")
+        self.root.update_idletasks()
+
+        container = tk.Frame(self.root, width=1320, height=950)
+        container.pack_propagate(False)
+        container.place(relx=0.5, rely=0.5, anchor="center")
+
+        title_label = tk.Label(container, text="Centum Configuration Tool", font=("Segoe UI", 32, "bold"))
+        title_label.pack(pady=(18, 8))
+        subtitle_label = tk.Label(container, text="Convert TTF and WOFF font files to a C source array for microcontrollers.",
+                                 font=("Segoe UI", 18, "bold"))
+        subtitle_label.pack(pady=(0, 9))
+        desc_text = (
+            "This tool lets you turn any TrueType (TTF) or WOFF font file into a C array suitable for embedded devices. "
+            "You can select Unicode range, font name and size, bit-per-pixel (bpp), and multiple languages per font block."
+        )
+        desc_label = tk.Label(container, text=desc_text, font=("Segoe UI", 12), wraplength=1280, justify="center")
+        desc_label.pack(pady=(0, 30))
+
+        settings_fr = tk.Frame(container, pady=8, padx=5)
+        settings_fr.pack()
+        tk.Label(settings_fr, text="Converter:", font=("Segoe UI", 10)).pack(side="left")
+        self.backend_var = tk.StringVar(value=BACKEND_LV_FONT_CONV)
+        ttk.Combobox(settings_fr, textvariable=self.backend_var, values=list(CONVERTER_BACKENDS),
+                     width=12, state='readonly', font=("Segoe UI", 10)).pack(side="left", padx=6)
+        tk.Label(settings_fr, text="Output:", font=("Segoe UI", 10)).pack(side="left", padx=(18, 0))
+        self.format_var = tk.StringVar(value=FORMAT_C)
+        format_box = ttk.Combobox(settings_fr, textvariable=self.format_var, values=list(OUTPUT_FORMATS),
+                                  width=4, state='readonly', font=("Segoe UI", 10))
+        format_box.pack(side="left", padx=6)
+        format_box.bind("<<ComboboxSelected>>", self.on_format_select)
+        tk.Label(settings_fr, text="Cmap:", font=("Segoe UI", 10)).pack(side="left", padx=(18, 0))
+        self.cmap_policy_var = tk.StringVar(value=CMAP_POLICY_FLASH)
+        cmap_box = ttk.Combobox(settings_fr, textvariable=self.cmap_policy_var, values=list(CMAP_POLICIES),
+                                width=9, state='readonly', font=("Segoe UI", 10))
+        cmap_box.pack(side="left", padx=6)
+        cmap_box.bind("<<ComboboxSelected>>", self.on_cmap_policy_select)
+        tk.Label(settings_fr, text="Kerning:", font=("Segoe UI", 10)).pack(side="left", padx=(18, 0))
+        self.kern_policy_var = tk.StringVar(value=KERN_POLICY_FLASH)
+        kern_box = ttk.Combobox(settings_fr, textvariable=self.kern_policy_var, values=list(KERN_POLICIES),
+                                width=9, state='readonly', font=("Segoe UI", 10))
+        kern_box.pack(side="left", padx=6)
+        kern_box.bind("<<ComboboxSelected>>", self.on_kern_policy_select)
+        tk.Label(settings_fr, text="Min px:", font=("Segoe UI", 10)).pack(side="left")
+        # Kerning pairs smaller than this at the block's size are dropped (0 keeps them all)
+        self.kern_min_px_var = tk.DoubleVar(value=0.0)
+        tk.Spinbox(settings_fr, from_=0, to=8, increment=0.25, textvariable=self.kern_min_px_var, width=5,
+                   command=self.on_kern_policy_select, font=("Segoe UI", 10)).pack(side="left", padx=6)
+        self.combined_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_fr, text="Combined output (shared bitmaps)", variable=self.combined_var,
+                       command=self.on_combined_toggle, font=("Segoe UI", 10)).pack(side="left", padx=(18, 0))
+        self.watch_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(settings_fr, text="Watch (rebuild on change)", variable=self.watch_var,
+                       command=self.on_watch_toggle, font=("Segoe UI", 10)).pack(side="left", padx=(18, 0))
+        self.backend_note_var = tk.StringVar(value="")
+        tk.Label(container, textvariable=self.backend_note_var, font=("Segoe UI", 9), fg="#a05000").pack()
+        self.backend_var.trace_add("write", lambda *args: self.on_backend_change())
+
+        self.preview = LEDPreviewPane(container, lambda: self.file_blocks)
+        self.preview.frame.pack(fill="x", padx=10)
+
+        canvas_fr = tk.Frame(container)
+        canvas_fr.pack(expand=True, pady=16)
+        self.canvas = tk.Canvas(canvas_fr, width=1300, height=380)
+        v_scrollbar = tk.Scrollbar(canvas_fr, orient="vertical", command=self.canvas.yview)
+        self.scrollable_frame = tk.Frame(self.canvas, width=1290)
+        self.scrollable_frame.bind(
+            "<Configure>",
+            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        )
+        self.canvas.create_window((650, 6), window=self.scrollable_frame, anchor="n")
+        self.canvas.configure(yscrollcommand=v_scrollbar.set)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        v_scrollbar.pack(side="right", fill="y")
+
+        self.file_blocks = []
+        self.conversion_cache = None
+        self.worker = None
+        self.events = None
+        self.cancel_event = None
+        self.run_blocks = []
+        self.watcher = None
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.add_font_block()
+
+        self.buttons_frame = tk.Frame(container)
+        self.buttons_frame.pack(fill="x", pady=14)
+        self.add_font_btn = tk.Button(
+            self.buttons_frame, text="+ Include another font", command=self.add_font_block
+        )
+        self.add_font_btn.pack(side="top", pady=5, ipadx=18)
+        self.submit_btn = tk.Button(
+            self.buttons_frame, text="Submit", command=self.submit_all, bg='black', fg='white'
+        )
+        self.submit_btn.pack(side="top", pady=6, ipadx=34)
+        self.cancel_btn = tk.Button(self.buttons_frame, text="Cancel", command=self.cancel_run, state="disabled")
+        self.cancel_btn.pack(side="top", pady=(0, 6), ipadx=30)
+        self.total_estimate_var = tk.StringVar(value="Estimated flash total: -")
+        tk.Label(self.buttons_frame, textvariable=self.total_estimate_var,
+                 font=("Segoe UI", 10)).pack(side="top")
+        self._bind_mousewheel(self.canvas)
+
+    def _bind_mousewheel(self, widget):
+        widget.bind_all("<MouseWheel>", lambda e: widget.yview_scroll(int(-1 * (e.delta / 120)), "units"))
+        widget.bind_all("<Button-4>", lambda e: widget.yview_scroll(-1, "units"))
+        widget.bind_all("<Button-5>", lambda e: widget.yview_scroll(1, "units"))
+
+    def add_font_block(self):
+        if len(self.file_blocks) >= MAX_EXTRA_FONTS:
+            messagebox.showwarning("Limit reached", f"Maximum {MAX_EXTRA_FONTS} fonts supported total.")
+            return
+        idx = len(self.file_blocks)
+        remove_callback = self.remove_font_block if idx != 0 else None
+        # New blocks start from the previous block's bpp
+        bpp = self.file_blocks[-1].bpp_var.get() if self.file_blocks else '1'
+        block = FontFileEntry(self.scrollable_frame, idx, remove_callback, bpp, self.update_total_estimate)
+        block.frame.pack(fill="x", pady=32)
+        self.file_blocks.append(block)
+        block.schedule_estimate()
+
+    def remove_font_block(self, block):
+        if block in self.file_blocks:
+            self.file_blocks.remove(block)
+        self.update_total_estimate()
+
+    def update_total_estimate(self):
+        self.preview.schedule_render()
+        estimates = [b.estimate for b in self.file_blocks if b.estimate]
+        if not estimates:
+            self.total_estimate_var.set("Estimated flash total: -")
+            return
+        from font_estimate import format_bytes
+        total = sum(e["total"] for e in estimates)
+        glyphs = sum(e["glyphs"] for e in estimates)
+        self.total_estimate_var.set(
+            f"Estimated flash total: ~{format_bytes(total)} ({glyphs} glyphs in {len(estimates)} of "
+            f"{len(self.file_blocks)} blocks, uncompressed)"
+        )
+
+    def on_backend_change(self):
+        self.backend_note_var.set(NATIVE_BACKEND_NOTE if self.backend_var.get() == BACKEND_NATIVE else "")
+
+    def on_format_select(self, event=None):
+        # The binary blob is written by the native converter, one file per block
+        if self.format_var.get() == FORMAT_BIN:
+            self.backend_var.set(BACKEND_NATIVE)
+            self.combined_var.set(False)
+
+    def on_cmap_policy_select(self, event=None):
+        # lv_font_conv chooses its own cmap tables
+        if self.cmap_policy_var.get() != CMAP_POLICY_FLASH:
+            self.backend_var.set(BACKEND_NATIVE)
+
+    def on_kern_policy_select(self, event=None):
+        # lv_font_conv writes its own kerning tables
+        try:
+            min_px = self.kern_min_px_var.get()
+        except tk.TclError:
+            min_px = 0
+        if self.kern_policy_var.get() != KERN_POLICY_FLASH or min_px:
+            self.backend_var.set(BACKEND_NATIVE)
+
+    def on_combined_toggle(self):
+        # Only the native converter can emit several fonts over one bitmap pool
+        if self.combined_var.get():
+            self.backend_var.set(BACKEND_NATIVE)
+            self.format_var.set(FORMAT_C)
+
+    def on_watch_toggle(self):
+        if self.watch_var.get():
+            self.watcher = BlockWatcher()
+            self.poll_watch()
+        else:
+            self.watcher = None
+
+    def poll_watch(self):
+        # Rebuilds the blocks whose settings or font file changed, once the edits have settled
+        if self.watcher is None:
+            return
+        if self.worker is None:
+            try:
+                blocks = [block.get_font_data() for block in self.file_blocks]
+                options = self.run_options()
+            except tk.TclError:
+                # A size field is being edited
+                blocks, options = [], None
+            stale = self.watcher.poll(blocks, options) if any(data["font_path"] for data in blocks) else []
+            if stale:
+                self.watcher.mark_built()
+                self.submit_all(only=stale)
+        self.root.after(int(POLL_INTERVAL * 1000), self.poll_watch)
+
+    def run_options(self):
+        # Settings shared by every block; watch mode rebuilds all blocks when one changes
+        return {
+            "backend": self.backend_var.get(),
+            "cmap_policy": self.cmap_policy_var.get(),
+            "kern_policy": self.kern_policy_var.get(),
+            "kern_min_px": self.kern_min_px_var.get(),
+            "combined": self.combined_var.get(),
+            "format": self.format_var.get(),
+        }
+
+    def get_conversion_cache(self):
+        if self.conversion_cache is None:
+            try:
+                self.conversion_cache = ConversionCache()
+            except OSError:
+                return None
+        return self.conversion_cache
+
+    def submit_all(self, only=None):
+        if self.worker is not None:
+            return
+        blocks = [block.get_font_data() for block in self.file_blocks]
+        if not any(data["font_path"] for data in blocks):
+            messagebox.showerror("Error", "Please select at least one font file.")
+            return
+        try:
+            options = self.run_options()
+        except tk.TclError:
+            messagebox.showerror("Error", "Kerning min px must be a number.")
+            return
+        request = {
+            "blocks": [{k: v for k, v in data.items() if k != "widget"} for data in blocks],
+            **options,
+            "cache": self.get_conversion_cache(),
+            # While watching, outputs are replaced by rename so a firmware build never reads half a file
+            "atomic": self.watcher is not None,
+            "only": only,
+        }
+        self.run_blocks = list(self.file_blocks)
+        for idx, block in enumerate(self.run_blocks):
+            if only is None or idx in only:
+                block.set_status([("Queued...", True)])
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.worker = threading.Thread(target=run_pipeline, args=(request, self.events, self.cancel_event), daemon=True)
+        self.submit_btn.config(state="disabled")
+        self.cancel_btn.config(state="normal")
+        self.worker.start()
+        self.root.after(100, self.poll_events)
+
+    def cancel_run(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_btn.config(state="disabled")
+
+    def on_close(self):
+        self.cancel_run()
+        self.preview.stop()
+        self.root.destroy()
+
+    def run_block(self, idx):
+        # Blocks removed while the run was in progress are skipped
+        block = self.run_blocks[idx] if idx < len(self.run_blocks) else None
+        return block if block in self.file_blocks else None
+
+    def poll_events(self):
+        try:
+            while True:
+                self.handle_event(self.events.get_nowait())
+        except queue.Empty:
+            pass
+        if self.worker is not None:
+            self.root.after(100, self.poll_events)
+
+    def handle_event(self, event):
+        kind = event[0]
+        if kind == "status":
+            block = self.run_block(event[1])
+            if block:
+                block.set_status(event[2])
+            return
+        if kind == "append":
+            block = self.run_block(event[1])
+            if block:
+                block.append_status(event[2], event[3])
+            return
+        self.worker = None
+        self.submit_btn.config(state="normal")
+        self.cancel_btn.config(state="disabled")
+        if kind == "validation_failed":
+            # Watch mode leaves the messages in the blocks instead of popping up on every edit
+            if self.watcher is None:
+                show_range_popup(event[1], "Font Range Support")
+        elif kind == "missing_tool":
+            messagebox.showerror("Missing tool", event[1])
+            for block in self.file_blocks:
+                block.set_status([("Error during font generation: lv_font_conv not found in PATH", False)])
+        elif kind == "error":
+            for block in self.file_blocks:
+                block.set_status([(f"Error during font generation: {event[1]}", False)])
+        elif kind == "cancelled":
+            for block in self.file_blocks:
+                block.set_status([("Cancelled", False)])
+        elif kind == "finished":
+            self.show_results(event[1], event[2])
+
+    def show_results(self, results, reports):
+        failures = [r for r in results if not r["ok"] and not r.get("cancelled")]
+        if failures and self.watcher is None:
+            messagebox.showerror(
+                "Font Converter Error",
+                f"Failed to generate {len(failures)} of {len(results)} .c files!\n\n"
+                + "\n".join(format_conversion_failure(r) for r in failures)
+                + "Try running the command in a terminal for details."
+            )
+
+        for result in results:
+            block = self.run_block(result["index"])
+            if block is None:
+                continue
+            if result["ok"]:
+                messages = [("Font generated: " + os.path.basename(result["output"]), True)]
+                messages += [(line, True) for line in reports.get(result["index"], [])]
+                block.set_status(messages)
+            elif result.get("cancelled"):
+                block.set_status([("Cancelled", False)])
+            else:
+                detail = result["stderr"].strip() or f"return code {result['returncode']}"
+                block.set_status([(f"Error during font generation: {detail}", False)])
+        generated = [r["output"] for r in results if r["ok"]]
+        if self.watcher is not None:
+            return
+        if any(r.get("cancelled") for r in results):
+            messagebox.showinfo("Cancelled", f"Conversion cancelled, {len(generated)} of {len(results)} blocks finished.")
+        elif generated:
+            summary = "Generated font file(s):\n" + "\n".join(sorted(set(generated)))
+            dedup = next((r["dedup"] for r in results if r.get("dedup")), None)
+            if dedup:
+                from lvgl_combined import format_dedup_report
+                summary += "\n\n" + "\n".join(format_dedup_report(dedup))
+            elif self.conversion_cache is not None:
+                stats = self.conversion_cache.stats()
+                summary += f"\n\nCache: {stats['hits']} hits, {stats['misses']} misses"
+            messagebox.showinfo("Success", summary)
+
+def run_pipeline(request, events, cancel):
+    # Runs on a worker thread: no Tk calls here, everything goes through the events queue
+    try:
+        blocks = request["blocks"]
+        only = request.get("only")
+        summary = []
+        all_supported = True
+        for idx, data in enumerate(blocks):
+            if only is not None and idx not in only:
+                continue
+            if cancel.is_set():
+                events.put(("cancelled",))
+                return
+            ok, messages = check_font_ranges(data["font_path"], data["range"])
+            events.put(("status", idx, messages))
+            summary.append((f"Font {idx + 1} ({data['font_name'] or 'unnamed'}):", ok))
+            summary += [("    " + msg, good) for msg, good in messages]
+            all_supported = all_supported and ok
+        if not all_supported:
+            events.put(("validation_failed", summary))
+            return
+
+        def progress(job, stream, text):
+            if stream == "start":
+                events.put(("status", job["index"], [("Converting...", True)]))
+            elif text:
+                events.put(("append", job["index"], text, stream != "stderr"))
+
+        output_name = next((data["font_name"] for data in blocks if data["font_name"]), "file_name")
+        output_folder = os.path.dirname(normalize_path(blocks[0]["font_path"]))
+        try:
+            results = convert_fonts(
+                [data["font_path"] for data in blocks],
+                os.path.join(output_folder, f"{output_name}.c"),
+                [data["font_name"] for data in blocks],
+                [data["font_size"] for data in blocks],
+                [data["bpp"] for data in blocks],
+                [data["range"] for data in blocks],
+                request["backend"],
+                cache=request["cache"],
+                compressions=[data["compression"] for data in blocks],
+                combined=request["combined"],
+                output_format=request["format"],
+                cmap_policy=request["cmap_policy"],
+                kern_policy=request.get("kern_policy", KERN_POLICY_FLASH),
+                kern_min_px=request.get("kern_min_px", 0),
+                progress=progress,
+                cancel=cancel,
+                atomic=request.get("atomic", False),
+                only=only,
+            )
+        except FileNotFoundError as e:
+            events.put(("missing_tool", str(e)))
+            return
+        reports = {}
+        for result in results:
+            if result["ok"] and not cancel.is_set():
+                try:
+                    reports[result["index"]] = format_compression_report(compression_report_for(result))
+                    reports[result["index"]] += cmap_report_lines(result)
+                    reports[result["index"]] += kerning_report_lines(result)
+                except Exception:
+                    pass
+        events.put(("finished", results, reports))
+    except Exception as e:
+        events.put(("error", str(e)))
+    finally:
+        # Tracing is only on when FONT2C_TRACE is set; the summary goes to the console per Submit
+        for line in font_trace.finish():
+            print(line, file=sys.stderr)
+        font_trace.reset()
+
+def run_startup_probe(root, probe_path):
+    # Wall-clock times of the first drawn window and of a first range check, then exit
+    root.update()
+    times = {"window": time.time()}
+    font_path = os.environ.get(STARTUP_FONT_ENV)
+    if font_path:
+        check_font_ranges(font_path, "0x20-0x7E")
+        times["validation"] = time.time()
+    with open(probe_path, "w", encoding="utf-8") as fh:
+        json.dump(times, fh)
+    root.destroy()
+
+def main():
+    font_trace.enable_from_env()
+    root = tk.Tk()
+    app = LVGLFontConverterApp(root)
+    probe_path = os.environ.get(STARTUP_PROBE_ENV)
+    if probe_path:
+        root.after_idle(run_startup_probe, root, probe_path)
+    root.mainloop()
@@ -1,25 +1,24 @@
 import subprocess
 import shutil
 import os
-import tkinter as tk
-from tkinter import filedialog, messagebox, ttk, Toplevel
-import webbrowser
-import importlib
 import sys
-
-def check_and_install_module(module_name, package_name=None):
-    if package_name is None:
-        package_name = module_name
-    try:
-        importlib.import_module(module_name)
-    except ImportError:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", package_name])
-
-check_and_install_module('freetype', 'freetype-py')
-import freetype
+import signal
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import font_trace
+from font_ranges import split_range_items, parse_merged_ranges, format_range, lv_font_conv_range_args
+from lvgl_compress import COMPRESS_NONE, COMPRESSION_SCHEMES, LV_FONT_CONV_FLAGS
+from lvgl_cmap import CMAP_POLICY_FLASH, CMAP_POLICIES
+from lvgl_kerning import KERN_POLICY_FLASH, KERN_POLICIES
 
 MAX_EXTRA_FONTS = 10
-MAX_RANGES_PER_FONT = 5
+BACKEND_LV_FONT_CONV = "lv_font_conv"
+BACKEND_NATIVE = "native"
+CONVERTER_BACKENDS = (BACKEND_LV_FONT_CONV, BACKEND_NATIVE)
+FORMAT_C = "c"
+FORMAT_BIN = "bin"
+OUTPUT_FORMATS = (FORMAT_C, FORMAT_BIN)
 
 LANGUAGE_UNICODE_RANGES = {
     "English": "0x0020-0x007F",
@@ -39,436 +38,523 @@ LANGUAGE_UNICODE_RANGES = {
 def normalize_path(path):
     return os.path.abspath(path).replace("\\", "/")
 
-def call_lv_font_conv(ttf_files, out_c_file, fontnames, sizes, bpp, ranges_list):
-    exe = shutil.which('lv_font_conv') or shutil.which('lv_font_conv.cmd')
-    if exe is None:
-        msg = (
-            "lv_font_conv not found in your PATH.\n"
-            "Run 'npm config get prefix' in terminal and add that folder to your Windows user PATH.\n"
-            "Restart your computer after updating PATH.\n"
-            f"Current PATH:\n{os.environ['PATH']}"
-        )
-        messagebox.showerror("Missing tool", msg)
-        raise FileNotFoundError("lv_font_conv not found in PATH")
-
+def find_lv_font_conv():
+    return shutil.which('lv_font_conv') or shutil.which('lv_font_conv.cmd')
+
+def conversion_output_filename(out_c_file, fontname, size, idx, count):
+    if count <= 1:
+        return out_c_file
+    namepart = fontname if fontname else f"font{idx+1}"
+    return os.path.splitext(out_c_file)[0] + f"_{namepart}_{size}.c"
+
+def build_lv_font_conv_cmd(exe, ttf_file, output_filename, fontname, size, bpp, ranges, compression=COMPRESS_NONE):
+    cmd = [exe, "--font", normalize_path(ttf_file)]
+    cmd += lv_font_conv_range_args(parse_merged_ranges(ranges))
+    cmd += [
+        "--size", str(size),
+        "--bpp", str(bpp),
+        "--format", "lvgl",
+        "--output", normalize_path(output_filename),
+        "--lv-font-name", fontname,
+    ] + LV_FONT_CONV_FLAGS[compression]
+    return cmd
+
+def bpp_for(bpp, idx):
+    # One bpp for every block, or a list with one per block
+    return bpp[idx] if isinstance(bpp, (list, tuple)) else bpp
+
+def build_conversion_jobs(exe, ttf_files, out_c_file, fontnames, sizes, bpp, ranges_list, backend=BACKEND_LV_FONT_CONV,
+                          compressions=None, split_bytes=None, output_format=FORMAT_C, use_worker=True,
+                          cmap_policy=CMAP_POLICY_FLASH, atomic=False, kern_policy=KERN_POLICY_FLASH, kern_min_px=0):
+    jobs = []
     for idx, ttf_file in enumerate(ttf_files):
         fontname = fontnames[idx]
         size = sizes[idx]
+        block_bpp = bpp_for(bpp, idx)
         ranges = ranges_list[idx]
-        output_filename = out_c_file
-        if len(ttf_files) > 1:
-            namepart = fontname if fontname else f"font{idx+1}"
-            output_filename = os.path.splitext(out_c_file)[0] + f"_{namepart}_{size}.c"
-        cmd = [exe, "--font", normalize_path(ttf_file)]
-        for rng in ranges.replace('\n', ',').split(','):
-            rng = rng.strip()
-            if rng:
-                cmd += ["--range", rng]
-        cmd += [
-            "--size", str(size),
-            "--bpp", str(bpp),
-            "--format", "lvgl",
-            "--output", normalize_path(output_filename),
-            "--lv-font-name", fontname,
-            "--no-compress"
-        ]
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode != 0:
-            messagebox.showerror(
-                "Font Converter Error",
-                f"Failed to generate .c file!\n"
-                f"Return code: {result.returncode}\n"
-                f"Command:\n{' '.join(cmd)}\n\n"
-                f"STDOUT:\n{result.stdout}\n"
-                f"STDERR:\n{result.stderr}\n"
-                "Try running this command in a terminal for details."
-            )
-            raise Exception("lv_font_conv failed")
-
-def parse_individual_ranges(range_text):
-    items = [i.strip() for i in range_text.replace('\n', ',').split(',') if i.strip()]
-    if len(items) > MAX_RANGES_PER_FONT:
-        raise ValueError(f"Maximum {MAX_RANGES_PER_FONT} ranges or codepoints allowed!")
-    ranges = []
-    for item in items:
-        if '-' in item:
-            start, end = item.split('-', 1)
-            start = int(start, 0)
-            end = int(end, 0)
-            if end < start:
-                raise ValueError(f"Invalid range: {item}")
-            ranges.append((start, end))
-        else:
-            val = int(item, 0)
-            ranges.append((val, val))
-    return ranges
-
-class StatusText(tk.Text):
-    def __init__(self, master, **kwargs):
-        super().__init__(master, **kwargs)
-        self.config(state="disabled", bg="#f0f0f0", relief=tk.FLAT, height=7, wrap="word")
-        self.tag_configure("success", foreground="green")
-        self.tag_configure("error", foreground="red")
-
-    def set_status_messages(self, messages):
-        self.config(state="normal")
-        self.delete("1.0", "end")
-        for msg, is_success in messages:
-            tag = "success" if is_success else "error"
-            self.insert("end", msg + "\n", tag)
-        self.config(state="disabled")
-
-def show_range_popup(messages):
-    popup = Toplevel()
-    popup.title("Font Range Support")
-    popup.geometry("430x220")
-    frame = tk.Frame(popup, padx=20, pady=22)
-    frame.pack(expand=True, fill="both")
-    for msg, is_success in messages:
-        color = "green" if is_success else "red"
-        label = tk.Label(frame, text=msg, fg=color, font=("Segoe UI", 12, "bold"))
-        label.pack(anchor="w", pady=3)
-    tk.Button(frame, text="OK", command=popup.destroy, width=14, font=("Segoe UI", 11, "bold")).pack(pady=13)
-    popup.transient()
-    popup.grab_set()
-    frame.focus_set()
-    return
-
-class FontFileEntry:
-    def __init__(self, master, index, remove_callback=None):
-        self.master = master
-        self.index = index
-        self.remove_callback = remove_callback
-        box_width = 1200
-        self.frame = tk.Frame(
-            master, relief=tk.GROOVE, bd=2, padx=18, pady=18,
-            width=box_width, height=320, bg="#f9f9f9"
-        )
-        self.frame.pack_propagate(False)
-        box_inner = tk.Frame(self.frame, bg="#f9f9f9", width=box_width-30)
-        box_inner.pack(expand=True)
-        # Row 1: Name, Font Size and TTF file + Browse in one line, centered
-        row1 = tk.Frame(box_inner, bg="#f9f9f9")
-        row1.pack(fill="x", pady=8)
-        row1.grid_columnconfigure(0, weight=1)
-        for col in range(8):
-            row1.grid_columnconfigure(col, weight=1)
-        tk.Label(row1, text="Name:", bg="#f9f9f9").grid(row=0, column=0, sticky="e", padx=3)
-        self.font_name_var = tk.StringVar(value="file_name")
-        self.font_name_entry = tk.Entry(row1, textvariable=self.font_name_var, width=22)
-        self.font_name_entry.grid(row=0, column=1, padx=8)
-        tk.Label(row1, text="Font Size (px):", bg="#f9f9f9").grid(row=0, column=2, sticky="e", padx=3)
-        self.font_size_var = tk.IntVar(value=1)
-        self.font_size_spin = tk.Spinbox(row1, from_=1, to=72, textvariable=self.font_size_var, width=7)
-        self.font_size_spin.grid(row=0, column=3, padx=8)
-        tk.Label(row1, text=f"TTF file {index + 1}:", bg="#f9f9f9").grid(row=0, column=4, sticky="e", padx=3)
-        self.path_var = tk.StringVar()
-        self.path_entry = tk.Entry(row1, textvariable=self.path_var, width=40)
-        self.path_entry.grid(row=0, column=5, padx=8)
-        browse_btn = tk.Button(row1, text="Browse", command=self.browse_file)
-        browse_btn.grid(row=0, column=6, padx=6)
-        if remove_callback and index != 0:
-            self.remove_btn = tk.Button(row1, text="🗑️ Remove", command=self.remove_self)
-            self.remove_btn.grid(row=0, column=7, padx=8)
-        # Row 2: Language selector (multiselect Listbox + vertical scrollbar), centered
-        row2 = tk.Frame(box_inner, bg="#f9f9f9")
-        row2.pack(fill="x", pady=6)
-        tk.Label(row2, text="Language(s):", bg="#f9f9f9", anchor="center").pack(side="top", anchor="n")
-        listbox_frame = tk.Frame(row2, bg="#f9f9f9")
-        listbox_frame.pack(side="top", anchor="center")
-        self.lang_listbox = tk.Listbox(
-            listbox_frame, selectmode="multiple", exportselection=False,
-            height=5, width=20, font=("Segoe UI", 10)
+        compression = compressions[idx] if compressions else COMPRESS_NONE
+        if compression not in COMPRESSION_SCHEMES:
+            raise ValueError(f"Unknown compression scheme: {compression}")
+        output_filename = conversion_output_filename(out_c_file, fontname, size, idx, len(ttf_files))
+        if output_format == FORMAT_BIN:
+            output_filename = os.path.splitext(output_filename)[0] + ".bin"
+        job = {
+            "index": idx, "backend": backend, "font_path": ttf_file, "font_name": fontname,
+            "font_size": size, "bpp": block_bpp, "range": ranges, "compression": compression,
+            "output": output_filename, "cmd": None, "split_bytes": split_bytes, "format": output_format,
+            "worker": use_worker and backend == BACKEND_LV_FONT_CONV, "cmap_policy": cmap_policy,
+            "kern_policy": kern_policy, "kern_min_px": kern_min_px, "atomic": atomic,
+        }
+        if backend == BACKEND_LV_FONT_CONV:
+            job["cmd"] = build_lv_font_conv_cmd(exe, ttf_file, output_filename, fontname, size, block_bpp, ranges,
+                                                compression)
+        jobs.append(job)
+    return jobs
+
+def cancelled_result(job):
+    return dict(job, returncode=None, stdout="", stderr="Cancelled", ok=False, cancelled=True)
+
+def terminate_process(proc):
+    if os.name == "nt":
+        # lv_font_conv is a .cmd shim, so the node child has to go with the tree
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(proc.pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        # Children (node behind the lv_font_conv shim) share the session started in run_process
+        try:
+            os.killpg(proc.pid, signal.SIGTERM)
+        except OSError:
+            proc.terminate()
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+def run_process(cmd, on_output=None, cancel=None, poll_interval=0.1):
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1,
+                            start_new_session=os.name != "nt")
+    output = {"stdout": [], "stderr": []}
+
+    def pump(stream, name):
+        for line in stream:
+            output[name].append(line)
+            if on_output:
+                on_output(name, line.rstrip("\n"))
+        stream.close()
+
+    readers = [threading.Thread(target=pump, args=(proc.stdout, "stdout"), daemon=True),
+               threading.Thread(target=pump, args=(proc.stderr, "stderr"), daemon=True)]
+    for reader in readers:
+        reader.start()
+    cancelled = False
+    while True:
+        try:
+            proc.wait(timeout=poll_interval)
+            break
+        except subprocess.TimeoutExpired:
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+                terminate_process(proc)
+                break
+    for reader in readers:
+        reader.join()
+    return proc.returncode, "".join(output["stdout"]), "".join(output["stderr"]), cancelled
+
+def run_native_job(job, progress=None, cancel=None):
+    import lvgl_native
+    if cancel is not None and cancel.is_set():
+        return cancelled_result(job)
+    result = dict(job, returncode=None, stdout="", stderr="", ok=False)
+    if job.get("format") == FORMAT_BIN:
+        return run_binary_job(job, result, progress)
+    try:
+        written = lvgl_native.convert_font_native(
+            job["font_path"], job["output"], job["font_name"], int(job["font_size"]), int(job["bpp"]),
+            parse_merged_ranges(job["range"]), job["compression"], job.get("split_bytes"),
+            job.get("cmap_policy", CMAP_POLICY_FLASH), job.get("kern_policy", KERN_POLICY_FLASH),
+            job.get("kern_min_px", 0)
         )
-        scrollbar = tk.Scrollbar(listbox_frame, orient="vertical", command=self.lang_listbox.yview)
-        self.lang_listbox.config(yscrollcommand=scrollbar.set)
-        self.lang_listbox.pack(side="left", anchor="center")
-        scrollbar.pack(side="left", fill="y", anchor="center")
-        for idx, lang in enumerate(LANGUAGE_UNICODE_RANGES.keys()):
-            self.lang_listbox.insert("end", lang)
-        self.lang_listbox.selection_set(0)
-        self.suppress_range_event = False
-        self.lang_listbox.bind("<<ListboxSelect>>", self.on_language_select)
-        # Row 3: Range box, centered
-        row3 = tk.Frame(box_inner, bg="#f9f9f9")
-        row3.pack(fill="x", pady=10)
-        tk.Label(row3, text="Range (max 5, comma/line-separated):",
-                 bg="#f9f9f9", anchor="center").pack(anchor="center")
-        self.range_text = tk.Text(row3, height=3, width=115)
-        self.range_text.insert("1.0", LANGUAGE_UNICODE_RANGES["English"])
-        self.range_text.pack(anchor="center", pady=(0, 4))
-        self.range_text.bind('<KeyRelease>', self.on_range_manual_edit)
-        # Row 4: Unicode Character Ranges link, centered
-        link_frame = tk.Frame(box_inner, bg="#f9f9f9")
-        link_frame.pack(fill="x", pady=3)
-        link = tk.Label(
-            link_frame, text="Unicode Character Ranges", fg="blue", cursor="hand2",
-            bg="#f9f9f9", anchor="center"
+    except Exception as e:
+        result.update(returncode=1, stderr=str(e))
+        return result
+    parts = written["parts"]
+    note = f" ({len(parts)} translation units)" if len(parts) > 1 else ""
+    result.update(returncode=0, ok=True, parts=[p["path"] for p in parts],
+                  stdout=f"{written['glyph_count']} glyphs written to {job['output']}{note}")
+    if progress:
+        progress(job, "stdout", result["stdout"])
+    return result
+
+def run_binary_job(job, result, progress=None):
+    import lvgl_binary
+    try:
+        info = lvgl_binary.write_binary_font(
+            job["font_path"], job["output"], int(job["font_size"]), int(job["bpp"]),
+            parse_merged_ranges(job["range"]), job["compression"], job.get("kern_min_px", 0)
         )
-        link.pack(anchor="center")
-        link.bind("<Button-1>", lambda e: webbrowser.open_new("https://jrgraphix.net/research/unicode.php"))
-        # Status at bottom
-        self.status_text = StatusText(box_inner)
-        self.status_text.pack(fill="x", pady=2)
-
-    def on_language_select(self, event=None):
-        if self.suppress_range_event:
-            return
-        selected_indices = self.lang_listbox.curselection()
-        unicode_ranges = []
-        for idx in selected_indices:
-            unicode_ranges.append(LANGUAGE_UNICODE_RANGES[self.lang_listbox.get(idx)])
-        if len(unicode_ranges) > MAX_RANGES_PER_FONT:
-            messagebox.showwarning(
-                "Too many ranges",
-                f"Maximum {MAX_RANGES_PER_FONT} ranges allowed. Deselect to add more."
-            )
-            for idx in selected_indices[MAX_RANGES_PER_FONT:]:
-                self.lang_listbox.selection_clear(idx)
-            unicode_ranges = unicode_ranges[:MAX_RANGES_PER_FONT]
-        self.suppress_range_event = True
-        self.range_text.delete("1.0", "end")
-        self.range_text.insert("1.0", ",".join(unicode_ranges))
-        self.suppress_range_event = False
-
-    def on_range_manual_edit(self, event):
-        if self.suppress_range_event:
-            return
-        raw_ranges = self.range_text.get("1.0", "end").strip()
-        ranges = [r.strip() for r in raw_ranges.replace('\n', ',').split(',') if r.strip()]
-        if len(ranges) > MAX_RANGES_PER_FONT:
-            self.range_text.delete("1.0", "end")
-            self.range_text.insert("1.0", ",".join(ranges[:MAX_RANGES_PER_FONT]))
-            messagebox.showwarning(
-                "Too many ranges",
-                f"Maximum {MAX_RANGES_PER_FONT} ranges allowed."
+    except Exception as e:
+        result.update(returncode=1, stderr=str(e))
+        return result
+    result.update(returncode=0, ok=True, stdout=f"{info['glyphs']} glyphs, {info['file_size']} bytes written to {job['output']}")
+    if progress:
+        progress(job, "stdout", result["stdout"])
+    return result
+
+def run_conversion_job(job, progress=None, cancel=None):
+    # progress(job, stream, text) is called from worker threads as output arrives
+    if progress:
+        progress(job, "start", "")
+    with font_trace.span("convert.job", index=job["index"], backend=job["backend"], font=job.get("font_path"),
+                         size=job.get("font_size"), cmd=" ".join(job["cmd"] or [])) as fields:
+        result = run_backend_job(job, progress, cancel)
+        fields.update(returncode=result["returncode"], ok=result["ok"], cancelled=bool(result.get("cancelled")))
+    return result
+
+def run_backend_job(job, progress=None, cancel=None):
+    if job["backend"] == BACKEND_NATIVE:
+        return run_native_job(job, progress, cancel)
+    if cancel is not None and cancel.is_set():
+        return cancelled_result(job)
+    result = dict(job, returncode=None, stdout="", stderr="", ok=False)
+    on_output = (lambda stream, text: progress(job, stream, text)) if progress else None
+    try:
+        outcome = None
+        if job.get("worker"):
+            import lv_font_conv_worker
+            # None when no resident worker could be started; the one-shot CLI runs instead
+            outcome = lv_font_conv_worker.run_command(job["cmd"], on_output, cancel)
+        if outcome is None:
+            outcome = run_process(job["cmd"], on_output, cancel)
+        returncode, stdout, stderr, cancelled = outcome
+    except OSError as e:
+        result["stderr"] = str(e)
+        return result
+    if cancelled:
+        return dict(cancelled_result(job), stdout=stdout)
+    result.update(returncode=returncode, stdout=stdout, stderr=stderr, ok=returncode == 0)
+    return result
+
+_converter_versions = {}
+
+def converter_version(backend, exe=None, use_worker=False):
+    if backend == BACKEND_NATIVE:
+        import lvgl_native
+        return lvgl_native.CONVERTER_VERSION
+    if exe not in _converter_versions and use_worker:
+        import lv_font_conv_worker
+        version = lv_font_conv_worker.worker_version(exe)
+        if version:
+            _converter_versions[exe] = version
+    if exe not in _converter_versions:
+        # Mostly Node start-up time, which every lv_font_conv invocation pays as well
+        with font_trace.span("converter.startup", cmd=f"{exe} --version"):
+            try:
+                proc = subprocess.run([exe, "--version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                _converter_versions[exe] = proc.stdout.strip() or "unknown"
+            except OSError:
+                _converter_versions[exe] = "unknown"
+    return f"lv_font_conv {_converter_versions[exe]}"
+
+def non_default_key_fields(job):
+    fields = {}
+    if job.get("format", FORMAT_C) != FORMAT_C:
+        fields["format"] = job["format"]
+    if job.get("cmap_policy", CMAP_POLICY_FLASH) != CMAP_POLICY_FLASH:
+        fields["cmap_policy"] = job["cmap_policy"]
+    if job.get("kern_policy", KERN_POLICY_FLASH) != KERN_POLICY_FLASH:
+        fields["kern_policy"] = job["kern_policy"]
+    if job.get("kern_min_px"):
+        fields["kern_min_px"] = job["kern_min_px"]
+    return fields
+
+def run_cached_job(job, cache, progress=None, cancel=None):
+    if job.get("split_bytes"):
+        # The cache holds single .c artifacts
+        return run_conversion_job(job, progress, cancel)
+    try:
+        with font_trace.span("cache.key", index=job["index"]):
+            key = cache.make_key(
+                job["font_path"], parse_merged_ranges(job["range"]), job["font_size"], job["bpp"],
+                job["font_name"], job["converter_version"], compression=job["compression"],
+                # Only non-default settings join the key so existing entries stay valid
+                **non_default_key_fields(job)
             )
-            ranges = ranges[:MAX_RANGES_PER_FONT]
-        self.suppress_range_event = True
-        self.lang_listbox.selection_clear(0, 'end')
-        for idx, lang in enumerate(LANGUAGE_UNICODE_RANGES):
-            if LANGUAGE_UNICODE_RANGES[lang] in ranges:
-                self.lang_listbox.selection_set(idx)
-        self.suppress_range_event = False
-
-    def browse_file(self):
-        filename = filedialog.askopenfilename(filetypes=[("TTF Font Files", "*.ttf")])
-        if filename:
-            if not filename.lower().endswith('.ttf'):
-                messagebox.showerror("Invalid File", "TTF file type is expected.")
-                return
-            self.path_var.set(filename)
-
-    def remove_self(self):
-        if self.remove_callback:
-            self.frame.destroy()
-            self.remove_callback(self)
-
-    def get_font_data(self):
-        return {
-            "font_path": self.path_var.get().strip(),
-            "range": self.range_text.get("1.0", "end").strip(),
-            "font_name": self.font_name_var.get().strip(),
-            "font_size": self.font_size_var.get() or 1,
-            "widget": self,
-        }
-
-    def set_status(self, messages):
-        self.status_text.set_status_messages(messages)
+    except (OSError, ValueError):
+        return run_conversion_job(job, progress, cancel)
+    with font_trace.span("cache.fetch", index=job["index"]) as fields:
+        fields["hit"] = hit = cache.fetch(key, job["output"])
+    if hit:
+        if progress:
+            progress(job, "stdout", "Reused cached output")
+        return dict(job, returncode=0, stdout="Reused cached output", stderr="", ok=True, cached=True)
+    result = run_conversion_job(job, progress, cancel)
+    if result["ok"]:
+        with font_trace.span("cache.store", index=job["index"]):
+            cache.store(key, job["output"])
+    return result
+
+def staging_dir_for(path):
+    return tempfile.mkdtemp(prefix=".tmp_", dir=os.path.dirname(os.path.abspath(path)))
+
+def publish_staged(paths, folder):
+    # Renames staged files over the outputs; an output whose content did not change keeps its
+    # mtime, so firmware builds only recompile what was really regenerated
+    from font_cache import same_content
+    published = []
+    for path in paths:
+        target = os.path.join(folder, os.path.basename(path))
+        if not same_content(path, target):
+            os.replace(path, target)
+        published.append(target)
+    return published
+
+def run_staged_job(job, run, *args):
+    # The converter writes into a private directory beside the output, under the same file name
+    # (LVGL symbols and header guards derive from it), so nothing reads a half-written file
+    staging_dir = staging_dir_for(job["output"])
+    staged = dict(job, output=os.path.join(staging_dir, os.path.basename(job["output"])))
+    if job["cmd"]:
+        staged["cmd"] = [normalize_path(staged["output"]) if arg == normalize_path(job["output"]) else arg
+                         for arg in job["cmd"]]
+    try:
+        result = run(staged, *args)
+        result.update(output=job["output"], cmd=job["cmd"],
+                      stdout=result["stdout"].replace(staged["output"], job["output"]))
+        if result["ok"]:
+            parts = result.get("parts") or [staged["output"]]
+            try:
+                published = publish_staged(parts, os.path.dirname(os.path.abspath(job["output"])))
+            except OSError as e:
+                result.update(ok=False, returncode=1, stderr=f"cannot replace {job['output']}: {e}")
+            else:
+                if result.get("parts"):
+                    result["parts"] = published
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    return result
+
+def run_conversion_jobs(jobs, max_workers=None, cache=None, progress=None, cancel=None):
+    # lv_font_conv jobs run in separate processes (one-shot or pooled workers), so threads only wait on I/O here.
+    if not jobs:
+        return []
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(jobs)))
+    results = [None] * len(jobs)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for pos, job in enumerate(jobs):
+            run, args = (run_conversion_job, ()) if cache is None else (run_cached_job, (cache,))
+            if job.get("atomic"):
+                run, args = run_staged_job, (run,) + args
+            futures[pool.submit(run, job, *args, progress, cancel)] = pos
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return results
+
+def format_conversion_failure(result):
+    return (
+        f"Font {result['index'] + 1} ({result['font_name']}):\n"
+        f"Return code: {result['returncode']}\n"
+        f"Command:\n{' '.join(result['cmd'] or [result['backend']])}\n\n"
+        f"STDOUT:\n{result['stdout']}\n"
+        f"STDERR:\n{result['stderr']}\n"
+    )
+
+def run_combined_jobs(jobs, out_c_file, progress=None, cancel=None):
+    import lvgl_combined
+    results = []
+    collected = []
+    for job in jobs:
+        if cancel is not None and cancel.is_set():
+            results.append(cancelled_result(dict(job, output=out_c_file)))
+            continue
+        if progress:
+            progress(job, "start", "")
+        result = dict(job, output=out_c_file, returncode=None, stdout="", stderr="", ok=False)
+        results.append(result)
+        try:
+            with font_trace.span("native.collect", index=job["index"], font=job["font_path"]):
+                entry = lvgl_combined.collect_entry(
+                    job["font_path"], job["font_name"] or f"font{job['index'] + 1}", int(job["font_size"]),
+                    int(job["bpp"]), parse_merged_ranges(job["range"]), job["compression"], out_c_file,
+                    job.get("cmap_policy", CMAP_POLICY_FLASH), job.get("kern_policy", KERN_POLICY_FLASH),
+                    job.get("kern_min_px", 0)
+                )
+        except Exception as e:
+            result.update(returncode=1, stderr=str(e))
+            continue
+        collected.append((entry, result))
+    if not collected:
+        return results
+    if cancel is not None and cancel.is_set():
+        for _, result in collected:
+            result.update(stderr="Cancelled", cancelled=True)
+        return results
+    try:
+        with font_trace.span("file.write", path=out_c_file):
+            if jobs[0].get("atomic"):
+                staging_dir = staging_dir_for(out_c_file)
+                try:
+                    staged = os.path.join(staging_dir, os.path.basename(out_c_file))
+                    stats = lvgl_combined.write_combined_c([entry for entry, _ in collected], staged)
+                    publish_staged([staged], os.path.dirname(os.path.abspath(out_c_file)))
+                finally:
+                    shutil.rmtree(staging_dir, ignore_errors=True)
+            else:
+                stats = lvgl_combined.write_combined_c([entry for entry, _ in collected], out_c_file)
+    except Exception as e:
+        for _, result in collected:
+            result.update(returncode=1, stderr=str(e))
+        return results
+    for entry, result in collected:
+        result.update(
+            returncode=0, ok=True, dedup=stats,
+            stdout=f"{len(entry['font']['glyphs'])} glyphs written to {out_c_file}"
+        )
+    return results
+
+def convert_fonts(ttf_files, out_c_file, fontnames, sizes, bpp, ranges_list, backend=BACKEND_LV_FONT_CONV,
+                  max_workers=None, cache=None, compressions=None, combined=False, progress=None, cancel=None,
+                  split_bytes=None, output_format=FORMAT_C, use_worker=True, cmap_policy=CMAP_POLICY_FLASH, atomic=False,
+                  only=None, kern_policy=KERN_POLICY_FLASH, kern_min_px=0):
+    # atomic: outputs replace the old files by rename. only: indices of the blocks to convert; output
+    # names still come from the full block list. Combined output always rebuilds every block.
+    if backend not in CONVERTER_BACKENDS:
+        raise ValueError(f"Unknown converter backend: {backend}")
+    if cmap_policy not in CMAP_POLICIES:
+        raise ValueError(f"Unknown cmap policy: {cmap_policy}")
+    if cmap_policy != CMAP_POLICY_FLASH and backend != BACKEND_NATIVE:
+        raise ValueError("lv_font_conv picks its own cmap tables; other cmap policies need the native backend")
+    if kern_policy not in KERN_POLICIES:
+        raise ValueError(f"Unknown kerning policy: {kern_policy}")
+    if kern_min_px < 0:
+        raise ValueError("The kerning threshold can't be negative")
+    if (kern_policy != KERN_POLICY_FLASH or kern_min_px) and backend != BACKEND_NATIVE:
+        raise ValueError("lv_font_conv writes its own kerning tables; kerning options need the native backend")
+    if combined and backend != BACKEND_NATIVE:
+        raise ValueError("Combined output with shared bitmaps needs the native backend")
+    if split_bytes and (backend != BACKEND_NATIVE or combined):
+        raise ValueError("Splitting bitmaps across .c files needs the native backend without combined output")
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    if output_format == FORMAT_BIN and (backend != BACKEND_NATIVE or combined or split_bytes):
+        raise ValueError("Binary output needs the native backend without combined or split output")
+    exe = find_lv_font_conv() if backend == BACKEND_LV_FONT_CONV else None
+    if backend == BACKEND_LV_FONT_CONV and exe is None:
+        msg = (
+            "lv_font_conv not found in your PATH.\n"
+            "Run 'npm config get prefix' in terminal and add that folder to your Windows user PATH.\n"
+            "Restart your computer after updating PATH.\n"
+            f"Current PATH:\n{os.environ['PATH']}"
+        )
+        raise FileNotFoundError(msg)
 
-def check_block_ranges(block):
-    data = block.get_font_data()
+    with font_trace.span("convert.all", blocks=len(ttf_files), backend=backend, output=out_c_file):
+        with font_trace.span("ranges.parse", blocks=len(ttf_files)):
+            jobs = build_conversion_jobs(
+                exe, ttf_files, out_c_file, fontnames, sizes, bpp, ranges_list, backend, compressions, split_bytes,
+                output_format, use_worker, cmap_policy, atomic, kern_policy, kern_min_px
+            )
+        if combined:
+            return run_combined_jobs(jobs, out_c_file, progress, cancel)
+        if cache is not None:
+            version = converter_version(backend, exe, use_worker)
+            for job in jobs:
+                job["converter_version"] = version
+        if only is not None:
+            jobs = [job for job in jobs if job["index"] in only]
+        return run_conversion_jobs(jobs, max_workers, cache, progress, cancel)
+
+def compression_report_for(result):
+    # Native output is rendered the same way again; lv_font_conv renders its own glyphs, so they
+    # are read back from the file it wrote
+    import lvgl_native
+    from lvgl_compress import compression_report
+    if result["backend"] == BACKEND_LV_FONT_CONV:
+        return compression_report(lvgl_native.lvgl_c_font(result["output"]), source="lv_font_conv output")
+    font = lvgl_native.collect_font(
+        result["font_path"], int(result["font_size"]), int(result["bpp"]),
+        parse_merged_ranges(result["range"]), kerning=False
+    )
+    return compression_report(font)
+
+def glyph_codes(font_path, range_text):
+    from font_coverage import get_coverage_index
+    index = get_coverage_index(font_path)
+    codes = set()
+    for start, end in parse_merged_ranges(range_text):
+        codes.update(c for c in range(start, end + 1) if index.contains(c))
+    return sorted(codes)
+
+def cmap_report_lines(result):
+    # Native tables are rebuilt from the glyph codes; lv_font_conv picks its own, so they are read from its output
+    from lvgl_cmap import cmap_report, policy_reports, format_cmap_report
+    if result.get("format", FORMAT_C) != FORMAT_C or len(result.get("parts") or []) > 1:
+        return []
+    alternatives = policy_reports(glyph_codes(result["font_path"], result["range"]))
+    if result["backend"] == BACKEND_LV_FONT_CONV:
+        import lvgl_native
+        report = cmap_report(lvgl_native.parse_lvgl_cmaps(result["output"]))
+        return format_cmap_report(report, alternatives=alternatives)
+    policy = result.get("cmap_policy", CMAP_POLICY_FLASH)
+    if policy not in alternatives:
+        return []
+    return format_cmap_report(alternatives[policy], policy, alternatives)
+
+def kerning_report_lines(result):
+    # Recomputed from the block's glyph set: every pair the font has, then the table the policy picked
+    import lvgl_native
+    from font_kerning import kerning_source
+    from font_pool import get_face
+    from lvgl_kerning import drop_small_pairs, kerning_report, format_kerning_report
+    if result["backend"] != BACKEND_NATIVE or result.get("format", FORMAT_C) != FORMAT_C:
+        return []
+    if len(result.get("parts") or []) > 1:
+        return []
+    face = get_face(result["font_path"])
+    face.set_pixel_sizes(0, int(result["font_size"]))
+    glyphs = [{"glyph_index": face.get_char_index(code)} for code in glyph_codes(result["font_path"], result["range"])]
+    all_pairs = lvgl_native.collect_kerning(face, glyphs, result["font_path"])
+    min_px = result.get("kern_min_px", 0)
+    kept = drop_small_pairs(all_pairs, min_px) if min_px else all_pairs
+    policy = result.get("kern_policy", KERN_POLICY_FLASH)
+    report = kerning_report(all_pairs, kept, len(glyphs), policy)
+    return format_kerning_report(report, policy, kerning_source(result["font_path"]), min_px)
+
+def call_lv_font_conv(ttf_files, out_c_file, fontnames, sizes, bpp, ranges_list, max_workers=None):
+    return convert_fonts(ttf_files, out_c_file, fontnames, sizes, bpp, ranges_list, BACKEND_LV_FONT_CONV, max_workers)
+
+def check_font_ranges(font_path, range_text):
     messages = []
-    bad_ranges = []
-    if not data['font_path'] or not data['font_path'].lower().endswith('.ttf') or not os.path.isfile(data['font_path']):
+    if not font_path or not font_path.lower().endswith('.ttf') or not os.path.isfile(font_path):
         messages.append(("File missing or not TTF.", False))
-        block.set_status(messages)
-        show_range_popup(messages)
-        return False
-    raw_ranges = [i.strip() for i in data['range'].replace('\n', ',').split(',') if i.strip()]
-    if not raw_ranges:
+        return False, messages
+    if not split_range_items(range_text):
         messages.append(("Enter Unicode range.", False))
-        block.set_status(messages)
-        show_range_popup(messages)
-        return False
-    if len(raw_ranges) > MAX_RANGES_PER_FONT:
-        messages.append((f"Maximum {MAX_RANGES_PER_FONT} ranges or codepoints allowed!", False))
-        block.set_status(messages)
-        show_range_popup(messages)
-        return False
+        return False, messages
     try:
-        parsed_ranges = []
-        for item in raw_ranges:
-            if '-' in item:
-                start, end = item.split('-', 1)
-                start = int(start, 0)
-                end = int(end, 0)
-                if end < start:
-                    raise ValueError(f"Invalid range: {item}")
-                parsed_ranges.append((start, end))
-            else:
-                val = int(item, 0)
-                parsed_ranges.append((val, val))
-    except Exception as e:
+        with font_trace.span("ranges.parse", font=font_path):
+            parsed_ranges = parse_merged_ranges(range_text)
+    except ValueError as e:
         messages.append((f"Unicode range error: {e}", False))
-        block.set_status(messages)
-        show_range_popup(messages)
-        return False
+        return False, messages
     try:
-        face = freetype.Face(data['font_path'])
+        from font_coverage import get_coverage_index
+        with font_trace.span("coverage.check", font=font_path, ranges=len(parsed_ranges)):
+            index = get_coverage_index(font_path)
         all_supported = True
         for idx, (start, end) in enumerate(parsed_ranges):
-            supported_chars = []
-            for code in range(start, end + 1):
-                if face.get_char_index(code) != 0:
-                    supported_chars.append(code)
-            raw_range = raw_ranges[idx]
-            if not supported_chars:
+            report = index.range_report(start, end)
+            raw_range = format_range(start, end)
+            counts = f"{report['supported']}/{report['total']} codepoints"
+            if not report['supported']:
                 all_supported = False
-                msg = f"{raw_range} - Not supported"
-                messages.append((msg, False))
+                messages.append((f"{raw_range} - Not supported ({counts})", False))
+            elif report['missing']:
+                messages.append((f"{raw_range} - Supported ({counts}, {report['missing']} missing)", True))
             else:
-                msg = f"{raw_range} - Supported"
-                messages.append((msg, True))
-        block.set_status(messages)
-        show_range_popup(messages)
-        return all_supported
+                messages.append((f"{raw_range} - Supported ({counts})", True))
+        return all_supported, messages
     except Exception as e:
         messages.append((f"Font check failed: {e}", False))
-        block.set_status(messages)
-        show_range_popup(messages)
-        return False
-
-class LVGLFontConverterApp:
-    def __init__(self, root):
-        self.root = root
-        self.root.title("Centum Configuration Tool")
-        self.root.geometry("1340x980")
-        self.root.update_idletasks()
-
-        container = tk.Frame(self.root, width=1320, height=950)
-        container.pack_propagate(False)
-        container.place(relx=0.5, rely=0.5, anchor="center")
-
-        title_label = tk.Label(container, text="Centum Configuration Tool", font=("Segoe UI", 32, "bold"))
-        title_label.pack(pady=(18, 8))
-        subtitle_label = tk.Label(container, text="Convert TTF and WOFF font files to a C source array for microcontrollers.",
-                                 font=("Segoe UI", 18, "bold"))
-        subtitle_label.pack(pady=(0, 9))
-        desc_text = (
-            "This tool lets you turn any TrueType (TTF) or WOFF font file into a C array suitable for embedded devices. "
-            "You can select Unicode range, font name and size, bit-per-pixel (bpp), and multiple languages per font block."
-        )
-        desc_label = tk.Label(container, text=desc_text, font=("Segoe UI", 12), wraplength=1280, justify="center")
-        desc_label.pack(pady=(0, 30))
-
-        settings_fr = tk.Frame(container, pady=8, padx=5)
-        settings_fr.pack()
-        tk.Label(settings_fr, text="Bpp:", width=6, font=("Segoe UI", 10)).pack(side="left")
-        self.bpp_var = tk.StringVar(value='1')
-        ttk.Combobox(settings_fr, textvariable=self.bpp_var, values=['1', '2', '3', '4', '8'],
-                     width=3, state='readonly', font=("Segoe UI", 10)).pack(side="left", padx=6)
-
-        canvas_fr = tk.Frame(container)
-        canvas_fr.pack(expand=True, pady=26)
-        self.canvas = tk.Canvas(canvas_fr, width=1300, height=520)
-        v_scrollbar = tk.Scrollbar(canvas_fr, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = tk.Frame(self.canvas, width=1290)
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
-        self.canvas.create_window((650, 6), window=self.scrollable_frame, anchor="n")
-        self.canvas.configure(yscrollcommand=v_scrollbar.set)
-        self.canvas.pack(side="left", fill="both", expand=True)
-        v_scrollbar.pack(side="right", fill="y")
-
-        self.file_blocks = []
-        self.add_font_block()
-
-        self.buttons_frame = tk.Frame(container)
-        self.buttons_frame.pack(fill="x", pady=14)
-        self.add_font_btn = tk.Button(
-            self.buttons_frame, text="+ Include another font", command=self.add_font_block
-        )
-        self.add_font_btn.pack(side="top", pady=5, ipadx=18)
-        self.submit_btn = tk.Button(
-            self.buttons_frame, text="Submit", command=self.submit_all, bg='black', fg='white'
-        )
-        self.submit_btn.pack(side="top", pady=6, ipadx=34)
-        self._bind_mousewheel(self.canvas)
-
-    def _bind_mousewheel(self, widget):
-        widget.bind_all("<MouseWheel>", lambda e: widget.yview_scroll(int(-1 * (e.delta / 120)), "units"))
-        widget.bind_all("<Button-4>", lambda e: widget.yview_scroll(-1, "units"))
-        widget.bind_all("<Button-5>", lambda e: widget.yview_scroll(1, "units"))
-
-    def add_font_block(self):
-        if len(self.file_blocks) >= MAX_EXTRA_FONTS:
-            messagebox.showwarning("Limit reached", f"Maximum {MAX_EXTRA_FONTS} fonts supported total.")
-            return
-        idx = len(self.file_blocks)
-        remove_callback = self.remove_font_block if idx != 0 else None
-        block = FontFileEntry(self.scrollable_frame, idx, remove_callback)
-        block.frame.pack(fill="x", pady=32)
-        self.file_blocks.append(block)
-
-    def remove_font_block(self, block):
-        if block in self.file_blocks:
-            self.file_blocks.remove(block)
-
-    def submit_all(self):
-        bpp = self.bpp_var.get()
-        ttf_files = []
-        ranges_list = []
-        font_names = []
-        font_sizes = []
+        return False, messages
 
-        all_supported = True
-        for block in self.file_blocks:
-            result = check_block_ranges(block)
-            if not result:
-                all_supported = False
-        if not all_supported:
-            return
-
-        for block in self.file_blocks:
-            data = block.get_font_data()
-            ttf_files.append(data['font_path'])
-            ranges_list.append(data["range"])
-            font_names.append(data["font_name"])
-            font_sizes.append(data["font_size"])
-
-        if not ttf_files:
-            messagebox.showerror("Error", "Please select at least one font file.")
-            return
-
-        output_name = next((name for name in font_names if name), "file_name")
-        output_folder = os.path.dirname(normalize_path(ttf_files[0]))
-        output_filename = os.path.join(output_folder, f"{output_name}.c")
-        counter = 1
-        while os.path.exists(normalize_path(output_filename)):
-            output_filename = os.path.join(output_folder, f"{output_name}({counter}).c")
-            counter += 1
 
-        try:
-            call_lv_font_conv(
-                ttf_files,
-                output_filename,
-                font_names,
-                font_sizes,
-                bpp,
-                ranges_list
-            )
-            for block in self.file_blocks:
-                block.set_status([("Font generated: " + os.path.basename(output_filename), True)])
-            messagebox.showinfo("Success", f"Generated font file:\n{output_filename}")
+def launch_gui():
+    # No pip at run time: the packaged app bundles its dependencies, and freetype is imported
+    # on first use, so the window comes up before the FreeType library is loaded
+    import font2c_gui
+    font2c_gui.main()
 
-        except Exception as e:
-            for block in self.file_blocks:
-                block.set_status([(f"Error during font generation: {e}", False)])
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        import font2c_cli
+        return font2c_cli.main(argv)
+    launch_gui()
+    return 0
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = LVGLFontConverterApp(root)
-    root.mainloop()
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+import tempfile
+
+from font_ranges import merge_ranges
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_dir():
+    base = os.environ.get("FONT2C_CACHE_DIR")
+    if base:
+        return base
+    root = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "CentumConfigurationTool", "font_cache")
+
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def atomic_copy(src, dst):
+    folder = os.path.dirname(os.path.abspath(dst))
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=folder)
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def same_content(path_a, path_b):
+    if not (os.path.isfile(path_a) and os.path.isfile(path_b)):
+        return False
+    if os.path.getsize(path_a) != os.path.getsize(path_b):
+        return False
+    return file_digest(path_a) == file_digest(path_b)
+
+
+class ConversionCache:
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_CACHE_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._digests = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def font_digest(self, font_path):
+        st = os.stat(font_path)
+        ident = (os.path.abspath(font_path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            digest = self._digests.get(ident)
+        if digest is None:
+            digest = file_digest(font_path)
+            with self._lock:
+                self._digests[ident] = digest
+        return digest
+
+    def make_key(self, font_path, ranges, size, bpp, font_name, converter_version, **options):
+        payload = {
+            "font": self.font_digest(font_path),
+            "ranges": merge_ranges(ranges),
+            "size": int(size),
+            "bpp": int(bpp),
+            "font_name": font_name,
+            "converter": converter_version,
+            "options": options,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _artifact(self, key):
+        return os.path.join(self.cache_dir, key + ".c")
+
+    def fetch(self, key, output_path):
+        artifact = self._artifact(key)
+        if not os.path.isfile(artifact):
+            with self._lock:
+                self.misses += 1
+            return False
+        # Touch the artifact so eviction sees it as recently used
+        os.utime(artifact, None)
+        if not same_content(artifact, output_path):
+            atomic_copy(artifact, output_path)
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, key, output_path):
+        atomic_copy(output_path, self._artifact(key))
+        self.evict()
+
+    def entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".c"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
+
+    def stats(self):
+        entries = self.entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,113 @@
+import bisect
+import threading
+import unicodedata
+
+import font_trace
+from font_pool import font_file_key, get_face
+
+_cache = {}
+_script_cache = {}
+_cache_lock = threading.Lock()
+
+# Unassigned, control, surrogate and private-use codepoints never count towards script coverage
+SKIPPED_CATEGORIES = ("Cn", "Cc", "Cs", "Co")
+
+
+def enumerate_cmap_intervals(face):
+    intervals = []
+    code, gindex = face.get_first_char()
+    while gindex:
+        if intervals and code == intervals[-1][1] + 1:
+            intervals[-1][1] = code
+        else:
+            intervals.append([code, code])
+        code, gindex = face.get_next_char(code, gindex)
+    return [tuple(iv) for iv in intervals]
+
+
+class CoverageIndex:
+    def __init__(self, intervals):
+        self.intervals = intervals
+        self.starts = [s for s, _ in intervals]
+        self.glyph_count = sum(e - s + 1 for s, e in intervals)
+
+    def count(self, start, end):
+        if end < start:
+            return 0
+        total = 0
+        pos = max(0, bisect.bisect_right(self.starts, start) - 1)
+        for s, e in self.intervals[pos:]:
+            if s > end:
+                break
+            lo, hi = max(s, start), min(e, end)
+            if lo <= hi:
+                total += hi - lo + 1
+        return total
+
+    def contains(self, code):
+        pos = bisect.bisect_right(self.starts, code) - 1
+        return pos >= 0 and self.intervals[pos][1] >= code
+
+    def range_report(self, start, end):
+        supported = self.count(start, end)
+        total = end - start + 1
+        return {"start": start, "end": end, "total": total, "supported": supported, "missing": total - supported}
+
+
+def get_coverage_index(font_path, face=None):
+    key = font_file_key(font_path)
+    with _cache_lock:
+        index = _cache.get(key)
+    if index is not None:
+        return index
+    if face is None:
+        with font_trace.span("font.load", font=key[0], bytes=key[1]):
+            face = get_face(key[0])
+    with font_trace.span("coverage.scan", font=key[0]) as fields:
+        index = CoverageIndex(enumerate_cmap_intervals(face))
+        fields["codepoints"] = index.glyph_count
+    with _cache_lock:
+        # Drop entries for older versions of the same file
+        for stale in [k for k in _cache if k[0] == key[0]]:
+            del _cache[stale]
+        _cache[key] = index
+    return index
+
+
+def is_assigned(code):
+    return unicodedata.category(chr(code)) not in SKIPPED_CATEGORIES
+
+
+def script_report(index, ranges):
+    total = supported = 0
+    for start, end in ranges:
+        for code in range(start, end + 1):
+            if is_assigned(code):
+                total += 1
+                supported += index.contains(code)
+    return {"total": total, "supported": supported, "percent": 100.0 * supported / total if total else 0.0}
+
+
+def script_coverage(font_path, presets):
+    # presets maps a language name to its parsed ranges; each gets the share of its assigned
+    # codepoints found in the font's cmap
+    file_key = font_file_key(font_path)
+    key = (file_key, tuple((name, tuple(ranges)) for name, ranges in presets.items()))
+    with _cache_lock:
+        result = _script_cache.get(key)
+    if result is not None:
+        return result
+    index = get_coverage_index(font_path)
+    with font_trace.span("coverage.scripts", font=file_key[0], presets=len(presets)):
+        result = {name: script_report(index, ranges) for name, ranges in presets.items()}
+    with _cache_lock:
+        for stale in [k for k in _script_cache if k[0][0] == file_key[0] and k[0] != file_key]:
+            del _script_cache[stale]
+        _script_cache[key] = result
+    return result
+
+
+def clear_coverage_cache():
+    with _cache_lock:
+        _cache.clear()
+        _script_cache.clear()
@@ -0,0 +1,167 @@
+import math
+import bisect
+import struct
+import threading
+import freetype
+
+from font_coverage import get_coverage_index
+from font_pool import font_file_key, get_face
+from font_kerning import pair_kerning
+from lvgl_kerning import pair_table_bytes
+from lvgl_native import GLYPH_DSC_BYTES, LOAD_FLAGS, build_cmaps, cmap_table_bytes
+
+# Same hinting as the renderer, without rasterizing the outline
+METRIC_FLAGS = (LOAD_FLAGS & ~freetype.FT_LOAD_RENDER) | freetype.FT_LOAD_NO_BITMAP
+
+
+class SizeMetrics:
+    # Per (font file, pixel size) state; grows as new codepoints are asked for and is never recomputed
+    def __init__(self, face, size, font_path):
+        self.face = face
+        self.size = size
+        self.font_path = font_path
+        self.boxes = {}
+        self.glyph_index = {}
+        # Codes mapped to each glyph id
+        self.glyph_codes = {}
+        self.kern_pairs = set()
+        # Kerned glyph ids by left and by right glyph
+        self.kern_rights = {}
+        self.kern_lefts = {}
+
+    def box(self, code):
+        self.face.load_char(code, METRIC_FLAGS)
+        m = self.face.glyph.metrics
+        if not m.width or not m.height:
+            return (0, 0)
+        x0 = math.floor(m.horiBearingX / 64.0)
+        x1 = math.ceil((m.horiBearingX + m.width) / 64.0)
+        y1 = math.ceil(m.horiBearingY / 64.0)
+        y0 = math.floor((m.horiBearingY - m.height) / 64.0)
+        return (x1 - x0, y1 - y0)
+
+    def add(self, codes):
+        new = [c for c in codes if c not in self.boxes]
+        if not new:
+            return 0
+        self.face.set_pixel_sizes(0, self.size)
+        known = set(self.glyph_codes)
+        for code in new:
+            gid = self.glyph_index[code] = self.face.get_char_index(code)
+            self.glyph_codes.setdefault(gid, []).append(code)
+            self.boxes[code] = self.box(code)
+        try:
+            self.table_kerning(known, new)
+        except (struct.error, IndexError, OSError):
+            if self.face.has_kerning:
+                self.add_kerning(new)
+        return len(new)
+
+    def table_kerning(self, known, new):
+        # GPOS or 'kern' pairs are looked up only for glyphs that were not known before (new x all,
+        # then old x new); the parsed tables are cached per file
+        codes = self.glyph_codes
+        added = set(codes) - known
+        if added:
+            scale = self.face.size.x_scale / 65536.0 / 4.0
+            found = pair_kerning(self.font_path, added, codes)
+            found.update(pair_kerning(self.font_path, known, added))
+            for (left, right), value in found.items():
+                if int(round(value * scale)):
+                    self.kern_rights.setdefault(left, set()).add(right)
+                    self.kern_lefts.setdefault(right, set()).add(left)
+        # New codes can also reach glyphs, and pairs, already known through another code
+        for code in new:
+            gid = self.glyph_index[code]
+            self.kern_pairs.update((code, b) for right in self.kern_rights.get(gid, ()) for b in codes[right])
+            self.kern_pairs.update((a, code) for left in self.kern_lefts.get(gid, ()) for a in codes[left])
+
+    def add_kerning(self, new):
+        # Only pairs with at least one new glyph are looked up
+        known = list(self.boxes)
+        for a in new:
+            ga = self.glyph_index[a]
+            for b in known:
+                gb = self.glyph_index[b]
+                if self.kern_value(ga, gb):
+                    self.kern_pairs.add((a, b))
+                if b != a and self.kern_value(gb, ga):
+                    self.kern_pairs.add((b, a))
+
+    def kern_value(self, left, right):
+        value = self.face.get_kerning(left, right, freetype.FT_KERNING_UNFITTED).x
+        return int(round(value / 4.0))
+
+
+class FootprintEstimator:
+    def __init__(self):
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def metrics_for(self, font_path, size):
+        key = font_file_key(font_path)
+        with self._lock:
+            metrics = self._sizes.get((key, size))
+            if metrics is None:
+                # Faces of older versions of the file are dropped with their metrics
+                for stale in [k for k in self._sizes if k[0][0] == key[0] and k[0] != key]:
+                    del self._sizes[stale]
+                faces = [m.face for k, m in self._sizes.items() if k[0] == key]
+                face = faces[0] if faces else get_face(key[0])
+                metrics = self._sizes[(key, size)] = SizeMetrics(face, size, key[0])
+        return metrics
+
+    def estimate(self, font_path, size, bpp, ranges):
+        size, bpp = int(size), int(bpp)
+        index = get_coverage_index(font_path)
+        codes = [c for start, end in index_intervals(index, ranges) for c in range(start, end + 1)]
+        metrics = self.metrics_for(font_path, size)
+        with self._lock:
+            measured = metrics.add(codes)
+            boxes = [metrics.boxes[c] for c in codes]
+            present = set(codes)
+            pairs = sum(1 for a, b in metrics.kern_pairs if a in present and b in present)
+        sizes = {
+            "bitmap": sum((w * h * bpp + 7) // 8 for w, h in boxes),
+            "glyph_dsc": (len(codes) + 1) * GLYPH_DSC_BYTES,
+            "cmap": sum(cmap_table_bytes(c) for c in build_cmaps(codes)) if codes else 0,
+            "kerning": pair_table_bytes(pairs, len(codes)) if pairs else 0,
+        }
+        sizes["total"] = sum(sizes.values())
+        sizes["glyphs"] = len(codes)
+        sizes["measured"] = measured
+        return sizes
+
+
+def index_intervals(index, ranges):
+    out = []
+    for start, end in ranges:
+        pos = max(0, bisect.bisect_right(index.starts, start) - 1)
+        for s, e in index.intervals[pos:]:
+            if s > end:
+                break
+            lo, hi = max(s, start), min(e, end)
+            if lo <= hi:
+                out.append((lo, hi))
+    return sorted(out)
+
+
+def format_bytes(count):
+    if count < 1024:
+        return f"{count} B"
+    return f"{count / 1024.0:.1f} KB"
+
+
+def format_estimate(sizes):
+    return (
+        f"~{format_bytes(sizes['total'])} flash: {sizes['glyphs']} glyphs, bitmaps {format_bytes(sizes['bitmap'])}, "
+        f"descriptors {format_bytes(sizes['glyph_dsc'])}, cmaps {format_bytes(sizes['cmap'])}, "
+        f"kerning {format_bytes(sizes['kerning'])}"
+    )
+
+
+_estimator = FootprintEstimator()
+
+
+def estimate_footprint(font_path, size, bpp, ranges):
+    return _estimator.estimate(font_path, size, bpp, ranges)
@@ -0,0 +1,239 @@
+import struct
+import threading
+
+import font_trace
+
+from font_pool import font_file_key, get_font_data
+
+# Pair kerning as HarfBuzz applies it by default: the GPOS 'kern' feature when the font has
+# one, otherwise the legacy 'kern' table. Values are horizontal advance adjustments of the
+# left glyph in font units. Device tables and contextual kerning are not read.
+GPOS_PAIR_LOOKUP = 2
+GPOS_EXTENSION_LOOKUP = 9
+VALUE_X_ADVANCE = 0x0004
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def read_u16(data, offset):
+    return struct.unpack_from(">H", data, offset)[0]
+
+
+def read_s16(data, offset):
+    return struct.unpack_from(">h", data, offset)[0]
+
+
+def read_u32(data, offset):
+    return struct.unpack_from(">I", data, offset)[0]
+
+
+def sfnt_tables(data):
+    # Table directory of a TrueType/OpenType file (offset 0; collections are not supported)
+    count = read_u16(data, 4)
+    tables = {}
+    for i in range(count):
+        tag, _, offset, length = struct.unpack_from(">4sIII", data, 12 + 16 * i)
+        tables[tag.decode("latin-1")] = data[offset:offset + length]
+    return tables
+
+
+def value_record_size(value_format):
+    return 2 * bin(value_format & 0xFF).count("1")
+
+
+def x_advance(data, offset, value_format):
+    if not value_format & VALUE_X_ADVANCE:
+        return 0
+    return read_s16(data, offset + value_record_size(value_format & 0x3))
+
+
+def read_coverage(data, offset):
+    fmt = read_u16(data, offset)
+    count = read_u16(data, offset + 2)
+    glyphs = []
+    if fmt == 1:
+        glyphs = list(struct.unpack_from(f">{count}H", data, offset + 4))
+    elif fmt == 2:
+        for i in range(count):
+            start, end, _ = struct.unpack_from(">HHH", data, offset + 4 + 6 * i)
+            glyphs.extend(range(start, end + 1))
+    # Coverage index order is glyph id order
+    return glyphs
+
+
+def read_class_def(data, offset):
+    fmt = read_u16(data, offset)
+    classes = {}
+    if fmt == 1:
+        start = read_u16(data, offset + 2)
+        count = read_u16(data, offset + 4)
+        for i, value in enumerate(struct.unpack_from(f">{count}H", data, offset + 6)):
+            if value:
+                classes[start + i] = value
+    elif fmt == 2:
+        for i in range(read_u16(data, offset + 2)):
+            start, end, value = struct.unpack_from(">HHH", data, offset + 4 + 6 * i)
+            if value:
+                classes.update(dict.fromkeys(range(start, end + 1), value))
+    return classes
+
+
+def read_pair_pos(data, offset):
+    fmt = read_u16(data, offset)
+    coverage = read_coverage(data, offset + read_u16(data, offset + 2))
+    format1, format2 = read_u16(data, offset + 4), read_u16(data, offset + 6)
+    size1, size2 = value_record_size(format1), value_record_size(format2)
+    if fmt == 1:
+        pairs = {}
+        count = read_u16(data, offset + 8)
+        for i, left in enumerate(coverage[:count]):
+            set_offset = offset + read_u16(data, offset + 10 + 2 * i)
+            row = {}
+            for j in range(read_u16(data, set_offset)):
+                record = set_offset + 2 + j * (2 + size1 + size2)
+                row[read_u16(data, record)] = x_advance(data, record + 2, format1)
+            pairs[left] = row
+        return {"format": 1, "pairs": pairs}
+    if fmt == 2:
+        class1 = read_class_def(data, offset + read_u16(data, offset + 8))
+        class2 = read_class_def(data, offset + read_u16(data, offset + 10))
+        count1, count2 = read_u16(data, offset + 12), read_u16(data, offset + 14)
+        matrix = []
+        record = offset + 16
+        for _ in range(count1):
+            row = []
+            for _ in range(count2):
+                row.append(x_advance(data, record, format1))
+                record += size1 + size2
+            matrix.append(row)
+        return {"format": 2, "coverage": set(coverage), "class1": class1, "class2": class2, "matrix": matrix}
+    return None
+
+
+def lookup_subtables(data, offset):
+    lookup_type = read_u16(data, offset)
+    count = read_u16(data, offset + 4)
+    subtables = []
+    for i in range(count):
+        sub = offset + read_u16(data, offset + 6 + 2 * i)
+        kind = lookup_type
+        if kind == GPOS_EXTENSION_LOOKUP:
+            kind = read_u16(data, sub + 2)
+            sub += read_u32(data, sub + 4)
+        if kind == GPOS_PAIR_LOOKUP:
+            table = read_pair_pos(data, sub)
+            if table:
+                subtables.append(table)
+    return subtables
+
+
+def read_gpos_kerning(data):
+    # Lookups of every 'kern' feature, whatever the script or language system
+    features = read_u16(data, 6)
+    lookups = read_u16(data, 8)
+    indices = set()
+    for i in range(read_u16(data, features)):
+        tag = data[features + 2 + 6 * i:features + 6 + 6 * i]
+        if tag != b"kern":
+            continue
+        feature = features + read_u16(data, features + 6 + 6 * i)
+        count = read_u16(data, feature + 2)
+        indices.update(struct.unpack_from(f">{count}H", data, feature + 4))
+    out = []
+    for index in sorted(indices):
+        subtables = lookup_subtables(data, lookups + read_u16(data, lookups + 2 + 2 * index))
+        if subtables:
+            out.append(subtables)
+    return out
+
+
+def read_kern_table(data):
+    # Version 0 (Microsoft) table, format 0 horizontal subtables; Apple's version 1 is skipped
+    pairs = {}
+    if read_u16(data, 0) != 0:
+        return []
+    offset = 4
+    for _ in range(read_u16(data, 2)):
+        length, coverage = read_u16(data, offset + 2), read_u16(data, offset + 4)
+        if coverage >> 8 == 0 and coverage & 0x7 == 0x1:
+            count = read_u16(data, offset + 6)
+            for i in range(count):
+                left, right, value = struct.unpack_from(">HHh", data, offset + 14 + 6 * i)
+                pairs.setdefault(left, {})[right] = value
+        offset += length
+    return [[{"format": 1, "pairs": pairs}]] if pairs else []
+
+
+def load_kerning(font_path):
+    key = font_file_key(font_path)
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None:
+        return cached
+    with font_trace.span("kerning.parse", font=font_path) as fields:
+        tables = sfnt_tables(get_font_data(key[0]))
+        lookups, source = [], None
+        if "GPOS" in tables:
+            lookups, source = read_gpos_kerning(tables["GPOS"]), "GPOS"
+        if not lookups and "kern" in tables:
+            lookups, source = read_kern_table(tables["kern"]), "kern"
+        fields.update(source=source, lookups=len(lookups))
+    kerning = {"source": source if lookups else None, "lookups": lookups}
+    with _cache_lock:
+        for stale in [k for k in _cache if k[0] == key[0] and k != key]:
+            del _cache[stale]
+        _cache[key] = kerning
+    return kerning
+
+
+def subtable_pairs(table, left_ids, right_ids, by_class2, zeros):
+    # zeros: also yield the covered pairs whose value is 0, which still hide later subtables
+    if table["format"] == 1:
+        for left in left_ids:
+            for right, value in table["pairs"].get(left, {}).items():
+                if right in right_ids and (value or zeros):
+                    yield left, right, value
+        return
+    class1, matrix = table["class1"], table["matrix"]
+    for left in left_ids:
+        if left not in table["coverage"]:
+            continue
+        row = matrix[class1.get(left, 0)]
+        for cls, rights in by_class2.items():
+            value = row[cls] if cls < len(row) else 0
+            if value or zeros:
+                for right in rights:
+                    yield left, right, value
+
+
+def glyph_kerning(font_path, glyph_ids):
+    # {(left, right): value} in font units for the given glyph ids
+    return pair_kerning(font_path, glyph_ids, glyph_ids)
+
+
+def pair_kerning(font_path, left_ids, right_ids):
+    # Pairs with the left glyph from left_ids and the right one from right_ids. In one lookup the
+    # first subtable that covers a pair decides it; separate lookups add up.
+    left_ids, right_ids = sorted(set(left_ids)), set(right_ids)
+    totals = {}
+    for subtables in load_kerning(font_path)["lookups"]:
+        decided = set()
+        shadowed = len(subtables) > 1
+        for table in subtables:
+            by_class2 = {}
+            if table["format"] == 2:
+                for gid in sorted(right_ids):
+                    by_class2.setdefault(table["class2"].get(gid, 0), []).append(gid)
+            for left, right, value in subtable_pairs(table, left_ids, right_ids, by_class2, shadowed):
+                if shadowed:
+                    if (left, right) in decided:
+                        continue
+                    decided.add((left, right))
+                if value:
+                    totals[(left, right)] = totals.get((left, right), 0) + value
+    return {pair: value for pair, value in totals.items() if value}
+
+
+def kerning_source(font_path):
+    return load_kerning(font_path)["source"]
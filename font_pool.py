@@ -0,0 +1,153 @@
+import os
+import mmap
+import ctypes
+import threading
+from collections import OrderedDict
+
+import font_trace
+
+# Budget for mapped font files. Mappings are shared pages of the file, so this bounds address
+# space and page cache pressure rather than heap; evicted files stay mapped while faces use them.
+DEFAULT_POOL_BYTES = 256 * 1024 * 1024
+POOL_BYTES_ENV = "FONT2C_FACE_POOL_BYTES"
+# FT_New_Memory_Face and FT_Done_Face must not run concurrently on freetype-py's one FT_Library.
+# Reentrant because a face can be collected, and FT_Done_Face called, while the lock is held.
+_library_lock = threading.RLock()
+_face_class = None
+
+
+def font_file_key(font_path):
+    path = os.path.abspath(font_path).replace("\\", "/")
+    st = os.stat(path)
+    return (path, st.st_size, st.st_mtime_ns)
+
+
+class MappedFont:
+    # One read-only view of a font file. FreeType gets a ctypes array over the mapping, so every
+    # face of the file reads the same pages and nothing is copied into Python bytes.
+    def __init__(self, path):
+        with open(path, "rb") as fh:
+            # ACCESS_COPY is private and writable, which ctypes needs to wrap it; FreeType never writes
+            self.mapping = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_COPY)
+        self.size = len(self.mapping)
+        self.buffer = (ctypes.c_ubyte * self.size).from_buffer(self.mapping)
+
+    def read(self):
+        # freetype.Face takes any object with read() and keeps what it returns alive
+        return self.buffer
+
+    def data(self):
+        return memoryview(self.mapping)
+
+
+def pooled_face_class():
+    # freetype.Face whose destruction takes the library lock; built on first use so FreeType is
+    # only imported when a face is needed
+    global _face_class
+    if _face_class is None:
+        import freetype
+
+        class PooledFace(freetype.Face):
+            # The lock is bound as a default so it is still there when faces die at interpreter exit
+            def __del__(self, lock=_library_lock):
+                with lock:
+                    super().__del__()
+
+        _face_class = PooledFace
+    return _face_class
+
+
+class FacePool:
+    def __init__(self, max_bytes=DEFAULT_POOL_BYTES):
+        self.max_bytes = max_bytes
+        self._fonts = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def mapped(self, font_path):
+        key = font_file_key(font_path)
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                self.hits += 1
+                return font
+        with font_trace.span("font.map", font=key[0], bytes=key[1]):
+            font = MappedFont(key[0])
+        with self._lock:
+            if key in self._fonts:
+                # Another thread mapped it meanwhile; use the pooled one
+                self.hits += 1
+                return self._fonts[key]
+            self.misses += 1
+            for stale in [k for k in self._fonts if k[0] == key[0]]:
+                del self._fonts[stale]
+            self._fonts[key] = font
+            self._evict()
+        return font
+
+    def _evict(self):
+        # Least recently used first; the newest file stays even when it alone is over budget
+        while len(self._fonts) > 1 and self.resident_bytes() > self.max_bytes:
+            self._fonts.popitem(last=False)
+            self.evictions += 1
+
+    def face(self, font_path, index=0):
+        # A new FT_Face per call: faces hold a size and a glyph slot, so callers must not share
+        # one across threads, but parsing the tables again from mapped memory is cheap
+        face_class = pooled_face_class()
+        font = self.mapped(font_path)
+        with _library_lock:
+            return face_class(font, index)
+
+    def data(self, font_path):
+        return self.mapped(font_path).data()
+
+    def resident_bytes(self):
+        return sum(font.size for font in self._fonts.values())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "fonts": len(self._fonts),
+                "resident_bytes": self.resident_bytes(),
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._fonts.clear()
+
+
+def pool_bytes_from_env():
+    try:
+        return int(os.environ.get(POOL_BYTES_ENV, DEFAULT_POOL_BYTES))
+    except ValueError:
+        return DEFAULT_POOL_BYTES
+
+
+_pool = FacePool(pool_bytes_from_env())
+
+
+def get_face(font_path, index=0):
+    return _pool.face(font_path, index)
+
+
+def get_font_data(font_path):
+    return _pool.data(font_path)
+
+
+def pool_stats():
+    return _pool.stats()
+
+
+def format_pool_stats(stats):
+    mib = 1024.0 * 1024.0
+    return (f"Face pool: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions, "
+            f"{stats['fonts']} fonts / {stats['resident_bytes'] / mib:.1f} MiB mapped "
+            f"(budget {stats['max_bytes'] / mib:.0f} MiB)")
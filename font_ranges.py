@@ -0,0 +1,80 @@
+import bisect
+
+
+def parse_codepoint(text):
+    text = text.strip()
+    if text[:2].upper() == "U+":
+        return int(text[2:], 16)
+    return int(text, 0)
+
+
+def split_range_items(range_text):
+    return [i.strip() for i in range_text.replace('\n', ',').split(',') if i.strip()]
+
+
+def parse_range_item(item):
+    if '-' in item:
+        start, end = item.split('-', 1)
+        start = parse_codepoint(start)
+        end = parse_codepoint(end)
+        if end < start:
+            raise ValueError(f"Invalid range: {item}")
+        return (start, end)
+    val = parse_codepoint(item)
+    return (val, val)
+
+
+def parse_ranges(range_text):
+    ranges = []
+    for item in split_range_items(range_text):
+        try:
+            start, end = parse_range_item(item)
+        except ValueError:
+            raise ValueError(f"Invalid range: {item}")
+        if start < 0 or end > 0x10FFFF:
+            raise ValueError(f"Codepoint out of Unicode range: {item}")
+        ranges.append((start, end))
+    return ranges
+
+
+def merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(r) for r in merged]
+
+
+def parse_merged_ranges(range_text):
+    return merge_ranges(parse_ranges(range_text))
+
+
+def ranges_from_codepoints(codes):
+    return merge_ranges((c, c) for c in codes)
+
+
+def format_range(start, end):
+    return f"0x{start:04X}" if start == end else f"0x{start:04X}-0x{end:04X}"
+
+
+def format_ranges(ranges, sep=","):
+    return sep.join(format_range(s, e) for s, e in ranges)
+
+
+def lv_font_conv_range_args(ranges):
+    args = []
+    for start, end in merge_ranges(ranges):
+        args += ["--range", format_range(start, end)]
+    return args
+
+
+def count_codepoints(ranges):
+    return sum(e - s + 1 for s, e in merge_ranges(ranges))
+
+
+def covers(ranges, start, end):
+    merged = merge_ranges(ranges)
+    pos = bisect.bisect_right([s for s, _ in merged], start) - 1
+    return pos >= 0 and merged[pos][1] >= end
@@ -0,0 +1,83 @@
+import bisect
+
+from font_ranges import merge_ranges, ranges_from_codepoints
+
+# Space is kept by default so subset fonts can still separate words
+DEFAULT_ALWAYS_INCLUDE = [(0x20, 0x20)]
+
+
+def is_renderable(code):
+    return code >= 0x20 and code != 0x7F and code != 0xFEFF and not 0xD800 <= code <= 0xDFFF
+
+
+def corpus_codepoints(paths):
+    codes = set()
+    for path in paths:
+        with open(path, encoding="utf-8-sig") as fh:
+            for line in fh:
+                codes.update(ord(ch) for ch in line)
+    return {c for c in codes if is_renderable(c)}
+
+
+def within_ranges(code, ranges, starts):
+    pos = bisect.bisect_right(starts, code) - 1
+    return pos >= 0 and ranges[pos][1] >= code
+
+
+def subset_ranges(corpus_codes, limit_ranges=None, always_include=DEFAULT_ALWAYS_INCLUDE):
+    codes = set(corpus_codes)
+    if limit_ranges:
+        limit = merge_ranges(limit_ranges)
+        starts = [s for s, _ in limit]
+        codes = {c for c in codes if within_ranges(c, limit, starts)}
+    for start, end in always_include or []:
+        codes.update(range(start, end + 1))
+    return ranges_from_codepoints(codes)
+
+
+def preset_baseline(corpus_codes, presets):
+    # For blocks given only a corpus: the language presets that hold any of its characters. Returns
+    # their names and merged ranges, or ([], []) when no preset contains the corpus.
+    names = []
+    ranges = []
+    for name, preset in presets.items():
+        preset = merge_ranges(preset)
+        starts = [s for s, _ in preset]
+        if any(within_ranges(c, preset, starts) for c in corpus_codes) and preset not in ranges:
+            names.append(name)
+            ranges.append(preset)
+    return names, merge_ranges([r for preset in ranges for r in preset])
+
+
+def subset_report(font_path, size, bpp, full_ranges, ranges):
+    import lvgl_native
+    from font_coverage import get_coverage_index
+    index = get_coverage_index(font_path)
+    full = lvgl_native.collect_font(font_path, size, bpp, full_ranges, kerning=False)
+    subset = lvgl_native.collect_font(font_path, size, bpp, ranges, kerning=False)
+    full_bytes = lvgl_native.font_data_bytes(full)["total"]
+    subset_bytes = lvgl_native.font_data_bytes(subset)["total"]
+    missing = [c for start, end in ranges for c in range(start, end + 1) if not index.contains(c)]
+    return {
+        "full_glyphs": len(full["glyphs"]),
+        "subset_glyphs": len(subset["glyphs"]),
+        "saved_glyphs": len(full["glyphs"]) - len(subset["glyphs"]),
+        "full_bytes": full_bytes,
+        "subset_bytes": subset_bytes,
+        "saved_bytes": full_bytes - subset_bytes,
+        "missing": missing,
+    }
+
+
+def format_subset_report(report):
+    lines = [
+        f"Glyphs: {report['subset_glyphs']} of {report['full_glyphs']} "
+        f"({report['saved_glyphs']} saved)",
+        f"Font data: {report['subset_bytes']} of {report['full_bytes']} bytes "
+        f"({report['saved_bytes']} saved)",
+    ]
+    if report["missing"]:
+        shown = " ".join(f"U+{c:04X}" for c in report["missing"][:12])
+        more = f" (+{len(report['missing']) - 12} more)" if len(report["missing"]) > 12 else ""
+        lines.append(f"Not in font: {shown}{more}")
+    return lines
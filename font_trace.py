@@ -0,0 +1,188 @@
+import os
+import sys
+import json
+import time
+import threading
+
+# Trace events are off unless enable() or enable_from_env() is called. When off, span() hands
+# out a shared no-op context so instrumented code costs one function call.
+TRACE_ENV = "FONT2C_TRACE"
+CHROME_ENV = "FONT2C_TRACE_CHROME"
+
+_tracer = None
+
+
+class Tracer:
+    def __init__(self, sink=None, chrome_path=None):
+        self.sink = sink
+        self.chrome_path = chrome_path
+        self.events = []
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def emit(self, name, start, duration, args):
+        thread = threading.current_thread()
+        record = {
+            "name": name,
+            "ts": round(start - self.origin, 6),
+            "dur": round(duration, 6),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "thread": thread.name,
+            "args": args,
+        }
+        with self.lock:
+            self.events.append(record)
+            if self.sink is not None:
+                self.sink.write(json.dumps(record, default=str) + "\n")
+                self.sink.flush()
+
+
+class Span:
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self.args
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer.emit(self.name, self.start, time.perf_counter() - self.start, self.args)
+        return False
+
+
+class NullSpan:
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_null_span = NullSpan()
+
+
+def enabled():
+    return _tracer is not None
+
+
+def span(name, **args):
+    # Fields added to the yielded dict inside the block end up in the event
+    if _tracer is None:
+        return _null_span
+    return Span(_tracer, name, args)
+
+
+def record(name, duration, **args):
+    # For time measured elsewhere, e.g. summed over an interleaved loop; ends now
+    if _tracer is not None:
+        _tracer.emit(name, time.perf_counter() - duration, duration, args)
+
+
+def event(name, **args):
+    if _tracer is not None:
+        _tracer.emit(name, time.perf_counter(), 0.0, args)
+
+
+def enable(path=None, chrome_path=None):
+    global _tracer
+    if path in ("-", "1"):
+        sink = sys.stderr
+    elif path:
+        sink = open(path, "a", encoding="utf-8")
+    else:
+        sink = None
+    _tracer = Tracer(sink, chrome_path)
+    return _tracer
+
+
+def enable_from_env():
+    path = os.environ.get(TRACE_ENV)
+    chrome_path = os.environ.get(CHROME_ENV)
+    if path or chrome_path:
+        enable(path, chrome_path)
+    return enabled()
+
+
+def disable():
+    global _tracer
+    if _tracer is not None and _tracer.sink not in (None, sys.stderr):
+        _tracer.sink.close()
+    _tracer = None
+
+
+def reset():
+    if _tracer is not None:
+        with _tracer.lock:
+            _tracer.events = []
+
+
+def events():
+    if _tracer is None:
+        return []
+    with _tracer.lock:
+        return list(_tracer.events)
+
+
+def summary(trace_events=None):
+    stages = {}
+    for e in events() if trace_events is None else trace_events:
+        stats = stages.setdefault(e["name"], {"name": e["name"], "count": 0, "total": 0.0, "max": 0.0})
+        stats["count"] += 1
+        stats["total"] += e["dur"]
+        stats["max"] = max(stats["max"], e["dur"])
+    rows = sorted(stages.values(), key=lambda s: -s["total"])
+    for row in rows:
+        row["mean"] = row["total"] / row["count"]
+    return rows
+
+
+def format_summary(rows):
+    lines = [f"{'Stage':<24} {'Count':>6} {'Total ms':>10} {'Mean ms':>9} {'Max ms':>9}"]
+    for row in rows:
+        lines.append(
+            f"{row['name']:<24} {row['count']:>6} {row['total'] * 1000:>10.1f} "
+            f"{row['mean'] * 1000:>9.1f} {row['max'] * 1000:>9.1f}"
+        )
+    return lines
+
+
+def chrome_events(trace_events):
+    out = []
+    for e in trace_events:
+        out.append({
+            "name": e["name"],
+            "cat": e["name"].split(".")[0],
+            "ph": "X",
+            "ts": int(e["ts"] * 1e6),
+            "dur": int(e["dur"] * 1e6),
+            "pid": e["pid"],
+            "tid": e["tid"],
+            "args": {k: v if isinstance(v, (int, float, bool, type(None))) else str(v) for k, v in e["args"].items()},
+        })
+    threads = {(e["pid"], e["tid"]): e["thread"] for e in trace_events}
+    for (pid, tid), name in threads.items():
+        out.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+    return out
+
+
+def export_chrome(path, trace_events=None):
+    # Load the file in chrome://tracing or https://ui.perfetto.dev
+    data = {"traceEvents": chrome_events(events() if trace_events is None else trace_events),
+            "displayTimeUnit": "ms"}
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh)
+
+
+def finish():
+    # Summary lines for the events so far; also writes the Chrome trace when one was asked for
+    if _tracer is None:
+        return []
+    trace_events = events()
+    if _tracer.chrome_path:
+        export_chrome(_tracer.chrome_path, trace_events)
+    return format_summary(summary(trace_events))
@@ -0,0 +1,66 @@
+import os
+import time
+
+# Files are polled rather than watched through OS notifications: the inputs are a handful of
+# fonts and corpora, and polling behaves the same on Windows, network drives and Linux
+POLL_INTERVAL = 0.25
+# A change is acted on once nothing else changed for this long, so a font being copied or a
+# range being typed triggers one rebuild
+DEBOUNCE_SECONDS = 0.4
+
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+def block_inputs(block):
+    return [p for p in [block.get("font_path")] + list(block.get("corpus") or []) if p]
+
+
+def block_settings(block):
+    return {k: v for k, v in block.items() if k != "widget"}
+
+
+class BlockWatcher:
+    # Compares font blocks and their input files with the last build and reports which blocks to
+    # rebuild once they have been stable for `debounce` seconds
+    def __init__(self, debounce=DEBOUNCE_SECONDS):
+        self.debounce = debounce
+        self.built = None
+        self.observed = None
+        self.last_change = None
+
+    def snapshot(self, blocks, options=None):
+        settings = [block_settings(b) for b in blocks]
+        files = [{p: file_signature(p) for p in block_inputs(b)} for b in blocks]
+        return settings, files, dict(options or {})
+
+    def stale_blocks(self, state):
+        settings, files, options = state
+        if self.built is None or len(self.built[0]) != len(settings) or options != self.built[2]:
+            # Output names depend on the block count, and run-wide options (backend, format,
+            # policies, combined output) affect every block, so either change rebuilds all
+            return list(range(len(settings)))
+        old_settings, old_files, _ = self.built
+        return [idx for idx in range(len(settings))
+                if settings[idx] != old_settings[idx] or files[idx] != old_files[idx]]
+
+    def poll(self, blocks, options=None, now=None):
+        # options: the settings shared by all blocks, compared as a whole
+        now = time.monotonic() if now is None else now
+        state = self.snapshot(blocks, options)
+        if state != self.observed:
+            self.observed = state
+            self.last_change = now
+            return []
+        if now - self.last_change < self.debounce:
+            return []
+        return self.stale_blocks(state)
+
+    def mark_built(self):
+        # Called as a build starts, so edits made while it runs are picked up by the next poll
+        self.built = self.observed
@@ -0,0 +1,161 @@
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from font_pool import font_file_key, get_face
+from font_ranges import covers
+from lvgl_native import LOAD_FLAGS
+
+GLYPH_CACHE_SIZE = 4096
+# Lit and dark LED colors; a lit LED's brightness follows the glyph's bpp level
+LED_ON = (255, 140, 0)
+LED_OFF = (40, 24, 16)
+
+
+def bitmap_array(bitmap):
+    # FreeType bitmap to a uint8 array of 0..255 coverage
+    rows, width, pitch = bitmap.rows, bitmap.width, abs(bitmap.pitch)
+    if not rows or not width:
+        return np.zeros((0, 0), np.uint8)
+    buf = np.frombuffer(bytes(bitmap.buffer), np.uint8).reshape(rows, pitch)
+    if bitmap.pixel_mode == 1:  # FT_PIXEL_MODE_MONO
+        return np.unpackbits(buf, axis=1)[:, :width] * np.uint8(255)
+    return buf[:, :width].copy()
+
+
+def quantize_levels(coverage, bpp):
+    # Same rounding as lvgl_native.quantize_pixel, on the whole bitmap at once
+    return ((coverage.astype(np.uint16) * ((1 << bpp) - 1) + 127) // 255).astype(np.uint8)
+
+
+def trim_levels(levels, left, top):
+    # Same trimming as lvgl_native.trim_pixels, so boxes match the converted glyphs
+    rows = np.flatnonzero(levels.any(axis=1))
+    if not rows.size:
+        return np.zeros((0, 0), np.uint8), 0, 0
+    cols = np.flatnonzero(levels.any(axis=0))
+    return levels[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1], left + int(cols[0]), top - int(rows[0])
+
+
+class GlyphRasterCache:
+    # LRU of rendered, quantized glyphs keyed by (font file, size, bpp, codepoint). The file key
+    # carries size and mtime, so an edited font never serves old bitmaps.
+    def __init__(self, max_glyphs=GLYPH_CACHE_SIZE):
+        self.max_glyphs = max_glyphs
+        self._glyphs = OrderedDict()
+        self._faces = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def face(self, file_key, size):
+        face = self._faces.get((file_key, size))
+        if face is None:
+            for stale in [k for k in self._faces if k[0][0] == file_key[0] and k[0] != file_key]:
+                del self._faces[stale]
+            face = self._faces[(file_key, size)] = get_face(file_key[0])
+            face.set_pixel_sizes(0, size)
+        return face
+
+    def metrics(self, font_path, size):
+        with self._lock:
+            face = self.face(font_file_key(font_path), size)
+            return int(math.ceil(face.size.ascender / 64.0)), int(math.floor(face.size.descender / 64.0))
+
+    def glyph(self, font_path, size, bpp, code):
+        key = (font_file_key(font_path), size, bpp, code)
+        with self._lock:
+            glyph = self._glyphs.get(key)
+            if glyph is not None:
+                self._glyphs.move_to_end(key)
+                self.hits += 1
+                return glyph
+            self.misses += 1
+            face = self.face(key[0], size)
+            if face.get_char_index(code):
+                face.load_char(code, LOAD_FLAGS)
+                slot = face.glyph
+                levels, left, top = trim_levels(quantize_levels(bitmap_array(slot.bitmap), bpp),
+                                                slot.bitmap_left, slot.bitmap_top)
+                glyph = {"levels": levels, "left": left, "top": top, "advance": int(round(slot.advance.x / 64.0))}
+            else:
+                glyph = {"levels": np.zeros((0, 0), np.uint8), "left": 0, "top": 0, "advance": 0}
+            self._glyphs[key] = glyph
+            while len(self._glyphs) > self.max_glyphs:
+                self._glyphs.popitem(last=False)
+        return glyph
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "glyphs": len(self._glyphs)}
+
+
+_cache = GlyphRasterCache()
+
+
+def render_line(text, font_path, size, bpp, ranges, cache=None):
+    # One line of text as bpp levels (0..2^bpp-1), one array cell per LED. Characters outside the
+    # block's ranges are skipped, as they would be missing from the converted font.
+    cache = cache or _cache
+    size, bpp = int(size), int(bpp)
+    ascent, descent = cache.metrics(font_path, size)
+    glyphs = [cache.glyph(font_path, size, bpp, ord(ch)) for ch in text if covers(ranges, ord(ch), ord(ch))]
+    # Glyphs reaching past the face metrics (matras, stacked conjuncts) extend the line, as
+    # lvgl_native.font_metrics extends line height and base line over the glyph boxes
+    for g in glyphs:
+        if g["levels"].size:
+            ascent = max(ascent, g["top"])
+            descent = min(descent, g["top"] - g["levels"].shape[0])
+    width = sum(g["advance"] for g in glyphs)
+    line = np.zeros((ascent - descent, max(width, 1)), np.uint8)
+    pen = 0
+    for g in glyphs:
+        levels = g["levels"]
+        if levels.size:
+            x0, y0 = pen + g["left"], ascent - g["top"]
+            # Clip to the line; LVGL clips the same way at the label's area
+            sx, sy = max(0, -x0), max(0, -y0)
+            x1 = min(line.shape[1], x0 + levels.shape[1])
+            y1 = min(line.shape[0], y0 + levels.shape[0])
+            if x1 > x0 + sx and y1 > y0 + sy:
+                area = line[y0 + sy:y1, x0 + sx:x1]
+                np.maximum(area, levels[sy:sy + area.shape[0], sx:sx + area.shape[1]], out=area)
+        pen += g["advance"]
+    return line
+
+
+def matrix_frame(line, width, height, offset=0, scroll=False):
+    # The part of the line an LED matrix of width x height shows, centered vertically. Scrolling
+    # moves the text in from the right edge and wraps after a blank panel width.
+    frame = np.zeros((height, width), np.uint8)
+    rows = line.shape[0]
+    src0, dst0 = max(0, (rows - height) // 2), max(0, (height - rows) // 2)
+    count = min(rows - src0, height - dst0)
+    if scroll:
+        period = line.shape[1] + width
+        cols = (np.arange(width) + offset - width) % period
+        visible = cols < line.shape[1]
+        frame[dst0:dst0 + count, visible] = line[src0:src0 + count, cols[visible]]
+    else:
+        shown = min(width, line.shape[1])
+        frame[dst0:dst0 + count, :shown] = line[src0:src0 + count, :shown]
+    return frame
+
+
+def frame_ppm(frame, bpp, led_px=6):
+    # Binary PPM of the matrix, each LED a led_px square with a 1 px dark gap, for tk.PhotoImage
+    brightness = frame.astype(np.float32) / ((1 << int(bpp)) - 1)
+    on, off = np.array(LED_ON, np.float32), np.array(LED_OFF, np.float32)
+    rgb = (off + (on - off) * brightness[..., None]).astype(np.uint8)
+    image = np.repeat(np.repeat(rgb, led_px, axis=0), led_px, axis=1)
+    if led_px >= 3:
+        image[led_px - 1::led_px, :] = 0
+        image[:, led_px - 1::led_px] = 0
+    height, width = image.shape[:2]
+    return b"P6 %d %d 255\n" % (width, height) + image.tobytes()
+
+
+def cache_stats():
+    return _cache.stats()
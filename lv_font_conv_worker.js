@@ -0,0 +1,96 @@
+// Resident lv_font_conv worker, started by lv_font_conv_worker.py as:
+//
+//   node lv_font_conv_worker.js <lv_font_conv package dir>
+//
+// One JSON message per line in each direction:
+//
+//   ready    {"ready": true, "version": "1.5.2"}                       (sent once at start)
+//   request  {"id": 1, "args": ["--font", "a.ttf", "--size", "16", ...]}  (lv_font_conv CLI arguments)
+//   output   {"id": 1, "stream": "stdout", "text": "..."}             (zero or more per request)
+//   reply    {"id": 1, "returncode": 0, "stdout": "...", "stderr": "..."}
+//
+// Requests run one at a time through the package's own CLI entry point, so the output files
+// are the same as a one-shot `lv_font_conv` run. The worker exits when stdin closes.
+'use strict';
+
+const path = require('path');
+const readline = require('readline');
+
+const moduleDir = process.argv[2];
+const cli = require(path.join(moduleDir, 'lib', 'cli'));
+const version = require(path.join(moduleDir, 'package.json')).version;
+
+let AppError = null;
+try {
+  AppError = require(path.join(moduleDir, 'lib', 'app_error'));
+} catch (e) {
+  // Older packages: every error is reported with its stack
+}
+
+const send = process.stdout.write.bind(process.stdout);
+const stdoutWrite = process.stdout.write;
+const stderrWrite = process.stderr.write;
+const realExit = process.exit;
+
+function reply(message) {
+  send(JSON.stringify(message) + '\n');
+}
+
+class ExitRequest extends Error {
+  constructor(code) {
+    super(`exit ${code}`);
+    this.code = code;
+  }
+}
+
+async function convert(request) {
+  const output = { stdout: '', stderr: '' };
+  const capture = (stream) => (chunk, encoding, callback) => {
+    const text = String(chunk);
+    output[stream] += text;
+    for (const line of text.split('\n')) {
+      if (line) reply({ id: request.id, stream, text: line });
+    }
+    if (typeof encoding === 'function') encoding();
+    else if (typeof callback === 'function') callback();
+    return true;
+  };
+  process.stdout.write = capture('stdout');
+  process.stderr.write = capture('stderr');
+  // argparse calls process.exit() on bad arguments and --help; that must not end the worker
+  process.exit = (code) => { throw new ExitRequest(code === undefined ? 0 : code); };
+  let returncode = 0;
+  try {
+    await cli.run(request.args || []);
+  } catch (err) {
+    if (err instanceof ExitRequest) {
+      returncode = err.code;
+    } else {
+      returncode = 1;
+      const text = AppError && err instanceof AppError ? err.message.trim() : String(err && err.stack || err);
+      output.stderr += text + '\n';
+    }
+  } finally {
+    process.stdout.write = stdoutWrite;
+    process.stderr.write = stderrWrite;
+    process.exit = realExit;
+  }
+  reply({ id: request.id, returncode, stdout: output.stdout, stderr: output.stderr });
+}
+
+let queue = Promise.resolve();
+const input = readline.createInterface({ input: process.stdin });
+input.on('line', (line) => {
+  if (!line.trim()) return;
+  let request;
+  try {
+    request = JSON.parse(line);
+  } catch (e) {
+    reply({ id: null, returncode: 2, stdout: '', stderr: `bad request: ${e.message}\n` });
+    return;
+  }
+  queue = queue.then(() => convert(request));
+});
+input.on('close', () => queue.then(() => realExit(0)));
+
+reply({ ready: true, version });
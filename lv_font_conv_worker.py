@@ -0,0 +1,296 @@
+import os
+import sys
+import json
+import queue
+import shlex
+import atexit
+import shutil
+import argparse
+import threading
+import subprocess
+
+import font_trace
+
+# Keeps lv_font_conv loaded in long-lived Node processes (lv_font_conv_worker.js) so each
+# conversion skips Node start-up. FONT2C_WORKER=off disables it; any other value is used as
+# the worker command instead, e.g. "python lv_font_conv_worker.py --stub".
+WORKER_ENV = "FONT2C_WORKER"
+WORKER_SCRIPT = "lv_font_conv_worker.js"
+STARTUP_TIMEOUT = 15.0
+MAX_IDLE_WORKERS = max(4, os.cpu_count() or 1)
+
+
+class WorkerError(RuntimeError):
+    pass
+
+
+def resource_dir():
+    return getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+
+
+def find_module_dir(exe):
+    # The npm shim sits in <prefix> (Windows) or <prefix>/bin, symlinked into the package (elsewhere)
+    prefix = os.path.dirname(os.path.abspath(exe))
+    candidates = [
+        os.path.dirname(os.path.realpath(exe)),
+        os.path.join(prefix, "node_modules", "lv_font_conv"),
+        os.path.join(prefix, "..", "lib", "node_modules", "lv_font_conv"),
+    ]
+    for candidate in candidates:
+        if os.path.isfile(os.path.join(candidate, "lib", "cli.js")):
+            return os.path.normpath(candidate)
+    return None
+
+
+def worker_command(exe):
+    override = os.environ.get(WORKER_ENV, "").strip()
+    if override.lower() in ("0", "off", "no", "false"):
+        return None
+    if override:
+        return shlex.split(override, posix=os.name != "nt")
+    node = shutil.which("node")
+    script = os.path.join(resource_dir(), WORKER_SCRIPT)
+    module_dir = find_module_dir(exe) if exe else None
+    if not node or not module_dir or not os.path.isfile(script):
+        return None
+    return [node, script, module_dir]
+
+
+class ConverterWorker:
+    def __init__(self, cmd, startup_timeout=STARTUP_TIMEOUT):
+        self.cmd = list(cmd)
+        self.proc = subprocess.Popen(
+            self.cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+            encoding="utf-8", bufsize=1, start_new_session=os.name != "nt"
+        )
+        self.messages = queue.Queue()
+        self.stderr = []
+        self.next_id = 0
+        self.requests = 0
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+        threading.Thread(target=self._read_stderr, daemon=True).start()
+        try:
+            hello = self.messages.get(timeout=startup_timeout)
+        except queue.Empty:
+            hello = None
+        if not hello or not hello.get("ready"):
+            self.close()
+            raise WorkerError(f"worker did not start: {self.stderr_tail() or hello}")
+        self.version = str(hello.get("version") or "unknown")
+
+    def _read_stdout(self):
+        for line in self.proc.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                message = {"id": None, "stream": "stdout", "text": line.rstrip("\n")}
+            self.messages.put(message if isinstance(message, dict) else {"id": None})
+        self.messages.put(None)
+
+    def _read_stderr(self):
+        for line in self.proc.stderr:
+            self.stderr.append(line)
+            del self.stderr[:-50]
+
+    def stderr_tail(self):
+        return "".join(self.stderr).strip()
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def run(self, args, on_output=None, cancel=None, poll_interval=0.1):
+        # Same (returncode, stdout, stderr, cancelled) as run_process
+        self.next_id += 1
+        request_id = self.next_id
+        try:
+            self.proc.stdin.write(json.dumps({"id": request_id, "args": list(args)}) + "\n")
+            self.proc.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise WorkerError(f"worker exited: {e}")
+        while True:
+            try:
+                message = self.messages.get(timeout=poll_interval)
+            except queue.Empty:
+                if cancel is not None and cancel.is_set():
+                    # A conversion can't be stopped inside Node, so the worker goes with it
+                    self.close(wait=False)
+                    return None, "", "Cancelled", True
+                continue
+            if message is None:
+                raise WorkerError(f"worker exited: {self.stderr_tail()}")
+            if message.get("id") not in (request_id, None):
+                continue
+            if "returncode" in message:
+                self.requests += 1
+                return message["returncode"], message.get("stdout", ""), message.get("stderr", ""), False
+            if on_output and "stream" in message:
+                on_output(message["stream"], message.get("text", ""))
+
+    def close(self, wait=True):
+        from font2c_lvgl import terminate_process
+        if self.proc.poll() is not None:
+            return
+        try:
+            # Closing stdin lets an idle worker exit on its own
+            self.proc.stdin.close()
+            if wait:
+                self.proc.wait(timeout=2)
+                return
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            pass
+        terminate_process(self.proc)
+
+
+class WorkerPool:
+    # Idle workers per command, reused across blocks and Submits until the process exits
+    def __init__(self, max_idle=MAX_IDLE_WORKERS):
+        self.max_idle = max_idle
+        self.lock = threading.Lock()
+        self.idle = {}
+        self.failed = {}
+        self.stats = {"started": 0, "reused": 0, "failed": 0}
+
+    def acquire(self, cmd):
+        key = tuple(cmd)
+        with self.lock:
+            if key in self.failed:
+                return None
+            idle = self.idle.get(key)
+            while idle:
+                worker = idle.pop()
+                if worker.alive():
+                    self.stats["reused"] += 1
+                    return worker
+        try:
+            with font_trace.span("converter.startup", cmd=" ".join(cmd), worker=True):
+                worker = ConverterWorker(cmd)
+        except (OSError, WorkerError) as e:
+            with self.lock:
+                # Not retried: the one-shot CLI takes over for the rest of the session
+                self.failed[key] = str(e)
+                self.stats["failed"] += 1
+            return None
+        with self.lock:
+            self.stats["started"] += 1
+        return worker
+
+    def release(self, worker):
+        if worker.alive():
+            with self.lock:
+                idle = self.idle.setdefault(tuple(worker.cmd), [])
+                if len(idle) < self.max_idle:
+                    idle.append(worker)
+                    return
+        worker.close()
+
+    def shutdown(self):
+        with self.lock:
+            workers = [w for idle in self.idle.values() for w in idle]
+            self.idle = {}
+        for worker in workers:
+            worker.close()
+
+
+_pool = WorkerPool()
+atexit.register(_pool.shutdown)
+
+
+def run_command(cmd, on_output=None, cancel=None):
+    # Runs an lv_font_conv command line on a pooled worker; None means use the CLI instead
+    worker_cmd = worker_command(cmd[0])
+    if worker_cmd is None:
+        return None
+    worker = _pool.acquire(worker_cmd)
+    if worker is None:
+        return None
+    try:
+        outcome = worker.run(cmd[1:], on_output, cancel)
+    except WorkerError:
+        worker.close()
+        return None
+    _pool.release(worker)
+    return outcome
+
+
+def worker_version(exe):
+    # Starting a worker for the version string leaves it idle for the first conversion
+    worker_cmd = worker_command(exe)
+    if worker_cmd is None:
+        return None
+    worker = _pool.acquire(worker_cmd)
+    if worker is None:
+        return None
+    version = worker.version
+    _pool.release(worker)
+    return version
+
+
+def pool_stats():
+    with _pool.lock:
+        return dict(_pool.stats, idle=sum(len(idle) for idle in _pool.idle.values()))
+
+
+def shutdown_workers():
+    _pool.shutdown()
+
+
+def parse_stub_args(args):
+    parser = argparse.ArgumentParser(prog="lv_font_conv", add_help=False)
+    parser.add_argument("--font", required=True)
+    parser.add_argument("-r", "--range", action="append", default=[])
+    parser.add_argument("--size", type=int, required=True)
+    parser.add_argument("--bpp", type=int, required=True)
+    parser.add_argument("--format", default="lvgl")
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--lv-font-name", default="")
+    parser.add_argument("--no-compress", action="store_true")
+    parser.add_argument("--no-prefilter", action="store_true")
+    opts, unknown = parser.parse_known_args(args)
+    if unknown:
+        raise ValueError(f"unsupported arguments: {' '.join(unknown)}")
+    if opts.format != "lvgl":
+        raise ValueError(f"unsupported format: {opts.format}")
+    return opts
+
+
+def serve_stub(stdin=sys.stdin, stdout=sys.stdout):
+    # Speaks the worker protocol without Node, converting with the native backend. It only
+    # understands the arguments build_lv_font_conv_cmd generates; meant for testing the pool.
+    import lvgl_native
+    from font_ranges import parse_merged_ranges
+    from lvgl_compress import COMPRESS_NONE, COMPRESS_RLE, COMPRESS_RLE_PREFILTER
+
+    def send(message):
+        stdout.write(json.dumps(message) + "\n")
+        stdout.flush()
+
+    send({"ready": True, "version": f"stub ({lvgl_native.CONVERTER_VERSION})"})
+    for line in stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        try:
+            opts = parse_stub_args(request.get("args", []))
+            if opts.no_compress:
+                compression = COMPRESS_NONE
+            elif opts.no_prefilter:
+                compression = COMPRESS_RLE
+            else:
+                compression = COMPRESS_RLE_PREFILTER
+            written = lvgl_native.convert_font_native(
+                opts.font, opts.output, opts.lv_font_name, opts.size, opts.bpp,
+                parse_merged_ranges(",".join(opts.range)), compression
+            )
+        except Exception as e:
+            send({"id": request.get("id"), "returncode": 1, "stdout": "", "stderr": f"{e}\n"})
+            continue
+        text = f"{written['glyph_count']} glyphs written to {opts.output}"
+        send({"id": request.get("id"), "stream": "stdout", "text": text})
+        send({"id": request.get("id"), "returncode": 0, "stdout": text + "\n", "stderr": ""})
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["--stub"]:
+        print("usage: lv_font_conv_worker.py --stub", file=sys.stderr)
+        sys.exit(2)
+    serve_stub()
@@ -0,0 +1,258 @@
+import os
+import mmap
+import zlib
+import struct
+
+import font_trace
+from font_pool import get_face
+
+from lvgl_compress import COMPRESS_NONE, COMPRESS_RLE_PREFILTER, BITMAP_FORMATS, encode_glyph_bitmap, rle_decode
+from lvgl_native import collect_kerning, expand_ranges, font_metrics, iter_glyphs, strip_pixels
+
+# Binary font blob, little-endian, every table and glyph bitmap aligned to ALIGN bytes:
+#
+#   header   HEADER (64 bytes)
+#   ranges   RANGE per run of consecutive codepoints, sorted: start, count, first glyph id
+#   glyphs   GLYPH per glyph id: bitmap offset (from bitmaps_offset) and size, adv_w in 1/16 px,
+#            box_w, box_h, ofs_x, ofs_y
+#   bitmaps  glyph bitmaps in the header's bitmap_format (LVGL lv_font_fmt_txt_bitmap_format_t)
+#   kerning  KERN per pair sorted by (left, right) glyph id, value in 1/16 px
+#
+# A glyph is found with a binary search over ranges, then read with one seek into glyphs and
+# one into bitmaps, so the blob can stay in external flash and be read in place.
+MAGIC = b"LVFB"
+FORMAT_VERSION = 1
+ALIGN = 4
+HEADER = struct.Struct("<4sHHHBBhhhhIIIIIIIIII4x")
+RANGE = struct.Struct("<III")
+GLYPH = struct.Struct("<IIHHHhhxx")
+KERN = struct.Struct("<HHhxx")
+HEADER_FIELDS = (
+    "magic", "version", "header_size", "size", "bpp", "bitmap_format", "line_height", "base_line",
+    "underline_position", "underline_thickness", "glyph_count", "range_count", "kern_count",
+    "ranges_offset", "glyphs_offset", "bitmaps_offset", "bitmaps_size", "kern_offset", "file_size", "crc32",
+)
+
+
+def align_to(offset, align=ALIGN):
+    return (offset + align - 1) // align * align
+
+
+def code_runs(codes):
+    runs = []
+    for gid, code in enumerate(codes):
+        if runs and code == runs[-1][0] + runs[-1][1]:
+            runs[-1][1] += 1
+        else:
+            runs.append([code, 1, gid])
+    return runs
+
+
+def payload_crc(fh, start, chunk_size=1 << 16):
+    crc = 0
+    fh.seek(start)
+    for chunk in iter(lambda: fh.read(chunk_size), b""):
+        crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def write_binary_font(font_path, output_path, size, bpp, ranges, compression=COMPRESS_NONE, kern_min_px=0):
+    with font_trace.span("font.load", font=font_path):
+        face = get_face(font_path)
+        face.set_pixel_sizes(0, int(size))
+    codes = [c for c in expand_ranges(ranges) if face.get_char_index(c)]
+    if len(codes) > 0xFFFF:
+        raise ValueError("Binary fonts hold at most 65535 glyphs")
+    runs = code_runs(codes)
+    ranges_offset = HEADER.size
+    glyphs_offset = align_to(ranges_offset + RANGE.size * len(runs))
+    bitmaps_offset = align_to(glyphs_offset + GLYPH.size * len(codes))
+    glyph_table = bytearray()
+    meta = []
+    with font_trace.span("native.binary", path=output_path, glyphs=len(codes)), open(output_path, "w+b") as fh:
+        # Bitmaps are streamed first; the tables in front of them are filled in afterwards
+        fh.seek(bitmaps_offset)
+        pos = 0
+        for g in iter_glyphs(face, ranges, bpp):
+            data = encode_glyph_bitmap(g["pixels"], int(bpp), compression)
+            padded = align_to(pos)
+            fh.write(b"\0" * (padded - pos))
+            glyph_table += GLYPH.pack(padded, len(data), g["adv_w"], g["box_w"], g["box_h"], g["ofs_x"], g["ofs_y"])
+            fh.write(data)
+            pos = padded + len(data)
+            meta.append(strip_pixels(g))
+        kern_offset = align_to(bitmaps_offset + pos)
+        fh.write(b"\0" * (kern_offset - bitmaps_offset - pos))
+        # collect_kerning numbers glyphs from 1 like LVGL, the blob from 0
+        kerning = collect_kerning(face, meta, font_path, kern_min_px)
+        pairs = sorted((left - 1, right - 1, value) for left, right, value in kerning)
+        for left, right, value in pairs:
+            fh.write(KERN.pack(left, right, max(-0x8000, min(0x7FFF, value))))
+        file_size = fh.tell()
+        fh.seek(ranges_offset)
+        for start, count, gid in runs:
+            fh.write(RANGE.pack(start, count, gid))
+        fh.write(b"\0" * (glyphs_offset - ranges_offset - RANGE.size * len(runs)))
+        fh.write(glyph_table)
+        font = font_metrics(face, font_path, size, bpp, meta)
+        crc = payload_crc(fh, HEADER.size)
+        fh.seek(0)
+        fh.write(HEADER.pack(
+            MAGIC, FORMAT_VERSION, HEADER.size, int(size), int(bpp), BITMAP_FORMATS[compression],
+            font["ascent"] - font["descent"], -font["descent"], font["underline_position"],
+            font["underline_thickness"], len(codes), len(runs), len(pairs), ranges_offset, glyphs_offset,
+            bitmaps_offset, pos, kern_offset, file_size, crc,
+        ))
+    return {"path": output_path, "glyphs": len(codes), "ranges": len(runs), "kern_pairs": len(pairs),
+            "bitmap_bytes": pos, "file_size": file_size}
+
+
+def unpack_bitmap(data, bpp, box_w, box_h):
+    mask = (1 << bpp) - 1
+    rows = []
+    bit = 0
+    for _ in range(box_h):
+        row = []
+        for _ in range(box_w):
+            byte = data[bit >> 3]
+            row.append((byte >> (8 - bpp - (bit & 7))) & mask)
+            bit += bpp
+        rows.append(row)
+    return rows
+
+
+class BinaryFont:
+    def __init__(self, path, check_crc=True):
+        self.path = path
+        self._fh = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._fh.close()
+            raise ValueError(f"{path}: empty file")
+        try:
+            self.header = self._read_header(check_crc)
+        except ValueError:
+            self.close()
+            raise
+
+    def _read_header(self, check_crc):
+        if len(self._mm) < HEADER.size:
+            raise ValueError(f"{self.path}: too short for a font header")
+        header = dict(zip(HEADER_FIELDS, HEADER.unpack_from(self._mm, 0)))
+        if header["magic"] != MAGIC:
+            raise ValueError(f"{self.path}: not a binary font (magic {header['magic']!r})")
+        if header["version"] != FORMAT_VERSION:
+            raise ValueError(f"{self.path}: unsupported format version {header['version']}")
+        if header["file_size"] != len(self._mm):
+            raise ValueError(f"{self.path}: truncated ({len(self._mm)} of {header['file_size']} bytes)")
+        if check_crc and zlib.crc32(self._mm[HEADER.size:]) != header["crc32"]:
+            raise ValueError(f"{self.path}: checksum mismatch")
+        return header
+
+    def close(self):
+        self._mm.close()
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def glyph_id(self, code):
+        lo, hi = 0, self.header["range_count"]
+        base = self.header["ranges_offset"]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start, count, gid = RANGE.unpack_from(self._mm, base + mid * RANGE.size)
+            if code < start:
+                hi = mid
+            elif code >= start + count:
+                lo = mid + 1
+            else:
+                return gid + code - start
+        return None
+
+    def glyph(self, code):
+        gid = self.glyph_id(code)
+        if gid is None:
+            return None
+        offset, size, adv_w, box_w, box_h, ofs_x, ofs_y = GLYPH.unpack_from(
+            self._mm, self.header["glyphs_offset"] + gid * GLYPH.size
+        )
+        return {"id": gid, "code": code, "bitmap_offset": offset, "bitmap_size": size, "adv_w": adv_w,
+                "box_w": box_w, "box_h": box_h, "ofs_x": ofs_x, "ofs_y": ofs_y}
+
+    def bitmap(self, code):
+        g = self.glyph(code)
+        if g is None:
+            return None
+        start = self.header["bitmaps_offset"] + g["bitmap_offset"]
+        return self._mm[start:start + g["bitmap_size"]]
+
+    def pixels(self, code):
+        g = self.glyph(code)
+        if g is None:
+            return None
+        data = self.bitmap(code)
+        bpp = self.header["bpp"]
+        if self.header["bitmap_format"] == BITMAP_FORMATS[COMPRESS_NONE]:
+            return unpack_bitmap(data, bpp, g["box_w"], g["box_h"])
+        values = rle_decode(data, bpp, g["box_w"] * g["box_h"])
+        rows = [values[y * g["box_w"]:(y + 1) * g["box_w"]] for y in range(g["box_h"])]
+        if self.header["bitmap_format"] == BITMAP_FORMATS[COMPRESS_RLE_PREFILTER]:
+            for y in range(1, len(rows)):
+                rows[y] = [a ^ b for a, b in zip(rows[y], rows[y - 1])]
+        return rows
+
+    def kerning(self, left_code, right_code):
+        left, right = self.glyph_id(left_code), self.glyph_id(right_code)
+        if left is None or right is None:
+            return 0
+        lo, hi = 0, self.header["kern_count"]
+        base = self.header["kern_offset"]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            l, r, value = KERN.unpack_from(self._mm, base + mid * KERN.size)
+            if (l, r) == (left, right):
+                return value
+            if (l, r) < (left, right):
+                lo = mid + 1
+            else:
+                hi = mid
+        return 0
+
+
+def verify_binary_font(bin_path, font_path, size, bpp, ranges):
+    # Re-renders the glyphs and checks lookup and bitmap extraction against the blob
+    problems = []
+    face = get_face(font_path)
+    face.set_pixel_sizes(0, int(size))
+    checked = 0
+    with BinaryFont(bin_path) as font:
+        if font.header["bpp"] != int(bpp) or font.header["size"] != int(size):
+            problems.append(f"header says {font.header['size']} px / {font.header['bpp']} bpp")
+        present = set()
+        for g in iter_glyphs(face, ranges, bpp):
+            present.add(g["code"])
+            checked += 1
+            found = font.glyph(g["code"])
+            if found is None:
+                problems.append(f"U+{g['code']:04X} not found")
+                continue
+            for key in ("adv_w", "box_w", "box_h", "ofs_x", "ofs_y"):
+                if found[key] != g[key]:
+                    problems.append(f"U+{g['code']:04X} {key} {found[key]} != {g[key]}")
+            if font.pixels(g["code"]) != g["pixels"]:
+                problems.append(f"U+{g['code']:04X} bitmap differs")
+        for code in expand_ranges(ranges):
+            if code not in present and font.glyph_id(code) is not None:
+                problems.append(f"U+{code:04X} found but not in the font")
+        if font.header["glyph_count"] != checked:
+            problems.append(f"header lists {font.header['glyph_count']} glyphs, font has {checked}")
+    return {"checked": checked, "problems": problems}
+
+
+def binary_output_path(output_path):
+    return os.path.splitext(output_path)[0] + ".bin"
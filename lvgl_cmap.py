@@ -0,0 +1,189 @@
+import math
+
+CMAP_FORMAT0_TINY = "LV_FONT_FMT_TXT_CMAP_FORMAT0_TINY"
+CMAP_FORMAT0_FULL = "LV_FONT_FMT_TXT_CMAP_FORMAT0_FULL"
+CMAP_SPARSE_TINY = "LV_FONT_FMT_TXT_CMAP_SPARSE_TINY"
+CMAP_SPARSE_FULL = "LV_FONT_FMT_TXT_CMAP_SPARSE_FULL"
+CMAP_TYPES = (CMAP_FORMAT0_TINY, CMAP_FORMAT0_FULL, CMAP_SPARSE_TINY, CMAP_SPARSE_FULL)
+FORMAT0_TYPES = (CMAP_FORMAT0_TINY, CMAP_FORMAT0_FULL)
+
+# sizeof(lv_font_fmt_txt_cmap_t) on a 32-bit MCU, used to decide when splitting a cmap pays off
+CMAP_HEADER_BYTES = 16
+# lv_font_fmt_txt.c reads FORMAT0_FULL offsets as uint8_t and SPARSE_FULL offsets as uint16_t;
+# range_length and the unicode_list entries are uint16_t
+FORMAT0_FULL_MAX_GLYPHS = 256
+MAX_RANGE_LENGTH = 0xFFFF
+# Runs one table may span, which bounds the optimizer at O(runs * MAX_GROUP_RUNS)
+MAX_GROUP_RUNS = 256
+
+CMAP_POLICY_FLASH = "flash"
+CMAP_POLICY_BALANCED = "balanced"
+CMAP_POLICY_SPEED = "speed"
+# Weight of one table byte and of one lookup step (summed over every glyph) per policy
+CMAP_POLICIES = {
+    CMAP_POLICY_FLASH: (1.0, 0.001),
+    CMAP_POLICY_BALANCED: (1.0, 1.0),
+    CMAP_POLICY_SPEED: (0.001, 1.0),
+}
+
+
+def code_runs(codes):
+    runs = []
+    for code in codes:
+        if runs and code == runs[-1][1] + 1 and code - runs[-1][0] < MAX_RANGE_LENGTH:
+            runs[-1][1] = code
+        else:
+            runs.append([code, code])
+    return runs
+
+
+def search_steps(count):
+    # Probes of _lv_utils_bsearch over a unicode_list of count entries
+    return max(1, math.ceil(math.log2(count + 1)))
+
+
+def table_options(span, count, single_run):
+    # (type, table bytes, probes per glyph) for one table holding count glyphs over span codepoints.
+    # Glyph ids follow codepoint order, so SPARSE_FULL never beats SPARSE_TINY; it is kept so
+    # every LVGL type is weighed. As in lv_font_conv output, a code missing inside a FORMAT0_FULL
+    # span reads offset 0, i.e. the table's first glyph.
+    if single_run:
+        return [(CMAP_FORMAT0_TINY, CMAP_HEADER_BYTES, 1)]
+    options = []
+    if count <= FORMAT0_FULL_MAX_GLYPHS:
+        options.append((CMAP_FORMAT0_FULL, CMAP_HEADER_BYTES + span, 1))
+    steps = search_steps(count)
+    options.append((CMAP_SPARSE_TINY, CMAP_HEADER_BYTES + 2 * count, steps))
+    options.append((CMAP_SPARSE_FULL, CMAP_HEADER_BYTES + 4 * count, steps))
+    return options
+
+
+def build_cmaps(codes, policy=CMAP_POLICY_FLASH):
+    # codes are sorted and numbered from glyph id 1. Runs of consecutive codes are grouped into
+    # tables by dynamic programming over the policy's byte/step weights. LVGL checks the tables in
+    # order, so a table costs one range check for each glyph in it and in every later table.
+    if policy not in CMAP_POLICIES:
+        raise ValueError(f"Unknown cmap policy: {policy}")
+    byte_weight, step_weight = CMAP_POLICIES[policy]
+    runs = code_runs(codes)
+    prefix = [0]
+    for start, end in runs:
+        prefix.append(prefix[-1] + end - start + 1)
+    total = prefix[-1]
+    best = [0.0] + [math.inf] * len(runs)
+    choice = [None] * (len(runs) + 1)
+    for j in range(1, len(runs) + 1):
+        end = runs[j - 1][1]
+        for i in range(j - 1, max(-1, j - 1 - MAX_GROUP_RUNS), -1):
+            span = end - runs[i][0] + 1
+            if span > MAX_RANGE_LENGTH:
+                break
+            count = prefix[j] - prefix[i]
+            checks = total - prefix[i]
+            for cmap_type, size, probes in table_options(span, count, i == j - 1):
+                score = best[i] + byte_weight * size + step_weight * (checks + count * probes)
+                if score < best[j]:
+                    best[j] = score
+                    choice[j] = (i, cmap_type)
+    groups = []
+    j = len(runs)
+    while j:
+        i, cmap_type = choice[j]
+        groups.append((i, j, cmap_type))
+        j = i
+    cmaps = []
+    for i, j, cmap_type in reversed(groups):
+        group_codes = codes[prefix[i]:prefix[j]]
+        cmaps.append(make_cmap(group_codes, prefix[i] + 1, cmap_type))
+    return cmaps
+
+
+def make_cmap(codes, glyph_id_start, cmap_type):
+    start = codes[0]
+    cmap = {
+        "range_start": start,
+        "range_length": codes[-1] - start + 1,
+        "glyph_id_start": glyph_id_start,
+        "type": cmap_type,
+        "unicode_list": None,
+        "glyph_id_ofs_list": None,
+    }
+    if cmap_type in (CMAP_SPARSE_TINY, CMAP_SPARSE_FULL):
+        cmap["unicode_list"] = [c - start for c in codes]
+    if cmap_type == CMAP_SPARSE_FULL:
+        cmap["glyph_id_ofs_list"] = list(range(len(codes)))
+    if cmap_type == CMAP_FORMAT0_FULL:
+        present = set(codes)
+        ofs, ofs_list = 0, []
+        for c in range(start, codes[-1] + 1):
+            ofs_list.append(ofs if c in present else 0)
+            ofs += c in present
+        cmap["glyph_id_ofs_list"] = ofs_list
+    return cmap
+
+
+def ofs_list_ctype(cmap):
+    return "uint8_t" if cmap["type"] == CMAP_FORMAT0_FULL else "uint16_t"
+
+
+def cmap_table_bytes(cmap):
+    total = CMAP_HEADER_BYTES
+    if cmap["unicode_list"] is not None:
+        total += 2 * len(cmap["unicode_list"])
+    if cmap["glyph_id_ofs_list"] is not None:
+        width = 1 if ofs_list_ctype(cmap) == "uint8_t" else 2
+        total += width * len(cmap["glyph_id_ofs_list"])
+    return total
+
+
+def cmap_glyph_count(cmap):
+    if cmap["type"] == CMAP_FORMAT0_TINY:
+        return cmap["range_length"]
+    if cmap["type"] == CMAP_FORMAT0_FULL:
+        return len(set(cmap["glyph_id_ofs_list"]))
+    return len(cmap["unicode_list"])
+
+
+def cmap_report(cmaps):
+    # Lookup cost as lv_font_get_glyph_dsc_fmt_txt pays it: one range check per table up to the
+    # matching one, then a direct index (FORMAT0) or a binary search (SPARSE)
+    report = {"tables": len(cmaps), "types": {}, "bytes": 0, "glyphs": 0, "steps": 0, "worst_steps": 0,
+              "largest_search": 0}
+    for pos, cmap in enumerate(cmaps):
+        count = cmap_glyph_count(cmap)
+        probes = 1 if cmap["type"] in FORMAT0_TYPES else search_steps(count)
+        if cmap["type"] not in FORMAT0_TYPES:
+            report["largest_search"] = max(report["largest_search"], count)
+        report["types"][cmap["type"]] = report["types"].get(cmap["type"], 0) + 1
+        report["bytes"] += cmap_table_bytes(cmap)
+        report["glyphs"] += count
+        report["steps"] += (pos + 1 + probes) * count
+        report["worst_steps"] = max(report["worst_steps"], pos + 1 + probes)
+    report["mean_steps"] = report["steps"] / report["glyphs"] if report["glyphs"] else 0.0
+    return report
+
+
+def policy_reports(codes):
+    return {policy: cmap_report(build_cmaps(codes, policy)) for policy in CMAP_POLICIES} if codes else {}
+
+
+def short_type(cmap_type):
+    return cmap_type.replace("LV_FONT_FMT_TXT_CMAP_", "")
+
+
+def format_cmap_report(report, policy=None, alternatives=None):
+    types = ", ".join(f"{n} {short_type(t)}" for t, n in sorted(report["types"].items()))
+    label = f"Cmap ({policy} policy)" if policy else "Cmap"
+    if report["largest_search"]:
+        complexity = f"O(tables + log n), binary search over up to {report['largest_search']} codes"
+    else:
+        complexity = "O(tables), direct index"
+    lines = [
+        f"{label}: {report['tables']} table{'s' if report['tables'] != 1 else ''} ({types}), {report['bytes']} bytes",
+        f"  lookup: {report['mean_steps']:.1f} steps avg, {report['worst_steps']} worst; {complexity}",
+    ]
+    if alternatives:
+        lines.append("  policies: " + "; ".join(
+            f"{name} {alt['bytes']} B / {alt['mean_steps']:.1f} steps" for name, alt in alternatives.items()
+        ))
+    return lines
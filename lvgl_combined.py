@@ -0,0 +1,104 @@
+from lvgl_native import (
+    CONVERTER_VERSION, collect_font, c_font_name, c_char_comment, format_c_bytes, render_header, render_font_tables,
+    write_lines,
+)
+from lvgl_compress import encode_glyph_bitmap
+from lvgl_cmap import CMAP_POLICY_FLASH
+from lvgl_kerning import KERN_POLICY_FLASH
+
+# lv_font_fmt_txt_glyph_dsc_t.bitmap_index is a 20-bit field unless LV_FONT_FMT_TXT_LARGE is enabled
+LVGL_MAX_BITMAP_INDEX = 1 << 20
+SHARED_BITMAP_SYMBOL = "shared_glyph_bitmap"
+
+
+def build_shared_pool(entries):
+    # Glyph bitmaps are identified by their encoded bytes: the glyph descriptor carries the
+    # box size, so one blob can back glyphs of any font that uses the same bpp/format.
+    offsets = {}
+    pool = []
+    pool_size = 0
+    indices_per_font = []
+    separate_bytes = 0
+    glyph_count = 0
+    for entry in entries:
+        font = entry["font"]
+        indices = []
+        for g in font["glyphs"]:
+            data = encode_glyph_bitmap(g["pixels"], font["bpp"], entry["compression"])
+            separate_bytes += len(data)
+            glyph_count += 1
+            if data not in offsets:
+                offsets[data] = pool_size
+                pool.append((entry["name"], g["code"], data))
+                pool_size += len(data)
+            indices.append(offsets[data])
+        indices_per_font.append(indices)
+    stats = {
+        "fonts": len(entries),
+        "glyphs": glyph_count,
+        "unique_bitmaps": len(pool),
+        "separate_bytes": separate_bytes,
+        "pool_bytes": pool_size,
+        "saved_bytes": separate_bytes - pool_size,
+        "needs_large_format": pool_size >= LVGL_MAX_BITMAP_INDEX,
+    }
+    return pool, indices_per_font, stats
+
+
+def combined_lines(entries, output_path, pool, indices_per_font):
+    names = [e["name"] for e in entries]
+    guard = c_font_name("", output_path).upper()
+    sizes = ", ".join(str(e["font"]["size"]) for e in entries)
+    bpps = ", ".join(str(e["font"]["bpp"]) for e in entries)
+    opts = f"combined output of {', '.join(names)} with shared glyph bitmaps ({CONVERTER_VERSION})"
+    yield from render_header(sizes, bpps, opts, guard)
+    yield f"static LV_ATTRIBUTE_LARGE_CONST const uint8_t {SHARED_BITMAP_SYMBOL}[] = {{"
+    for i, (name, code, data) in enumerate(pool):
+        if i:
+            yield ""
+        yield f"    /* U+{code:04X}{c_char_comment(code)} ({name}) */"
+        yield from format_c_bytes(data)
+    yield from ["};", "", ""]
+    for entry, indices in zip(entries, indices_per_font):
+        yield from ["", f"/* ===== {entry['name']} ===== */", ""]
+        yield from render_font_tables(
+            entry["font"], entry["name"], indices, entry["compression"],
+            suffix="_" + entry["name"], bitmap_symbol=SHARED_BITMAP_SYMBOL,
+            cmap_policy=entry.get("cmap_policy", CMAP_POLICY_FLASH),
+            kern_policy=entry.get("kern_policy", KERN_POLICY_FLASH)
+        )
+    yield from ["", "", "", f"#endif /*#if {guard}*/"]
+
+
+def write_combined_c(entries, output_path):
+    names = [e["name"] for e in entries]
+    if len(set(names)) != len(names):
+        raise ValueError("Combined output needs a unique font name per block")
+    pool, indices_per_font, stats = build_shared_pool(entries)
+    with open(output_path, "w", encoding="utf-8", newline="\n") as fh:
+        write_lines(fh, combined_lines(entries, output_path, pool, indices_per_font))
+    return stats
+
+
+def collect_entry(font_path, font_name, size, bpp, ranges, compression, output_path, cmap_policy=CMAP_POLICY_FLASH,
+                  kern_policy=KERN_POLICY_FLASH, kern_min_px=0):
+    return {
+        "font": collect_font(font_path, size, bpp, ranges, kern_min_px=kern_min_px),
+        "name": c_font_name(font_name, output_path),
+        "compression": compression,
+        "cmap_policy": cmap_policy,
+        "kern_policy": kern_policy,
+    }
+
+
+def format_dedup_report(stats):
+    share = stats["saved_bytes"] / stats["separate_bytes"] if stats["separate_bytes"] else 0.0
+    lines = [
+        f"Shared bitmap pool: {stats['unique_bitmaps']} unique of {stats['glyphs']} glyph bitmaps "
+        f"across {stats['fonts']} fonts",
+        f"Bitmap bytes: {stats['pool_bytes']} shared vs {stats['separate_bytes']} in separate files "
+        f"({stats['saved_bytes']} saved, {share:.0%})",
+    ]
+    if stats["needs_large_format"]:
+        lines.append("Pool exceeds 1 MB: enable LV_FONT_FMT_TXT_LARGE in lv_conf.h")
+    return lines
@@ -0,0 +1,217 @@
+COMPRESS_NONE = "none"
+COMPRESS_RLE = "rle"
+COMPRESS_RLE_PREFILTER = "rle_prefilter"
+COMPRESSION_SCHEMES = (COMPRESS_NONE, COMPRESS_RLE, COMPRESS_RLE_PREFILTER)
+
+# lv_font_fmt_txt_bitmap_format_t values
+BITMAP_FORMATS = {
+    COMPRESS_NONE: 0,
+    COMPRESS_RLE_PREFILTER: 1,
+    COMPRESS_RLE: 2,
+}
+
+# lv_font_conv flags selecting the same bitmap format
+LV_FONT_CONV_FLAGS = {
+    COMPRESS_NONE: ["--no-compress"],
+    COMPRESS_RLE: ["--no-prefilter"],
+    COMPRESS_RLE_PREFILTER: [],
+}
+
+# Limits of LVGL's RLE decoder (lv_font_fmt_txt.c): up to 10 repeats as single '1' bits,
+# then a 6-bit counter
+RLE_BIT_REPEATS = 10
+RLE_COUNTER_MAX = 63
+
+# Relative decode cost per full redraw: one rle_next() step per pixel, a bpp-bit literal read per run,
+# and for the prefilter one XOR with the previous line per pixel below a glyph's first row.
+# Uncompressed bitmaps are read in place and cost nothing to decode.
+DECODE_STEP_COST = 1
+DECODE_LITERAL_COST = 1
+DECODE_XOR_COST = 1
+
+
+class BitWriter:
+    def __init__(self):
+        self.out = bytearray()
+        self.acc = 0
+        self.nbits = 0
+        self.total_bits = 0
+
+    def write(self, value, bits):
+        self.acc = (self.acc << bits) | (value & ((1 << bits) - 1))
+        self.nbits += bits
+        self.total_bits += bits
+        while self.nbits >= 8:
+            self.nbits -= 8
+            self.out.append((self.acc >> self.nbits) & 0xFF)
+        self.acc &= (1 << self.nbits) - 1
+
+    def getvalue(self):
+        out = bytes(self.out)
+        if self.nbits:
+            out += bytes([(self.acc << (8 - self.nbits)) & 0xFF])
+        return out
+
+
+def prefilter_rows(pixels):
+    out = []
+    prev = None
+    for row in pixels:
+        out.append(list(row) if prev is None else [a ^ b for a, b in zip(row, prev)])
+        prev = row
+    return out
+
+
+def rle_encode(values, bpp):
+    # Mirrors LVGL's rle_next(): a literal equal to the previous literal switches the
+    # decoder to repeat mode, where '1' bits repeat and a '0' bit is followed by a new literal.
+    writer = BitWriter()
+    runs = 0
+    pos = 0
+    count = len(values)
+    while pos < count:
+        value = values[pos]
+        end = pos
+        while end < count and values[end] == value:
+            end += 1
+        length = end - pos
+        runs += 1
+        writer.write(value, bpp)
+        if length == 1:
+            pos += 1
+            continue
+        writer.write(value, bpp)
+        repeats = min(length - 2, RLE_BIT_REPEATS + RLE_COUNTER_MAX)
+        pos += 2 + repeats
+        at_end = pos >= count
+        if repeats <= RLE_BIT_REPEATS:
+            for _ in range(repeats):
+                writer.write(1, 1)
+            if not at_end:
+                writer.write(0, 1)
+        else:
+            for _ in range(RLE_BIT_REPEATS + 1):
+                writer.write(1, 1)
+            writer.write(repeats - RLE_BIT_REPEATS, 6)
+    return writer.getvalue(), runs
+
+
+def rle_decode(data, bpp, count):
+    def get_bits(pos, bits):
+        value = 0
+        for i in range(pos, pos + bits):
+            value = (value << 1) | ((data[i >> 3] >> (7 - (i & 7))) & 1)
+        return value
+
+    out = []
+    rdp = 0
+    prev = 0
+    cnt = 0
+    state = "single"
+    for _ in range(count):
+        if state == "single":
+            ret = get_bits(rdp, bpp)
+            if rdp != 0 and prev == ret:
+                cnt = 0
+                state = "repeat"
+            prev = ret
+            rdp += bpp
+        elif state == "repeat":
+            bit = get_bits(rdp, 1)
+            cnt += 1
+            rdp += 1
+            if bit:
+                ret = prev
+                if cnt == RLE_BIT_REPEATS + 1:
+                    cnt = get_bits(rdp, 6)
+                    rdp += 6
+                    if cnt:
+                        state = "counter"
+                    else:
+                        ret = prev = get_bits(rdp, bpp)
+                        rdp += bpp
+                        state = "single"
+            else:
+                ret = prev = get_bits(rdp, bpp)
+                rdp += bpp
+                state = "single"
+        else:
+            ret = prev
+            cnt -= 1
+            if cnt == 0:
+                ret = prev = get_bits(rdp, bpp)
+                rdp += bpp
+                state = "single"
+        out.append(ret)
+    return out
+
+
+def flatten(pixels):
+    return [p for row in pixels for p in row]
+
+
+def compress_glyph(pixels, bpp, scheme):
+    if scheme == COMPRESS_RLE_PREFILTER:
+        pixels = prefilter_rows(pixels)
+    return rle_encode(flatten(pixels), bpp)
+
+
+def encode_glyph_bitmap(pixels, bpp, scheme=COMPRESS_NONE):
+    if scheme == COMPRESS_NONE:
+        from lvgl_native import pack_bitmap
+        return pack_bitmap(pixels, bpp)
+    return compress_glyph(pixels, bpp, scheme)[0]
+
+
+def decode_cost(pixels, literals, xors):
+    return pixels * DECODE_STEP_COST + literals * DECODE_LITERAL_COST + xors * DECODE_XOR_COST
+
+
+def compression_report(font, source=None):
+    # source: where the glyphs came from when not this converter's own rendering
+    from lvgl_native import pack_bitmap
+    bpp = font["bpp"]
+    glyphs = font["glyphs"]
+    report = {
+        "glyphs": len(glyphs),
+        "pixels": sum(g["box_w"] * g["box_h"] for g in glyphs),
+        "raw_bytes": sum(len(pack_bitmap(g["pixels"], bpp)) for g in glyphs),
+        "source": source,
+        "schemes": {},
+    }
+    xors = sum(g["box_w"] * max(0, g["box_h"] - 1) for g in glyphs)
+    for scheme in (COMPRESS_RLE, COMPRESS_RLE_PREFILTER):
+        total_bytes = 0
+        total_runs = 0
+        max_runs = 0
+        for g in glyphs:
+            data, runs = compress_glyph(g["pixels"], bpp, scheme)
+            total_bytes += len(data)
+            total_runs += runs
+            max_runs = max(max_runs, runs)
+        scheme_xors = xors if scheme == COMPRESS_RLE_PREFILTER else 0
+        report["schemes"][scheme] = {
+            "bytes": total_bytes,
+            "runs": total_runs,
+            "runs_per_glyph": total_runs / len(glyphs) if glyphs else 0.0,
+            "max_runs": max_runs,
+            "decode_cost": decode_cost(report["pixels"], total_runs, scheme_xors),
+        }
+    return report
+
+
+def format_compression_report(report):
+    raw = report["raw_bytes"]
+    origin = f" (read from {report['source']})" if report.get("source") else ""
+    lines = [
+        f"Bitmaps{origin}: {report['glyphs']} glyphs, {report['pixels']} px, {raw} bytes uncompressed, "
+        f"no decode work"
+    ]
+    for scheme, info in report["schemes"].items():
+        ratio = info["bytes"] / raw if raw else 0.0
+        lines.append(
+            f"  {scheme}: {info['bytes']} bytes ({ratio:.0%} of raw, {raw - info['bytes']} saved), "
+            f"{info['runs_per_glyph']:.1f} runs/glyph avg, {info['max_runs']} max, "
+            f"decode cost ~{info['decode_cost']} per full redraw"
+        )
+    return lines
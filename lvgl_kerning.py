@@ -0,0 +1,152 @@
+import math
+
+from lvgl_cmap import search_steps
+
+KERN_POLICY_FLASH = "flash"
+KERN_POLICY_BALANCED = "balanced"
+KERN_POLICY_SPEED = "speed"
+# Weight of one table byte and of one lookup step per glyph, as for the cmap policies
+KERN_POLICIES = {
+    KERN_POLICY_FLASH: (1.0, 0.001),
+    KERN_POLICY_BALANCED: (1.0, 1.0),
+    KERN_POLICY_SPEED: (0.001, 1.0),
+}
+KERN_PAIRS = "pairs"
+KERN_CLASSES = "classes"
+
+# sizeof(lv_font_fmt_txt_kern_pair_t) and sizeof(lv_font_fmt_txt_kern_classes_t) on a 32-bit MCU
+KERN_PAIR_HEADER_BYTES = 12
+KERN_CLASS_HEADER_BYTES = 16
+# left_class_cnt and right_class_cnt are uint8_t, and class 0 means "no kerning"
+MAX_KERN_CLASSES = 255
+
+
+def kern_scale_for(pairs):
+    peak = max((abs(v) for _, _, v in pairs), default=0)
+    return max(16, int(math.ceil(peak * 16 / 127.0)))
+
+
+def quantize_kerning(pairs, scale):
+    # Values as LVGL stores them: int8_t in 4.4 format, multiplied by kern_scale / 16
+    return [(left, right, int(round(value * 16.0 / scale))) for left, right, value in pairs]
+
+
+def drop_small_pairs(pairs, min_px):
+    # pairs carry 1/16 px values; anything under min_px at the target size is dropped
+    limit = min_px * 16
+    return [p for p in pairs if p[2] and abs(p[2]) >= limit]
+
+
+def kerning_classes(pairs):
+    # Exact classes: left glyphs with the same row of values share a class, then right glyphs
+    # with the same column over those classes. Nothing is approximated, so the matrix gives the
+    # same value as the pair list for every pair.
+    rows = {}
+    for left, right, value in pairs:
+        rows.setdefault(left, {})[right] = value
+    left_classes = {}
+    left_class = {}
+    for left in sorted(rows):
+        key = tuple(sorted(rows[left].items()))
+        left_class[left] = left_classes.setdefault(key, len(left_classes) + 1)
+    columns = {}
+    for left, right, value in pairs:
+        columns.setdefault(right, {})[left_class[left]] = value
+    right_classes = {}
+    right_class = {}
+    for right in sorted(columns):
+        key = tuple(sorted(columns[right].items()))
+        right_class[right] = right_classes.setdefault(key, len(right_classes) + 1)
+    matrix = [[0] * len(right_classes) for _ in range(len(left_classes))]
+    for left, right, value in pairs:
+        matrix[left_class[left] - 1][right_class[right] - 1] = value
+    return left_class, right_class, matrix
+
+
+def pair_table_bytes(pair_count, glyph_count):
+    id_bytes = 1 if glyph_count < 256 else 2
+    return KERN_PAIR_HEADER_BYTES + pair_count * (2 * id_bytes + 1)
+
+
+def class_table_bytes(left_count, right_count, glyph_count):
+    return KERN_CLASS_HEADER_BYTES + 2 * (glyph_count + 1) + left_count * right_count
+
+
+def build_kerning(pairs, glyph_count, policy=KERN_POLICY_FLASH):
+    # pairs: (left id, right id, 1/16 px) with LVGL glyph ids. Returns the table to emit: a sorted
+    # pair list (binary search per lookup) or a class matrix (two mapping reads and one matrix read).
+    if policy not in KERN_POLICIES:
+        raise ValueError(f"Unknown kerning policy: {policy}")
+    if not pairs:
+        return None
+    scale = kern_scale_for(pairs)
+    # Pairs that round to 0 in 4.4 format would only cost bytes
+    values = sorted(p for p in quantize_kerning(pairs, scale) if p[2])
+    if not values:
+        return None
+    kern = {
+        "format": KERN_PAIRS,
+        "scale": scale,
+        "pairs": values,
+        "bytes": pair_table_bytes(len(values), glyph_count),
+        "steps": search_steps(len(values)),
+    }
+    left_class, right_class, matrix = kerning_classes(values)
+    left_count, right_count = len(matrix), len(matrix[0])
+    if max(left_count, right_count) > MAX_KERN_CLASSES:
+        return kern
+    byte_weight, step_weight = KERN_POLICIES[policy]
+    class_bytes = class_table_bytes(left_count, right_count, glyph_count)
+    pair_score = byte_weight * kern["bytes"] + step_weight * kern["steps"] * glyph_count
+    class_score = byte_weight * class_bytes + step_weight * glyph_count
+    if class_score < pair_score:
+        kern.update(
+            format=KERN_CLASSES, bytes=class_bytes, steps=1,
+            left_mapping=[left_class.get(gid, 0) for gid in range(glyph_count + 1)],
+            right_mapping=[right_class.get(gid, 0) for gid in range(glyph_count + 1)],
+            matrix=matrix, left_count=left_count, right_count=right_count,
+        )
+    return kern
+
+
+def kerning_report(all_pairs, kept_pairs, glyph_count, policy=KERN_POLICY_FLASH):
+    # all_pairs: every pair of the block's glyph set; kept_pairs: those left after the threshold
+    kern = build_kerning(kept_pairs, glyph_count, policy)
+    report = {
+        "pairs_before": len(all_pairs),
+        "bytes_before": pair_table_bytes(len(all_pairs), glyph_count) if all_pairs else 0,
+        "pairs_after": len(kept_pairs),
+        "bytes_after": kern["bytes"] if kern else 0,
+        "format": kern["format"] if kern else None,
+        "steps": kern["steps"] if kern else 0,
+        "classes": (kern["left_count"], kern["right_count"]) if kern and kern["format"] == KERN_CLASSES else None,
+    }
+    if kern and kern["format"] == KERN_PAIRS:
+        left_class, right_class, matrix = kerning_classes(kern["pairs"])
+        if len(matrix) <= MAX_KERN_CLASSES and len(matrix[0]) <= MAX_KERN_CLASSES:
+            report["alternative_bytes"] = class_table_bytes(len(matrix), len(matrix[0]), glyph_count)
+    elif kern:
+        report["alternative_bytes"] = pair_table_bytes(len(kept_pairs), glyph_count)
+    return report
+
+
+def format_kerning_report(report, policy=None, source=None, min_px=0):
+    if not report["pairs_before"]:
+        return [f"Kerning: none in the font for these glyphs{f' ({source})' if source else ''}"]
+    label = f"Kerning ({policy} policy)" if policy else "Kerning"
+    origin = f" from {source}" if source else ""
+    lines = [f"{label}: {report['pairs_before']} pairs{origin}, {report['bytes_before']} bytes as a pair list"]
+    if min_px:
+        lines.append(f"  below {min_px:g} px dropped: {report['pairs_before'] - report['pairs_after']} pairs, "
+                     f"{report['pairs_after']} kept")
+    if report["format"] == KERN_CLASSES:
+        left, right = report["classes"]
+        chosen = f"class matrix {left}x{right}, O(1) lookup"
+    elif report["format"] == KERN_PAIRS:
+        chosen = f"pair list, binary search of {report['steps']} steps"
+    else:
+        return lines + ["  emitted: none"]
+    other = report.get("alternative_bytes")
+    alternative = f" (other format {other} bytes)" if other is not None else ""
+    lines.append(f"  emitted: {chosen}, {report['bytes_after']} bytes{alternative}")
+    return lines
@@ -0,0 +1,766 @@
+import os
+import re
+import math
+import bisect
+import itertools
+import struct
+import time
+import freetype
+import font_trace
+from lvgl_compress import (
+    COMPRESS_NONE, COMPRESS_RLE_PREFILTER, BITMAP_FORMATS, LV_FONT_CONV_FLAGS, encode_glyph_bitmap, rle_decode,
+)
+from lvgl_cmap import CMAP_POLICY_FLASH, build_cmaps, cmap_table_bytes, ofs_list_ctype
+from lvgl_kerning import KERN_CLASSES, KERN_POLICY_FLASH, build_kerning, drop_small_pairs
+from font_kerning import glyph_kerning
+from font_pool import get_face
+
+# native-2: cmaps are chosen by lvgl_cmap's optimizer
+# native-3: kerning is read from GPOS and may be emitted as class matrices
+CONVERTER_VERSION = "native-3"
+
+GLYPH_DSC_BYTES = 8
+LOAD_FLAGS = freetype.FT_LOAD_RENDER | freetype.FT_LOAD_TARGET_LIGHT
+
+
+def quantize_pixel(value, bpp):
+    return (value * ((1 << bpp) - 1) + 127) // 255
+
+
+def read_bitmap_pixels(bitmap):
+    width, rows, pitch = bitmap.width, bitmap.rows, abs(bitmap.pitch)
+    buf = bitmap.buffer
+    if bitmap.pixel_mode == freetype.FT_PIXEL_MODE_MONO:
+        return [
+            [255 if buf[y * pitch + (x >> 3)] & (0x80 >> (x & 7)) else 0 for x in range(width)]
+            for y in range(rows)
+        ]
+    return [list(buf[y * pitch:y * pitch + width]) for y in range(rows)]
+
+
+def trim_pixels(pixels, left, top):
+    rows = [y for y, row in enumerate(pixels) if any(row)]
+    if not rows:
+        return [], 0, 0
+    cols = [x for x in range(len(pixels[0])) if any(row[x] for row in pixels)]
+    y0, y1 = rows[0], rows[-1] + 1
+    x0, x1 = cols[0], cols[-1] + 1
+    return [row[x0:x1] for row in pixels[y0:y1]], left + x0, top - y0
+
+
+def render_glyph(face, code, bpp):
+    face.load_char(code, LOAD_FLAGS)
+    return loaded_glyph(face, code, face.get_char_index(code), bpp)
+
+
+def render_glyph_index(face, glyph_index, bpp, code):
+    # For glyphs the cmap does not reach, e.g. conjuncts produced by shaping
+    face.load_glyph(glyph_index, LOAD_FLAGS)
+    return loaded_glyph(face, code, glyph_index, bpp)
+
+
+def loaded_glyph(face, code, glyph_index, bpp):
+    glyph = face.glyph
+    pixels = [[quantize_pixel(p, bpp) for p in row] for row in read_bitmap_pixels(glyph.bitmap)]
+    pixels, ofs_x, top = trim_pixels(pixels, glyph.bitmap_left, glyph.bitmap_top)
+    box_h = len(pixels)
+    box_w = len(pixels[0]) if pixels else 0
+    return {
+        "code": code,
+        "glyph_index": glyph_index,
+        "pixels": pixels,
+        "box_w": box_w,
+        "box_h": box_h,
+        "ofs_x": ofs_x if box_w else 0,
+        "ofs_y": top - box_h if box_h else 0,
+        # LVGL stores the advance in 1/16 px
+        "adv_w": int(round(glyph.advance.x / 4.0)),
+    }
+
+
+def expand_ranges(ranges):
+    codes = set()
+    for start, end in ranges:
+        codes.update(range(start, end + 1))
+    return sorted(codes)
+
+
+def collect_kerning(face, glyphs, font_path=None, min_px=0):
+    # (left id, right id, 1/16 px) with glyph ids numbered from 1 like LVGL. GPOS pair kerning is
+    # read from the font file; FreeType alone only sees the legacy 'kern' table.
+    pairs = None
+    if font_path is not None:
+        try:
+            pairs = table_kerning(face, glyphs, font_path)
+        except (struct.error, IndexError, OSError):
+            pairs = None
+    if pairs is None:
+        pairs = freetype_kerning(face, glyphs)
+    return drop_small_pairs(pairs, min_px) if min_px else pairs
+
+
+def table_kerning(face, glyphs, font_path):
+    ids = {}
+    for gid, g in enumerate(glyphs, 1):
+        # Several codes can map to one font glyph
+        ids.setdefault(g["glyph_index"], []).append(gid)
+    pairs = []
+    for (left, right), value in glyph_kerning(font_path, ids).items():
+        # Font units to 26.6 with the 16.16 x_scale as FreeType does, then to 1/16 px
+        value = int(round(value * face.size.x_scale / 65536.0 / 4.0))
+        if value:
+            pairs += [(l, r, value) for l in ids[left] for r in ids[right]]
+    return sorted(pairs)
+
+
+def freetype_kerning(face, glyphs):
+    # Legacy 'kern' table only, through FreeType
+    if not face.has_kerning:
+        return []
+    pairs = []
+    for left_id, left in enumerate(glyphs, 1):
+        for right_id, right in enumerate(glyphs, 1):
+            value = face.get_kerning(left["glyph_index"], right["glyph_index"], freetype.FT_KERNING_UNFITTED).x
+            value = int(round(value / 4.0))
+            if value:
+                pairs.append((left_id, right_id, value))
+    return pairs
+
+
+def iter_glyphs(face, ranges, bpp):
+    for code in expand_ranges(ranges):
+        if face.get_char_index(code):
+            yield render_glyph(face, code, bpp)
+
+
+def font_metrics(face, font_path, size, bpp, glyphs):
+    ascent = int(math.ceil(face.size.ascender / 64.0))
+    descent = int(math.floor(face.size.descender / 64.0))
+    for g in glyphs:
+        if g["box_h"]:
+            ascent = max(ascent, g["ofs_y"] + g["box_h"])
+            descent = min(descent, g["ofs_y"])
+    units = float(face.units_per_EM or 1)
+    return {
+        "font_path": font_path,
+        "size": int(size),
+        "bpp": int(bpp),
+        "ascent": ascent,
+        "descent": descent,
+        "underline_position": int(round(face.underline_position * size / units)),
+        "underline_thickness": max(1, int(round(face.underline_thickness * size / units))),
+        "glyphs": glyphs,
+    }
+
+
+def collect_font(font_path, size, bpp, ranges, kerning=True, face=None, kern_min_px=0):
+    if face is None:
+        face = get_face(font_path)
+    face.set_pixel_sizes(0, int(size))
+    glyphs = list(iter_glyphs(face, ranges, bpp))
+    font = font_metrics(face, font_path, size, bpp, glyphs)
+    font["kerning"] = collect_kerning(face, glyphs, font_path, kern_min_px) if kerning else []
+    return font
+
+
+def pack_bitmap(pixels, bpp):
+    # lv_font_conv layout: pixels packed MSB first across the whole glyph, padded to a byte per glyph
+    out = bytearray()
+    acc = 0
+    nbits = 0
+    for row in pixels:
+        for p in row:
+            acc = (acc << bpp) | p
+            nbits += bpp
+            while nbits >= 8:
+                nbits -= 8
+                out.append((acc >> nbits) & 0xFF)
+            acc &= (1 << nbits) - 1
+    if nbits:
+        out.append((acc << (8 - nbits)) & 0xFF)
+    return bytes(out)
+
+
+def font_data_bytes(font, compression=COMPRESS_NONE, cmap_policy=CMAP_POLICY_FLASH, kern_policy=KERN_POLICY_FLASH):
+    glyphs = font["glyphs"]
+    cmaps = build_cmaps([g["code"] for g in glyphs], cmap_policy) if glyphs else []
+    kern = build_kerning(font["kerning"], len(glyphs), kern_policy)
+    sizes = {
+        "bitmap": sum(len(encode_glyph_bitmap(g["pixels"], font["bpp"], compression)) for g in glyphs),
+        "glyph_dsc": (len(glyphs) + 1) * GLYPH_DSC_BYTES,
+        "cmap": sum(cmap_table_bytes(c) for c in cmaps),
+        "kerning": kern["bytes"] if kern else 0,
+    }
+    sizes["total"] = sum(sizes.values())
+    return sizes
+
+
+def c_char_comment(code):
+    if code < 0x20 or code == 0x7F:
+        return ""
+    ch = chr(code)
+    if ch in '"\\':
+        ch = "\\" + ch
+    return f' "{ch}"'
+
+
+def format_c_bytes(data, indent="    ", per_line=16):
+    lines = []
+    for i in range(0, len(data), per_line):
+        lines.append(indent + ", ".join(f"0x{b:02x}" for b in data[i:i + per_line]) + ",")
+    return lines
+
+
+def format_c_ints(values, indent="    ", per_line=16):
+    lines = []
+    for i in range(0, len(values), per_line):
+        lines.append(indent + ", ".join(str(v) for v in values[i:i + per_line]) + ",")
+    return lines
+
+
+def c_font_name(font_name, output_path):
+    name = font_name or os.path.splitext(os.path.basename(output_path))[0]
+    return re.sub(r"\W", "_", name)
+
+
+def render_header(size, bpp, opts, guard):
+    return [
+        "/*******************************************************************************",
+        f" * Size: {size} px",
+        f" * Bpp: {bpp}",
+        f" * Opts: {opts}",
+        " ******************************************************************************/",
+        "",
+        "#ifdef LV_LVGL_H_INCLUDE_SIMPLE",
+        '#include "lvgl.h"',
+        "#else",
+        '#include "lvgl/lvgl.h"',
+        "#endif",
+        "",
+        f"#ifndef {guard}",
+        f"#define {guard} 1",
+        "#endif",
+        "",
+        f"#if {guard}",
+        "",
+        "/*-----------------",
+        " *    BITMAPS",
+        " *----------------*/",
+        "",
+        "/*Store the image of the glyphs*/",
+    ]
+
+
+def render_bitmap_entries(glyphs, blobs):
+    out = []
+    for i, (g, data) in enumerate(zip(glyphs, blobs)):
+        if i:
+            out.append("")
+        out.append(f"    /* U+{g['code']:04X}{c_char_comment(g['code'])} */")
+        out.extend(format_c_bytes(data))
+    return out
+
+
+def render_glyph_dsc(glyphs, bitmap_indices, suffix=""):
+    dsc_lines = ["    {.bitmap_index = 0, .adv_w = 0, .box_w = 0, .box_h = 0, .ofs_x = 0, .ofs_y = 0} /* id = 0 reserved */,"]
+    for g, bitmap_index in zip(glyphs, bitmap_indices):
+        dsc_lines.append(
+            f"    {{.bitmap_index = {bitmap_index}, .adv_w = {g['adv_w']}, .box_w = {g['box_w']}, "
+            f".box_h = {g['box_h']}, .ofs_x = {g['ofs_x']}, .ofs_y = {g['ofs_y']}}},"
+        )
+    dsc_lines[-1] = dsc_lines[-1].rstrip(",")
+    return [
+        "/*---------------------",
+        " *  GLYPH DESCRIPTION",
+        " *--------------------*/",
+        "",
+        f"static const lv_font_fmt_txt_glyph_dsc_t glyph_dsc{suffix}[] = {{",
+    ] + dsc_lines + [
+        "};",
+        "",
+        "/*---------------------",
+        " *  CHARACTER MAPPING",
+        " *--------------------*/",
+        "",
+    ]
+
+
+def render_font_tables(font, font_name, bitmap_indices, compression=COMPRESS_NONE, suffix="", bitmap_symbol="glyph_bitmap",
+                       fallback=None, cmap_policy=CMAP_POLICY_FLASH, kern_policy=KERN_POLICY_FLASH):
+    glyphs = font["glyphs"]
+    cmaps = build_cmaps([g["code"] for g in glyphs], cmap_policy) if glyphs else []
+    kern = build_kerning(font["kerning"], len(glyphs), kern_policy)
+    out = render_glyph_dsc(glyphs, bitmap_indices, suffix)
+    out += render_cmaps(cmaps, suffix)
+    out += render_kerning(kern, len(glyphs), suffix)
+    out += render_font_dsc(font, font_name, cmaps, compression, suffix, bitmap_symbol, fallback, kern)
+    return out
+
+
+def render_cmaps(cmaps, suffix=""):
+    out = []
+    for i, cmap in enumerate(cmaps):
+        if cmap["unicode_list"] is not None:
+            out.append(f"static const uint16_t unicode_list_{i}{suffix}[] = {{")
+            out += format_c_ints([f"0x{v:x}" for v in cmap["unicode_list"]])
+            out += ["};", ""]
+        if cmap["glyph_id_ofs_list"] is not None:
+            out.append(f"static const {ofs_list_ctype(cmap)} glyph_id_ofs_list_{i}{suffix}[] = {{")
+            out += format_c_ints(cmap["glyph_id_ofs_list"])
+            out += ["};", ""]
+    out += ["/*Collect the unicode lists and glyph_id offsets*/", f"static const lv_font_fmt_txt_cmap_t cmaps{suffix}[] =", "{"]
+    entries = []
+    for i, cmap in enumerate(cmaps):
+        unicode_list = f"unicode_list_{i}{suffix}" if cmap["unicode_list"] is not None else "NULL"
+        ofs_list = f"glyph_id_ofs_list_{i}{suffix}" if cmap["glyph_id_ofs_list"] is not None else "NULL"
+        list_length = len(cmap["unicode_list"] if cmap["unicode_list"] is not None else cmap["glyph_id_ofs_list"] or [])
+        entries.append(
+            "    {\n"
+            f"        .range_start = {cmap['range_start']}, .range_length = {cmap['range_length']}, "
+            f".glyph_id_start = {cmap['glyph_id_start']},\n"
+            f"        .unicode_list = {unicode_list}, .glyph_id_ofs_list = {ofs_list}, "
+            f".list_length = {list_length}, .type = {cmap['type']}\n"
+            "    }"
+        )
+    out.append(",\n".join(entries))
+    out += ["};", "", ""]
+    return out
+
+
+def render_kerning(kern, glyph_count, suffix=""):
+    if not kern:
+        return []
+    out = [
+        "/*-----------------",
+        " *    KERNING",
+        " *----------------*/",
+        "",
+        "",
+    ]
+    if kern["format"] == KERN_CLASSES:
+        return out + render_kern_classes(kern, suffix)
+    id_type, ids_size = ("uint8_t", 0) if glyph_count < 256 else ("uint16_t", 1)
+    ids = []
+    values = []
+    for left, right, value in kern["pairs"]:
+        ids += [left, right]
+        values.append(value)
+    out += [
+        "/*Pair left and right glyphs for kerning*/",
+        f"static const {id_type} kern_pair_glyph_ids{suffix}[] =",
+        "{",
+    ]
+    out += format_c_ints(ids)
+    out += [
+        "};",
+        "",
+        "/* Kerning between the respective left and right glyphs",
+        " * 4.4 format which needs to scaled with `kern_scale`*/",
+        f"static const int8_t kern_pair_values{suffix}[] =",
+        "{",
+    ]
+    out += format_c_ints(values)
+    out += [
+        "};",
+        "",
+        "/*Collect the kern pair's data in one place*/",
+        f"static const lv_font_fmt_txt_kern_pair_t kern_pairs{suffix} =",
+        "{",
+        f"    .glyph_ids = kern_pair_glyph_ids{suffix},",
+        f"    .values = kern_pair_values{suffix},",
+        f"    .pair_cnt = {len(values)},",
+        f"    .glyph_ids_size = {ids_size}",
+        "};",
+        "",
+    ]
+    return out
+
+
+def render_kern_classes(kern, suffix=""):
+    out = [
+        "/*Map glyph_ids to kern left classes*/",
+        f"static const uint8_t kern_left_class_mapping{suffix}[] =",
+        "{",
+    ]
+    out += format_c_ints(kern["left_mapping"])
+    out += [
+        "};",
+        "",
+        "/*Map glyph_ids to kern right classes*/",
+        f"static const uint8_t kern_right_class_mapping{suffix}[] =",
+        "{",
+    ]
+    out += format_c_ints(kern["right_mapping"])
+    out += [
+        "};",
+        "",
+        "/*Kern values between classes*/",
+        f"static const int8_t kern_class_values{suffix}[] =",
+        "{",
+    ]
+    out += format_c_ints([value for row in kern["matrix"] for value in row])
+    out += [
+        "};",
+        "",
+        "",
+        "/*Collect the kern class' data in one place*/",
+        f"static const lv_font_fmt_txt_kern_classes_t kern_classes{suffix} =",
+        "{",
+        f"    .class_pair_values   = kern_class_values{suffix},",
+        f"    .left_class_mapping  = kern_left_class_mapping{suffix},",
+        f"    .right_class_mapping = kern_right_class_mapping{suffix},",
+        f"    .left_class_cnt      = {kern['left_count']},",
+        f"    .right_class_cnt     = {kern['right_count']},",
+        "};",
+        "",
+    ]
+    return out
+
+
+def render_font_dsc(font, font_name, cmaps, compression=COMPRESS_NONE, suffix="", bitmap_symbol="glyph_bitmap",
+                    fallback=None, kern=None):
+    kern_dsc = "NULL"
+    if kern:
+        kern_dsc = f"&kern_{'classes' if kern['format'] == KERN_CLASSES else 'pairs'}{suffix}"
+    out = [f"extern const lv_font_t {fallback};", ""] if fallback else []
+    return out + [
+        "/*--------------------",
+        " *  ALL CUSTOM DATA",
+        " *--------------------*/",
+        "",
+        "#if LVGL_VERSION_MAJOR == 8",
+        "/*Store all the custom data of the font*/",
+        f"static  lv_font_fmt_txt_glyph_cache_t cache{suffix};",
+        "#endif",
+        "",
+        "#if LVGL_VERSION_MAJOR >= 8",
+        f"static const lv_font_fmt_txt_dsc_t font_dsc{suffix} = {{",
+        "#else",
+        f"static lv_font_fmt_txt_dsc_t font_dsc{suffix} = {{",
+        "#endif",
+        f"    .glyph_bitmap = {bitmap_symbol},",
+        f"    .glyph_dsc = glyph_dsc{suffix},",
+        f"    .cmaps = cmaps{suffix},",
+        f"    .kern_dsc = {kern_dsc},",
+        f"    .kern_scale = {kern['scale'] if kern else 0},",
+        f"    .cmap_num = {len(cmaps)},",
+        f"    .bpp = {font['bpp']},",
+        f"    .kern_classes = {1 if kern and kern['format'] == KERN_CLASSES else 0},",
+        f"    .bitmap_format = {BITMAP_FORMATS[compression]},",
+        "#if LVGL_VERSION_MAJOR == 8",
+        f"    .cache = &cache{suffix}",
+        "#endif",
+        "};",
+        "",
+        "",
+        "",
+        "/*-----------------",
+        " *  PUBLIC FONT",
+        " *----------------*/",
+        "",
+        "/*Initialize a public general font descriptor*/",
+        "#if LVGL_VERSION_MAJOR >= 8",
+        f"const lv_font_t {font_name} = {{",
+        "#else",
+        f"lv_font_t {font_name} = {{",
+        "#endif",
+        "    .get_glyph_dsc = lv_font_get_glyph_dsc_fmt_txt,    /*Function pointer to get glyph's data*/",
+        "    .get_glyph_bitmap = lv_font_get_bitmap_fmt_txt,    /*Function pointer to get glyph's bitmap*/",
+        f"    .line_height = {font['ascent'] - font['descent']},          /*The maximum line height required by the font*/",
+        f"    .base_line = {-font['descent']},             /*Baseline measured from the bottom of the line*/",
+        "#if !(LVGL_VERSION_MAJOR == 6 && LVGL_VERSION_MINOR == 0)",
+        "    .subpx = LV_FONT_SUBPX_NONE,",
+        "#endif",
+        "#if LV_VERSION_CHECK(7, 4, 0) || LVGL_VERSION_MAJOR >= 8",
+        f"    .underline_position = {font['underline_position']},",
+        f"    .underline_thickness = {font['underline_thickness']},",
+        "#endif",
+        f"    .dsc = &font_dsc{suffix},          /*The custom font data. Handled by `lv_font_get_glyph_dsc_fmt_txt` or `lv_font_get_bitmap_fmt_txt`*/",
+        "#if LV_VERSION_CHECK(8, 2, 0) || LVGL_VERSION_MAJOR >= 9",
+        f"    .fallback = {'&' + fallback if fallback else 'NULL'},",
+        "#endif",
+        "    .user_data = NULL,",
+        "};",
+    ]
+
+
+def native_opts(font_path, size, bpp, ranges, output_path, font_name, compression=COMPRESS_NONE):
+    parts = ["--font", os.path.basename(font_path)]
+    for start, end in ranges:
+        parts += ["--range", f"0x{start:X}" if start == end else f"0x{start:X}-0x{end:X}"]
+    parts += ["--size", str(size), "--bpp", str(bpp), "--format", "lvgl",
+              "-o", os.path.basename(output_path), "--lv-font-name", font_name] + LV_FONT_CONV_FLAGS[compression]
+    return " ".join(parts) + f" ({CONVERTER_VERSION})"
+
+
+# --- Streaming writer ---
+# Glyphs are rendered, encoded and written one at a time; only their metrics are kept for the
+# descriptor tables, so memory grows with the glyph count but not with the bitmap size.
+
+SPLIT_LVGL_CHECK = [
+    "#if !(LV_VERSION_CHECK(8, 2, 0) || LVGL_VERSION_MAJOR >= 9)",
+    '#error "Fonts split across several .c files need lv_font_t.fallback (LVGL 8.2+)"',
+    "#endif",
+    "",
+]
+
+
+def write_lines(fh, lines):
+    fh.writelines(line + "\n" for line in lines)
+
+
+def strip_pixels(glyph):
+    return {k: v for k, v in glyph.items() if k != "pixels"}
+
+
+def stream_bitmap_array(fh, glyphs, bpp, compression=COMPRESS_NONE, limit=None, symbol="glyph_bitmap"):
+    # Consumes glyphs until `limit` bitmap bytes are written; the rest stay in the iterator
+    fh.write(f"static LV_ATTRIBUTE_LARGE_CONST const uint8_t {symbol}[] = {{\n")
+    meta = []
+    indices = []
+    offset = 0
+    # Rendering, encoding and writing interleave per glyph, so their times are summed separately
+    clock = time.perf_counter
+    timing = [0.0, 0.0, 0.0]
+    glyphs = iter(glyphs)
+    while True:
+        t0 = clock()
+        g = next(glyphs, None)
+        if g is None:
+            break
+        t1 = clock()
+        data = encode_glyph_bitmap(g["pixels"], bpp, compression)
+        t2 = clock()
+        entry = render_bitmap_entries([g], [data])
+        write_lines(fh, [""] + entry if meta else entry)
+        timing[0] += t1 - t0
+        timing[1] += t2 - t1
+        timing[2] += clock() - t2
+        meta.append(strip_pixels(g))
+        indices.append(offset)
+        offset += len(data)
+        if limit is not None and offset >= limit:
+            break
+    write_lines(fh, ["};", "", ""])
+    font_trace.record("native.rasterize", timing[0], glyphs=len(meta))
+    font_trace.record("native.encode", timing[1], compression=compression, bytes=offset)
+    font_trace.record("file.write", timing[2], path=getattr(fh, "name", ""))
+    return meta, indices, offset
+
+
+def split_part_path(output_path, part):
+    stem, ext = os.path.splitext(output_path)
+    return f"{stem}_bitmaps_{part}{ext or '.c'}"
+
+
+def write_font_tables(fh, font, font_name, indices, compression, fallback, guard, cmap_policy=CMAP_POLICY_FLASH,
+                      kern_policy=KERN_POLICY_FLASH):
+    if fallback:
+        write_lines(fh, SPLIT_LVGL_CHECK)
+    write_lines(fh, render_font_tables(font, font_name, indices, compression, fallback=fallback, cmap_policy=cmap_policy,
+                                       kern_policy=kern_policy))
+    write_lines(fh, ["", "", "", f"#endif /*#if {guard}*/"])
+
+
+def stream_font_c(font_path, output_path, font_name, size, bpp, ranges, compression=COMPRESS_NONE, split_bytes=None,
+                  cmap_policy=CMAP_POLICY_FLASH, kern_policy=KERN_POLICY_FLASH, kern_min_px=0):
+    # With split_bytes the glyphs are cut into parts of about that many bitmap bytes, each in its
+    # own translation unit and chained with lv_font_t.fallback. Kerning only covers pairs in one part.
+    with font_trace.span("font.load", font=font_path):
+        face = get_face(font_path)
+        face.set_pixel_sizes(0, int(size))
+    name = c_font_name(font_name, output_path)
+    guard = name.upper()
+    opts = native_opts(font_path, size, bpp, ranges, output_path, name, compression)
+    glyphs = iter_glyphs(face, ranges, bpp)
+    parts = []
+    with open(output_path, "w", encoding="utf-8", newline="\n") as main:
+        write_lines(main, render_header(size, bpp, opts, guard))
+        meta, indices, offset = stream_bitmap_array(main, glyphs, bpp, compression, split_bytes)
+        pending = next(glyphs, None) if split_bytes else None
+        main_font = font_metrics(face, font_path, size, bpp, meta)
+        main_font["kerning"] = collect_kerning(face, meta, font_path, kern_min_px)
+        parts.append({"path": output_path, "name": name, "glyphs": len(meta), "bitmap_bytes": offset})
+        fallback = f"{name}_part_1" if pending is not None else None
+        while pending is not None:
+            part = len(parts)
+            path = split_part_path(output_path, part)
+            part_name = f"{name}_part_{part}"
+            with open(path, "w", encoding="utf-8", newline="\n") as fh:
+                write_lines(fh, render_header(size, bpp, opts, guard))
+                part_meta, part_indices, part_offset = stream_bitmap_array(
+                    fh, itertools.chain([pending], glyphs), bpp, compression, split_bytes
+                )
+                pending = next(glyphs, None)
+                font = font_metrics(face, font_path, size, bpp, part_meta)
+                font["kerning"] = collect_kerning(face, part_meta, font_path, kern_min_px)
+                nxt = f"{name}_part_{part + 1}" if pending is not None else None
+                write_font_tables(fh, font, part_name, part_indices, compression, nxt, guard, cmap_policy, kern_policy)
+            # The public font's line height has to fit the glyphs of every part
+            main_font["ascent"] = max(main_font["ascent"], font["ascent"])
+            main_font["descent"] = min(main_font["descent"], font["descent"])
+            parts.append({"path": path, "name": part_name, "glyphs": len(part_meta), "bitmap_bytes": part_offset})
+        write_font_tables(main, main_font, name, indices, compression, fallback, guard, cmap_policy, kern_policy)
+    return parts
+
+
+def convert_font_native(font_path, output_path, font_name, size, bpp, ranges, compression=COMPRESS_NONE,
+                        split_bytes=None, cmap_policy=CMAP_POLICY_FLASH, kern_policy=KERN_POLICY_FLASH, kern_min_px=0):
+    parts = stream_font_c(font_path, output_path, font_name, size, bpp, ranges, compression, split_bytes, cmap_policy,
+                          kern_policy, kern_min_px)
+    return {"parts": parts, "glyph_count": sum(p["glyphs"] for p in parts)}
+
+
+# --- Equivalence check against lv_font_conv output ---
+
+GLYPH_DSC_RE = re.compile(
+    r"\.bitmap_index = (\d+), \.adv_w = (\d+), \.box_w = (\d+), \.box_h = (\d+), "
+    r"\.ofs_x = (-?\d+), \.ofs_y = (-?\d+)"
+)
+CMAP_RE = re.compile(
+    r"\.range_start = (\d+), \.range_length = (\d+), \.glyph_id_start = (\d+),\s*"
+    r"\.unicode_list = (\w+), \.glyph_id_ofs_list = (\w+), \.list_length = (\d+), \.type = (\w+)"
+)
+
+
+def c_array_values(source, name):
+    match = re.search(r"\b" + re.escape(name) + r"\[\]\s*=\s*\{(.*?)\};", source, re.S)
+    if not match:
+        return []
+    body = re.sub(r"/\*.*?\*/", "", match.group(1), flags=re.S)
+    return [int(v, 0) for v in re.findall(r"-?0x[0-9a-fA-F]+|-?\d+", body)]
+
+
+def parse_cmaps(source):
+    cmaps = []
+    for start, length, gid_start, ulist, ofs_list, list_len, ctype in CMAP_RE.findall(source):
+        cmaps.append({
+            "range_start": int(start),
+            "range_length": int(length),
+            "glyph_id_start": int(gid_start),
+            "type": ctype,
+            "unicode_list": c_array_values(source, ulist) if ulist != "NULL" else None,
+            "glyph_id_ofs_list": c_array_values(source, ofs_list) if ofs_list != "NULL" else None,
+        })
+    return cmaps
+
+
+def parse_lvgl_cmaps(path):
+    with open(path, encoding="utf-8") as fh:
+        return parse_cmaps(fh.read())
+
+
+def parse_lvgl_c(path):
+    with open(path, encoding="utf-8") as fh:
+        source = fh.read()
+    bitmap = c_array_values(source, "glyph_bitmap")
+    dscs = [tuple(int(v) for v in m) for m in GLYPH_DSC_RE.findall(source)]
+    bpp = int(re.search(r"\.bpp = (\d+)", source).group(1))
+    fmt = re.search(r"\.bitmap_format = (\d+)", source)
+    bitmap_format = int(fmt.group(1)) if fmt else 0
+    bounds = sorted(set(d[0] for d in dscs[1:]) | {len(bitmap)})
+    glyphs = {}
+    for cmap in parse_cmaps(source):
+        start, length, gid_start, ctype = cmap["range_start"], cmap["range_length"], cmap["glyph_id_start"], cmap["type"]
+        uni, ofs = cmap["unicode_list"], cmap["glyph_id_ofs_list"]
+        if ctype.endswith("FORMAT0_TINY"):
+            mapping = [(start + i, gid_start + i) for i in range(length)]
+        elif ctype.endswith("FORMAT0_FULL"):
+            mapping = [(start + i, gid_start + o) for i, o in enumerate(ofs) if o or i == 0]
+        elif ctype.endswith("SPARSE_TINY"):
+            mapping = [(start + u, gid_start + i) for i, u in enumerate(uni)]
+        else:
+            mapping = [(start + u, gid_start + o) for u, o in zip(uni, ofs)]
+        for code, gid in mapping:
+            glyphs[code] = gid
+    out = {}
+    for code, gid in glyphs.items():
+        index, adv_w, box_w, box_h, ofs_x, ofs_y = dscs[gid]
+        data = bytes(bitmap[index:bounds[bisect.bisect_right(bounds, index)]]) if box_w * box_h else b""
+        if bitmap_format and data:
+            data = decompress_bitmap(data, bpp, box_w, box_h, bitmap_format)
+        out[code] = {
+            "adv_w": adv_w, "box_w": box_w, "box_h": box_h, "ofs_x": ofs_x, "ofs_y": ofs_y,
+            "bitmap": data[:(box_w * box_h * bpp + 7) // 8],
+        }
+    return {"bpp": bpp, "glyphs": out}
+
+
+def decompress_bitmap(data, bpp, box_w, box_h, bitmap_format):
+    values = rle_decode(data, bpp, box_w * box_h)
+    rows = [values[y * box_w:(y + 1) * box_w] for y in range(box_h)]
+    if bitmap_format == BITMAP_FORMATS[COMPRESS_RLE_PREFILTER]:
+        for y in range(1, box_h):
+            rows[y] = [a ^ b for a, b in zip(rows[y], rows[y - 1])]
+    return pack_bitmap(rows, bpp)
+
+
+def unpack_bitmap(data, bpp, box_w, box_h):
+    # Inverse of pack_bitmap: rows of bpp levels
+    mask = (1 << bpp) - 1
+    values = []
+    for i in range(box_w * box_h):
+        byte, shift = divmod(i * bpp, 8)
+        # 3 bpp pixels can straddle two bytes
+        word = data[byte] << 8 | (data[byte + 1] if byte + 1 < len(data) else 0)
+        values.append((word >> (16 - bpp - shift)) & mask)
+    return [values[y * box_w:(y + 1) * box_w] for y in range(box_h)]
+
+
+def glyph_coverage(glyph, bpp):
+    # Pixels as 0..255 coverage keyed by (x, y) from the pen position and baseline, so bitmaps
+    # whose boxes are trimmed or offset differently still line up
+    mask = (1 << bpp) - 1
+    top = glyph["ofs_y"] + glyph["box_h"]
+    pixels = {}
+    for y, row in enumerate(unpack_bitmap(glyph["bitmap"], bpp, glyph["box_w"], glyph["box_h"])):
+        for x, value in enumerate(row):
+            if value:
+                pixels[(glyph["ofs_x"] + x, top - y)] = int(round(value * 255.0 / mask))
+    return pixels
+
+
+def lvgl_c_font(path):
+    # Glyph pixels of a generated .c file in the shape collect_font returns, for reports on
+    # files this converter did not render (lv_font_conv output)
+    parsed = parse_lvgl_c(path)
+    bpp = parsed["bpp"]
+    glyphs = []
+    for code, g in sorted(parsed["glyphs"].items()):
+        glyphs.append({"code": code, "box_w": g["box_w"], "box_h": g["box_h"],
+                       "pixels": unpack_bitmap(g["bitmap"], bpp, g["box_w"], g["box_h"])})
+    return {"bpp": bpp, "glyphs": glyphs}
+
+
+def compare_lvgl_outputs(path_a, path_b, adv_tolerance=16, offset_tolerance=1, pixel_tolerance=32):
+    # pixel_tolerance: largest per-pixel coverage difference (0..255) still counted as equivalent;
+    # the default allows about one 4 bpp level of anti-aliasing noise, so any 1 or 2 bpp change shows
+    a = parse_lvgl_c(path_a)
+    b = parse_lvgl_c(path_b)
+    problems = []
+    if a["bpp"] != b["bpp"]:
+        problems.append(f"bpp differs: {a['bpp']} != {b['bpp']}")
+    codes_a, codes_b = set(a["glyphs"]), set(b["glyphs"])
+    for code in sorted(codes_a ^ codes_b):
+        problems.append(f"U+{code:04X} only in {'first' if code in codes_a else 'second'} file")
+    identical = 0
+    bitmap_mismatches = 0
+    for code in sorted(codes_a & codes_b):
+        ga, gb = a["glyphs"][code], b["glyphs"][code]
+        if ga == gb:
+            identical += 1
+            continue
+        if abs(ga["adv_w"] - gb["adv_w"]) > adv_tolerance:
+            problems.append(f"U+{code:04X} advance {ga['adv_w']} != {gb['adv_w']}")
+        for key in ("box_w", "box_h", "ofs_x", "ofs_y"):
+            if abs(ga[key] - gb[key]) > offset_tolerance:
+                problems.append(f"U+{code:04X} {key} {ga[key]} != {gb[key]}")
+        pa, pb = glyph_coverage(ga, a["bpp"]), glyph_coverage(gb, b["bpp"])
+        diffs = [abs(pa.get(xy, 0) - pb.get(xy, 0)) for xy in set(pa) | set(pb)]
+        off = [d for d in diffs if d > pixel_tolerance]
+        if off:
+            bitmap_mismatches += 1
+            problems.append(f"U+{code:04X} bitmap: {len(off)} pixels differ by more than {pixel_tolerance}/255 "
+                            f"(up to {max(off)})")
+    return {"identical": identical, "compared": len(codes_a & codes_b), "bitmap_mismatches": bitmap_mismatches,
+            "problems": problems}
@@ -0,0 +1,341 @@
+import os
+import tempfile
+from collections import Counter
+
+import font_trace
+
+from font_pool import get_face
+from font_subset import is_renderable
+from lvgl_compress import COMPRESS_NONE, encode_glyph_bitmap
+from lvgl_native import (
+    CONVERTER_VERSION, SPLIT_LVGL_CHECK, c_font_name, format_c_bytes, format_c_ints, font_metrics, render_font_tables,
+    render_glyph_index, render_header, write_lines,
+)
+
+try:
+    import uharfbuzz as hb
+except ImportError:
+    hb = None
+
+# Offline shaping: every cluster of the corpus is shaped with HarfBuzz (GSUB/GPOS) and each
+# positioned glyph it produces, encoded in the cmap or not, becomes a glyph of a companion font
+# under a Private Use Area code. The firmware rewrites text with the cluster table (longest
+# match first) and LVGL draws the result like any other string, without a shaper.
+PUA_START = 0xE000
+PUA_END = 0xF8FF
+# Cluster lengths are stored as uint8_t
+MAX_CLUSTER_LEN = 255
+
+
+def require_harfbuzz():
+    if hb is None:
+        raise RuntimeError("Shaping needs the uharfbuzz package (pip install uharfbuzz)")
+
+
+def corpus_lines(paths):
+    lines = {}
+    for path in paths:
+        with open(path, encoding="utf-8-sig") as fh:
+            for line in fh:
+                text = "".join(ch for ch in line.rstrip("\r\n") if is_renderable(ord(ch)))
+                if text.strip():
+                    lines[text] = None
+    return list(lines)
+
+
+def load_shaper(font_path):
+    require_harfbuzz()
+    with open(font_path, "rb") as fh:
+        face = hb.Face(hb.Blob(fh.read()))
+    # The font's scale defaults to its units per em, so positions come back in font units
+    return hb.Font(face), face.upem
+
+
+def shape_line(hb_font, text):
+    buf = hb.Buffer()
+    # Codepoints rather than a str, so cluster values index characters whatever the encoding
+    buf.add_codepoints([ord(ch) for ch in text])
+    buf.guess_segment_properties()
+    # Pair kerning stays with the font's kern table, which LVGL applies on top of the advance;
+    # left on, it would make every kerned Latin pair a shaped cluster of its own
+    hb.shape(hb_font, buf, {"kern": False})
+    return buf.direction, buf.glyph_infos, buf.glyph_positions
+
+
+def line_clusters(text, infos, positions, scale):
+    # HarfBuzz tags each glyph with the index of its cluster's first character. Positions become
+    # whole-pixel offsets and a 1/16 px advance, as lv_font_fmt_txt_glyph_dsc_t stores them.
+    glyphs = {}
+    for info, pos in zip(infos, positions):
+        glyphs.setdefault(info.cluster, []).append((
+            info.codepoint,
+            int(round(pos.x_offset * scale)),
+            int(round(pos.y_offset * scale)),
+            int(round(pos.x_advance * scale * 16)),
+        ))
+    starts = sorted(glyphs)
+    ends = starts[1:] + [len(text)]
+    return [(tuple(ord(ch) for ch in text[s:e]), tuple(glyphs[s])) for s, e in zip(starts, ends)]
+
+
+def nominal_glyphs(hb_font, codes, scale):
+    # What the cluster looks like drawn one character at a time from the plain font
+    out = []
+    for code in codes:
+        gid = hb_font.get_nominal_glyph(code)
+        if not gid:
+            return None
+        out.append((gid, 0, 0, int(round(hb_font.get_glyph_h_advance(gid) * scale * 16))))
+    return tuple(out)
+
+
+def shape_corpus(font_path, size, corpus):
+    hb_font, upem = load_shaper(font_path)
+    scale = float(size) / upem
+    lines = corpus_lines(corpus)
+    seen = {}
+    rtl_lines = 0
+    for text in lines:
+        direction, infos, positions = shape_line(hb_font, text)
+        if direction != "ltr":
+            # Right-to-left text is left to LVGL's own bidi and Arabic/Persian handling
+            rtl_lines += 1
+            continue
+        for codes, glyphs in line_clusters(text, infos, positions, scale):
+            if len(codes) <= MAX_CLUSTER_LEN and len(glyphs) <= MAX_CLUSTER_LEN:
+                seen.setdefault(codes, Counter())[glyphs] += 1
+    clusters = {}
+    plain = 0
+    for codes, variants in seen.items():
+        # A cluster can shape differently in context; the most frequent form is kept
+        glyphs = variants.most_common(1)[0][0]
+        if glyphs == nominal_glyphs(hb_font, codes, scale):
+            plain += 1
+        else:
+            clusters[codes] = glyphs
+    stats = {
+        "lines": len(lines),
+        "rtl_lines": rtl_lines,
+        "clusters": len(seen),
+        "plain_clusters": plain,
+        "context_variants": sum(len(v) > 1 for v in seen.values()),
+    }
+    return clusters, stats
+
+
+def assign_codes(clusters):
+    # One code per distinct (glyph id, x offset, y offset, advance): the position is baked into
+    # the glyph descriptor, so only the bitmaps are shared between variants of a glyph
+    codes = {}
+    for key in sorted(clusters):
+        for glyph in clusters[key]:
+            if glyph not in codes:
+                codes[glyph] = PUA_START + len(codes)
+    if PUA_START + len(codes) - 1 > PUA_END:
+        raise ValueError(f"{len(codes)} shaped glyphs do not fit the {PUA_END - PUA_START + 1} Private Use Area codes")
+    return codes
+
+
+def render_shaped_glyphs(face, codes, bpp):
+    rendered = {}
+    glyphs = []
+    for (gid, x_ofs, y_ofs, adv_w), code in sorted(codes.items(), key=lambda item: item[1]):
+        if gid not in rendered:
+            rendered[gid] = render_glyph_index(face, gid, bpp, code)
+        g = dict(rendered[gid], code=code, adv_w=adv_w)
+        if g["box_w"]:
+            g["ofs_x"] += x_ofs
+            g["ofs_y"] += y_ofs
+        glyphs.append(g)
+    return glyphs
+
+
+def shared_bitmaps(glyphs, bpp, compression):
+    offsets = {}
+    pool = []
+    indices = []
+    size = 0
+    for g in glyphs:
+        data = encode_glyph_bitmap(g["pixels"], bpp, compression)
+        if data not in offsets:
+            offsets[data] = size
+            pool.append((g["code"], g["glyph_index"], data))
+            size += len(data)
+        indices.append(offsets[data])
+    return pool, indices, size
+
+
+def cluster_tables(clusters, codes):
+    text, glyph_codes, entries = [], [], []
+    for key in sorted(clusters):
+        glyphs = clusters[key]
+        entries.append((len(text), len(key), len(glyph_codes), len(glyphs)))
+        text += key
+        glyph_codes += [codes[g] for g in glyphs]
+    return text, glyph_codes, entries
+
+
+def cluster_lines(font_name, clusters, codes):
+    # Entries are sorted by codepoint sequence (a prefix before its extensions) for the binary search
+    text, glyph_codes, entries = cluster_tables(clusters, codes)
+    text_type = "uint16_t" if max(text) <= 0xFFFF else "uint32_t"
+    ofs_type = "uint16_t" if max(len(text), len(glyph_codes)) <= 0xFFFF else "uint32_t"
+    max_len = max(e[1] for e in entries)
+    out = [
+        "",
+        "",
+        "",
+        "/*-----------------",
+        " *  SHAPED CLUSTERS",
+        " *----------------*/",
+        "",
+        "/*Codepoints of every cluster, back to back*/",
+        f"static const {text_type} cluster_text[] = {{",
+    ]
+    out += format_c_ints([f"0x{c:x}" for c in text])
+    out += ["};", "", f"/*Codes of {font_name} that draw each cluster*/", "static const uint16_t cluster_glyphs[] = {"]
+    out += format_c_ints([f"0x{c:x}" for c in glyph_codes])
+    out += [
+        "};",
+        "",
+        "static const struct {",
+        f"    {ofs_type} text_ofs;",
+        f"    {ofs_type} glyph_ofs;",
+        "    uint8_t text_len;",
+        "    uint8_t glyph_len;",
+        "} clusters[] = {",
+    ]
+    out += [f"    {{{t}, {g}, {tl}, {gl}}}," for t, tl, g, gl in entries]
+    out[-1] = out[-1].rstrip(",")
+    out += [
+        "};",
+        "",
+        f"#define CLUSTER_COUNT {len(entries)}",
+        f"#define CLUSTER_MAX_LEN {max_len}",
+        "",
+        "static int32_t find_cluster(const uint32_t * text, uint32_t len)",
+        "{",
+        "    int32_t lo = 0;",
+        "    int32_t hi = CLUSTER_COUNT - 1;",
+        "    while(lo <= hi) {",
+        "        int32_t mid = (lo + hi) / 2;",
+        f"        const {text_type} * key = cluster_text + clusters[mid].text_ofs;",
+        "        uint32_t key_len = clusters[mid].text_len;",
+        "        int32_t cmp = 0;",
+        "        uint32_t i;",
+        "        for(i = 0; i < len && i < key_len && cmp == 0; i++) {",
+        "            if(text[i] != key[i]) cmp = text[i] < key[i] ? -1 : 1;",
+        "        }",
+        "        if(cmp == 0) cmp = len < key_len ? -1 : (len > key_len ? 1 : 0);",
+        "        if(cmp == 0) return mid;",
+        "        if(cmp < 0) hi = mid - 1;",
+        "        else lo = mid + 1;",
+        "    }",
+        "    return -1;",
+        "}",
+        "",
+        f"/*Rewrite `len` codepoints of `text` into codes for {font_name}: the longest shaped cluster at each",
+        " *position becomes its glyph codes, other characters are copied for the fallback font.",
+        " *Writes at most `out_max` codes and returns the full length, so a short `out` can be retried.*/",
+        f"uint32_t {font_name}_shape(const uint32_t * text, uint32_t len, uint32_t * out, uint32_t out_max)",
+        "{",
+        "    uint32_t pos = 0;",
+        "    uint32_t n = 0;",
+        "    while(pos < len) {",
+        "        uint32_t k = len - pos < CLUSTER_MAX_LEN ? len - pos : CLUSTER_MAX_LEN;",
+        "        int32_t found = -1;",
+        "        for(; k > 0 && found < 0; k--) found = find_cluster(text + pos, k);",
+        "        if(found < 0) {",
+        "            if(n < out_max) out[n] = text[pos];",
+        "            n++;",
+        "            pos++;",
+        "            continue;",
+        "        }",
+        "        uint32_t i;",
+        "        for(i = 0; i < clusters[found].glyph_len; i++) {",
+        "            if(n < out_max) out[n] = cluster_glyphs[clusters[found].glyph_ofs + i];",
+        "            n++;",
+        "        }",
+        "        pos += clusters[found].text_len;",
+        "    }",
+        "    return n;",
+        "}",
+        "",
+    ]
+    table_bytes = len(text) * (2 if text_type == "uint16_t" else 4) + 2 * len(glyph_codes)
+    table_bytes += len(entries) * (2 * (2 if ofs_type == "uint16_t" else 4) + 2)
+    return out, table_bytes
+
+
+def shaped_output_path(output_path, font_name):
+    return os.path.join(os.path.dirname(output_path), f"{font_name}.c")
+
+
+def write_shaped_font(font_path, corpus, output_path, font_name, size, bpp, compression=COMPRESS_NONE,
+                      fallback=None):
+    # fallback is the block's own font, which draws the characters no shaped cluster covers
+    with font_trace.span("shaping.corpus", font=font_path, files=len(corpus)):
+        clusters, stats = shape_corpus(font_path, size, corpus)
+    if not clusters:
+        raise ValueError("The corpus has no clusters that need shaping")
+    codes = assign_codes(clusters)
+    with font_trace.span("font.load", font=font_path):
+        face = get_face(font_path)
+        face.set_pixel_sizes(0, int(size))
+    with font_trace.span("shaping.render", glyphs=len(codes)):
+        glyphs = render_shaped_glyphs(face, codes, int(bpp))
+        pool, indices, bitmap_bytes = shared_bitmaps(glyphs, int(bpp), compression)
+    font = font_metrics(face, font_path, size, bpp, glyphs)
+    font["kerning"] = []
+    name = c_font_name(font_name, output_path)
+    guard = name.upper()
+    opts = f"--font {os.path.basename(font_path)} --size {size} --bpp {bpp}, shaped from {len(corpus)} corpus " \
+           f"file{'s' if len(corpus) != 1 else ''} ({CONVERTER_VERSION})"
+    table, table_bytes = cluster_lines(name, clusters, codes)
+    # Written beside the output and renamed over it, so a running firmware build never sees half a file
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        with font_trace.span("file.write", path=output_path), open(fd, "w", encoding="utf-8", newline="\n") as fh:
+            write_lines(fh, render_header(size, bpp, opts, guard))
+            write_lines(fh, ["static LV_ATTRIBUTE_LARGE_CONST const uint8_t glyph_bitmap[] = {"])
+            for i, (code, gid, data) in enumerate(pool):
+                write_lines(fh, ([""] if i else []) + [f"    /* U+{code:04X} glyph {gid} */"] + format_c_bytes(data))
+            write_lines(fh, ["};", "", ""])
+            if fallback:
+                write_lines(fh, SPLIT_LVGL_CHECK)
+            write_lines(fh, render_font_tables(font, name, indices, compression, fallback=fallback))
+            write_lines(fh, table)
+            write_lines(fh, ["", "", f"#endif /*#if {guard}*/"])
+        os.replace(tmp, output_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    cmap_ids = {gid for _, gid in face.get_chars()}
+    gids = {gid for gid, _, _, _ in codes}
+    stats.update(
+        path=output_path,
+        name=name,
+        stored_clusters=len(clusters),
+        glyphs=len(glyphs),
+        font_glyphs=len(gids),
+        unencoded_glyphs=len(gids - cmap_ids),
+        bitmap_bytes=bitmap_bytes,
+        table_bytes=table_bytes,
+    )
+    return stats
+
+
+def format_shaping_report(stats):
+    lines = [
+        f"Shaping: {stats['clusters']} clusters in {stats['lines']} corpus lines, {stats['stored_clusters']} "
+        f"stored, {stats['plain_clusters']} drawn unshaped by the fallback font",
+        f"Glyphs: {stats['glyphs']} positioned from {stats['font_glyphs']} font glyphs "
+        f"({stats['unencoded_glyphs']} not in the cmap), {stats['bitmap_bytes']} bitmap bytes",
+        f"Cluster table: {stats['table_bytes']} bytes; call {stats['name']}_shape() before drawing",
+    ]
+    if stats["context_variants"]:
+        lines.append(f"  {stats['context_variants']} clusters shape differently in context; the most common form is kept")
+    if stats["rtl_lines"]:
+        lines.append(f"  {stats['rtl_lines']} right-to-left lines skipped")
+    return lines